@@ -0,0 +1,397 @@
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows: compactions are only serialized within one process
+    fcntl = None
+
+import numpy as np
+
+from storage import ShardRouter
+
+# Integer codes for the low-cardinality columns stored in partitions
+SENTIMENT_CODES = {'negative': 0, 'positive': 1, 'neutral': 2}
+SOURCES = ['live_answers', 'answers', 'feedback']
+QUESTION_TYPES = ['text', 'rating', 'textarea', 'feedback', 'other']
+
+# Column name -> dtype of the .npy file backing it
+PARTITION_COLUMNS = {
+    'row_id': np.int64,
+    'source': np.int8,
+    'question_type': np.int8,
+    'hour': np.int8,
+    'sentiment': np.int8,
+    'sentiment_score': np.float32,
+    'rating': np.float32
+}
+
+GROUP_BY_FIELDS = ['event', 'venue', 'date', 'hour', 'question_type', 'source']
+
+# A partition with more segments than this has its newest ones merged even when sizes are uneven
+MAX_SEGMENTS = 16
+
+COMPACTION_QUERIES = {
+    'live_answers': '''
+        SELECT la.id, la.event_id, lq.question_type, la.sentiment, la.sentiment_score, la.rating, la.submitted_at
+        FROM live_answers la
+        LEFT JOIN live_questions lq ON la.live_question_id = lq.id
+        WHERE la.id > ?
+        ORDER BY la.id
+    ''',
+    'answers': '''
+        SELECT a.id, a.event_id, q.question_type, a.sentiment, a.sentiment_score, a.rating, a.submitted_at
+        FROM answers a
+        LEFT JOIN questions q ON a.question_id = q.id
+        WHERE a.id > ?
+        ORDER BY a.id
+    ''',
+    'feedback': '''
+        SELECT f.id, f.event_id, 'feedback', f.sentiment, f.sentiment_score, f.rating, f.submitted_at
+        FROM feedback f
+        WHERE f.id > ?
+        ORDER BY f.id
+    '''
+}
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+class AnalyticsStore:
+    """Columnar, memory-mapped copy of answer data for cross-event sentiment queries
+
+    Rows are compacted from the live SQLite tables into one partition per
+    (event, date). Each partition is a meta.json holding the event attributes,
+    per-source high-water marks and its list of segments, plus one directory
+    of .npy column files per segment. A compaction writes the new rows as a
+    new segment and never rewrites existing ones, except that the newest
+    segments are merged once they are at least as large as the one before
+    (so a partition keeps a logarithmic number of them). Segments only become
+    visible when meta.json is replaced, so readers never see a half-written
+    compaction.
+
+    Compactions hold a lock file under `root`, so the background loops and the
+    `compact` command never write the same partition at once.
+    """
+
+    def __init__(self, root='analytics', db_path='feedback_portal.db', chunk_size=10000):
+        self.root = root
+        self.db_path = db_path
+        self.chunk_size = chunk_size
+        self.state_path = os.path.join(root, 'state.json')
+        self.lock_path = os.path.join(root, 'compact.lock')
+        self.lock = threading.Lock()
+
+    def partition_dir(self, event_id, date):
+        return os.path.join(self.root, f'event_{event_id}', date)
+
+    def _load_state(self):
+        if os.path.exists(self.state_path):
+            with open(self.state_path) as f:
+                return json.load(f)
+        return {source: 0 for source in SOURCES}
+
+    def _write_json(self, path, data):
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    def _load_meta(self, path):
+        meta_path = os.path.join(path, 'meta.json')
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path) as f:
+            return json.load(f)
+
+    def _load_events(self, conn):
+        c = conn.cursor()
+        c.execute('SELECT id, organizer_id, name, venue FROM events')
+        return {
+            row[0]: {'organizer_id': row[1], 'name': row[2], 'venue': row[3]}
+            for row in c.fetchall()
+        }
+
+    def compact(self, router=None):
+        """Append rows added since the last run to their partitions
+
+        With a ShardRouter every shard is read in turn; its high-water marks
+        are kept under '<shard>:<source>' so row ids from different shards
+        never share a mark. Waits for a compaction already running in this or
+        another process.
+        """
+        os.makedirs(self.root, exist_ok=True)
+        with self.lock, open(self.lock_path, 'a') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            return self._compact(router)
+
+    def _compact(self, router):
+        state = self._load_state()
+        conn = sqlite3.connect(self.db_path)
+        events = self._load_events(conn)
+        conn.close()
+        total = 0
+
+        shards = router.iter_shard_connections() if router else [('main', sqlite3.connect(self.db_path))]
+        for shard_key, conn in shards:
+            try:
+                for source_code, source in enumerate(SOURCES):
+                    state_key = source if shard_key == 'main' else f'{shard_key}:{source}'
+                    c = conn.cursor()
+                    c.execute(COMPACTION_QUERIES[source], (state.get(state_key, 0),))
+                    while True:
+                        rows = c.fetchmany(self.chunk_size)
+                        if not rows:
+                            break
+                        self._append_rows(source, source_code, rows, events)
+                        state[state_key] = rows[-1][0]
+                        self._write_json(self.state_path, state)
+                        total += len(rows)
+            finally:
+                conn.close()
+
+        return total
+
+    def _append_rows(self, source, source_code, rows, events):
+        # Bucket the chunk by (event, date) partition
+        buckets = {}
+        for row in rows:
+            submitted_at = row[6] or ''
+            buckets.setdefault((row[1], submitted_at[:10] or 'unknown'), []).append(row)
+
+        for (event_id, date), bucket in buckets.items():
+            path = self.partition_dir(event_id, date)
+            meta = self._load_meta(path)
+            if meta is None:
+                event = events.get(event_id, {})
+                meta = {
+                    'event_id': event_id,
+                    'date': date,
+                    'organizer_id': event.get('organizer_id'),
+                    'event_name': event.get('name'),
+                    'venue': event.get('venue'),
+                    'rows': 0,
+                    'high_water': {}
+                }
+
+            # Skip rows already written by a run that died before saving state
+            high_water = meta['high_water'].get(source, 0)
+            bucket = [row for row in bucket if row[0] > high_water]
+            if not bucket:
+                continue
+
+            question_types = [
+                QUESTION_TYPES.index(row[2]) if row[2] in QUESTION_TYPES else QUESTION_TYPES.index('other')
+                for row in bucket
+            ]
+            new_columns = {
+                'row_id': [row[0] for row in bucket],
+                'source': [source_code] * len(bucket),
+                'question_type': question_types,
+                'hour': [int(row[6][11:13]) if row[6] and len(row[6]) >= 13 else -1 for row in bucket],
+                'sentiment': [SENTIMENT_CODES.get(row[3], -1) for row in bucket],
+                'sentiment_score': [_to_float(row[4]) for row in bucket],
+                'rating': [_to_float(row[5]) for row in bucket]
+            }
+
+            os.makedirs(path, exist_ok=True)
+            segments = self._segments(meta)
+            name = self._next_segment(meta)
+            self._write_segment(path, name, {column: np.asarray(new_columns[column], dtype=dtype)
+                                             for column, dtype in PARTITION_COLUMNS.items()})
+            segments.append({'name': name, 'rows': len(bucket)})
+
+            # Publishing meta last makes the new rows visible to readers
+            meta['segments'] = segments
+            meta['rows'] += len(bucket)
+            meta['high_water'][source] = bucket[-1][0]
+            self._write_json(os.path.join(path, 'meta.json'), meta)
+            self._merge_segments(path, meta)
+
+    def _segments(self, meta):
+        # Partitions written before segments existed keep their columns in the partition directory
+        return list(meta.get('segments', [{'name': '', 'rows': meta['rows']}] if meta['rows'] else []))
+
+    def _next_segment(self, meta):
+        number = meta.get('next_segment', 0)
+        meta['next_segment'] = number + 1
+        return f'seg_{number:06d}'
+
+    def _write_segment(self, path, name, columns):
+        segment_path = os.path.join(path, name)
+        # Left over by a compaction that died before publishing it
+        shutil.rmtree(segment_path, ignore_errors=True)
+        os.makedirs(segment_path)
+        for column, values in columns.items():
+            np.save(os.path.join(segment_path, f'{column}.npy'), values)
+
+    def _load_segment(self, path, segment):
+        return {
+            column: np.load(os.path.join(path, segment['name'], f'{column}.npy'), mmap_mode='r')[:segment['rows']]
+            for column in PARTITION_COLUMNS
+        }
+
+    def _remove_segment(self, path, segment):
+        if segment['name']:
+            shutil.rmtree(os.path.join(path, segment['name']), ignore_errors=True)
+        else:
+            for column in PARTITION_COLUMNS:
+                os.remove(os.path.join(path, f'{column}.npy'))
+
+    def _merge_segments(self, path, meta):
+        """Merge the newest segments while they are at least as large as the one before them"""
+        segments = meta['segments']
+        merged = []
+        while len(segments) > 1 and (segments[-2]['rows'] <= segments[-1]['rows'] or len(segments) > MAX_SEGMENTS):
+            older, newer = segments[-2], segments[-1]
+            older_columns = self._load_segment(path, older)
+            newer_columns = self._load_segment(path, newer)
+            name = self._next_segment(meta)
+            self._write_segment(path, name, {column: np.concatenate([older_columns[column], newer_columns[column]])
+                                             for column in PARTITION_COLUMNS})
+            del older_columns, newer_columns
+            segments[-2:] = [{'name': name, 'rows': older['rows'] + newer['rows']}]
+            merged += [older, newer]
+        if merged:
+            self._write_json(os.path.join(path, 'meta.json'), meta)
+            # Readers that opened the old segments keep their mappings; later ones read the new meta
+            for segment in merged:
+                self._remove_segment(path, segment)
+
+    def iter_partitions(self, organizer_id=None, event_ids=None, date_from=None, date_to=None):
+        """Yield (meta, columns) per segment of the partitions matching the filters
+
+        Columns are memory-mapped; meta['rows'] is the segment's row count.
+        """
+        if not os.path.isdir(self.root):
+            return
+
+        for event_dir in sorted(os.listdir(self.root)):
+            if not event_dir.startswith('event_'):
+                continue
+            if event_ids is not None and int(event_dir[len('event_'):]) not in event_ids:
+                continue
+
+            for date in sorted(os.listdir(os.path.join(self.root, event_dir))):
+                if (date_from and date < date_from) or (date_to and date > date_to):
+                    continue
+                path = os.path.join(self.root, event_dir, date)
+                for attempt in range(3):
+                    meta = self._load_meta(path)
+                    if not meta or not meta['rows']:
+                        break
+                    if organizer_id is not None and meta['organizer_id'] != organizer_id:
+                        break
+                    try:
+                        segments = [(segment, self._load_segment(path, segment)) for segment in self._segments(meta)]
+                    except FileNotFoundError:
+                        # A merge replaced segments after meta was read; read the new meta
+                        if attempt == 2:
+                            raise
+                        continue
+                    for segment, columns in segments:
+                        yield dict(meta, rows=segment['rows']), columns
+                    break
+
+    def _group_keys(self, group_by, meta, columns):
+        """Return (labels, codes) mapping each partition row to a group label"""
+        n = meta['rows']
+        if group_by in ('event', 'venue', 'date'):
+            label = {'event': meta['event_id'], 'venue': meta['venue'], 'date': meta['date']}[group_by]
+            return [label], np.zeros(n, dtype=np.intp)
+        if group_by == 'hour':
+            # Shift so the "unknown" hour (-1) lands in bucket 0
+            return [None] + list(range(24)), columns['hour'].astype(np.intp) + 1
+        if group_by == 'question_type':
+            return QUESTION_TYPES, columns['question_type'].astype(np.intp)
+        return SOURCES, columns['source'].astype(np.intp)
+
+    def sentiment_by(self, group_by, organizer_id=None, event_ids=None, date_from=None, date_to=None):
+        """Aggregate sentiment counts, average score and average rating per group"""
+        if group_by not in GROUP_BY_FIELDS:
+            raise ValueError(f"group_by must be one of {', '.join(GROUP_BY_FIELDS)}")
+
+        totals = {}
+        for meta, columns in self.iter_partitions(organizer_id, event_ids, date_from, date_to):
+            labels, codes = self._group_keys(group_by, meta, columns)
+            size = len(labels)
+
+            sentiment = columns['sentiment']
+            score = columns['sentiment_score']
+            rating = columns['rating']
+            has_score = ~np.isnan(score)
+            has_rating = ~np.isnan(rating)
+
+            partials = {
+                'count': np.bincount(codes, minlength=size),
+                'negative': np.bincount(codes[sentiment == 0], minlength=size),
+                'positive': np.bincount(codes[sentiment == 1], minlength=size),
+                'neutral': np.bincount(codes[sentiment == 2], minlength=size),
+                'score_sum': np.bincount(codes[has_score], weights=score[has_score], minlength=size),
+                'score_count': np.bincount(codes[has_score], minlength=size),
+                'rating_sum': np.bincount(codes[has_rating], weights=rating[has_rating], minlength=size),
+                'rating_count': np.bincount(codes[has_rating], minlength=size)
+            }
+
+            for i, label in enumerate(labels):
+                if not partials['count'][i]:
+                    continue
+                group = totals.setdefault(label, dict.fromkeys(partials, 0))
+                for key, values in partials.items():
+                    group[key] += values[i]
+
+        results = []
+        for label, group in totals.items():
+            results.append({
+                group_by: label,
+                'total_answers': int(group['count']),
+                'positive_count': int(group['positive']),
+                'negative_count': int(group['negative']),
+                'neutral_count': int(group['neutral']),
+                'avg_sentiment_score': round(float(group['score_sum'] / group['score_count']), 3) if group['score_count'] else None,
+                'avg_rating': round(float(group['rating_sum'] / group['rating_count']), 2) if group['rating_count'] else None
+            })
+
+        return sorted(results, key=lambda r: (r[group_by] is None, str(r[group_by])))
+
+
+# Initialize global analytics store
+analytics_store = AnalyticsStore()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Columnar analytics store for event sentiment')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    compact = subparsers.add_parser('compact', help='compact new rows into partitions')
+    compact.add_argument('--shard-mode', choices=['none', 'event', 'hash'], default=os.environ.get('SHARD_MODE', 'none'))
+    compact.add_argument('--shard-dir', default=os.environ.get('SHARD_DIR', 'shards'))
+    compact.add_argument('--shard-count', type=int, default=int(os.environ.get('SHARD_COUNT', '16')))
+    query = subparsers.add_parser('query', help='aggregate sentiment by a field')
+    query.add_argument('group_by', choices=GROUP_BY_FIELDS)
+    query.add_argument('--organizer', type=int)
+    query.add_argument('--date-from')
+    query.add_argument('--date-to')
+    args = parser.parse_args(argv)
+
+    if args.command == 'compact':
+        router = ShardRouter(analytics_store.db_path, args.shard_mode, args.shard_dir, args.shard_count)
+        print(f"Compacted {analytics_store.compact(router)} rows")
+    else:
+        rows = analytics_store.sentiment_by(args.group_by, organizer_id=args.organizer,
+                                            date_from=args.date_from, date_to=args.date_to)
+        for row in rows:
+            print(json.dumps(row))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,193 @@
+import argparse
+import csv
+import io
+import json
+import os
+import sqlite3
+import sys
+
+from storage import ShardRouter
+
+# Columns shared by every exported row, whichever table it came from
+EXPORT_COLUMNS = [
+    'source', 'id', 'event_id', 'question_id', 'question_text', 'question_type',
+    'answer_text', 'rating', 'attendee_name', 'attendee_email',
+    'sentiment', 'sentiment_score', 'sentiment_confidence', 'submitted_at'
+]
+
+EXPORT_QUERIES = [
+    '''
+        SELECT 'live_answers', la.id, la.event_id, la.live_question_id, lq.question_text, lq.question_type,
+               la.answer_text, la.rating, la.attendee_name, la.attendee_email,
+               la.sentiment, la.sentiment_score, la.sentiment_confidence, la.submitted_at
+        FROM live_answers la
+        LEFT JOIN live_questions lq ON la.live_question_id = lq.id
+        WHERE la.event_id = ?
+        ORDER BY la.id
+    ''',
+    '''
+        SELECT 'answers', a.id, a.event_id, a.question_id, q.question_text, q.question_type,
+               a.answer_text, a.rating, a.attendee_name, a.attendee_email,
+               a.sentiment, a.sentiment_score, a.sentiment_confidence, a.submitted_at
+        FROM answers a
+        LEFT JOIN questions q ON a.question_id = q.id
+        WHERE a.event_id = ?
+        ORDER BY a.id
+    ''',
+    '''
+        SELECT 'feedback', f.id, f.event_id, NULL, NULL, NULL,
+               f.comment, f.rating, f.attendee_name, NULL,
+               f.sentiment, f.sentiment_score, f.sentiment_confidence, f.submitted_at
+        FROM feedback f
+        WHERE f.event_id = ?
+        ORDER BY f.id
+    '''
+]
+
+DEFAULT_CHUNK_SIZE = 1000
+
+
+def iter_export_chunks(event_id, db_path='feedback_portal.db', chunk_size=DEFAULT_CHUNK_SIZE, connect=None):
+    """Yield lists of export rows for an event, reading each table incrementally
+
+    `connect(event_id)` overrides `db_path` when the event's answers live in a shard.
+    """
+    conn = connect(event_id) if connect else sqlite3.connect(db_path)
+    try:
+        for query in EXPORT_QUERIES:
+            c = conn.cursor()
+            c.execute(query, (event_id,))
+
+            # SQLite steps the statement lazily, so only one chunk is held at a time
+            while True:
+                rows = c.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield rows
+            c.close()
+    finally:
+        conn.close()
+
+
+def iter_csv(chunks):
+    """Encode row chunks as CSV text, one string per chunk"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    writer.writerow(EXPORT_COLUMNS)
+    yield buffer.getvalue()
+
+    for rows in chunks:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(rows)
+        yield buffer.getvalue()
+
+
+def iter_jsonl(chunks):
+    """Encode row chunks as JSON lines, one string per chunk"""
+    for rows in chunks:
+        yield ''.join(json.dumps(dict(zip(EXPORT_COLUMNS, row))) + '\n' for row in rows)
+
+
+EXPORT_FORMATS = {
+    'csv': (iter_csv, 'text/csv'),
+    'jsonl': (iter_jsonl, 'application/x-ndjson')
+}
+
+
+def write_parquet(chunks, output_path):
+    """Write row chunks to a Parquet file, one row group per chunk"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet export requires pyarrow (pip install pyarrow)")
+
+    schema = pa.schema([
+        ('source', pa.string()),
+        ('id', pa.int64()),
+        ('event_id', pa.int64()),
+        ('question_id', pa.int64()),
+        ('question_text', pa.string()),
+        ('question_type', pa.string()),
+        ('answer_text', pa.string()),
+        ('rating', pa.int64()),
+        ('attendee_name', pa.string()),
+        ('attendee_email', pa.string()),
+        ('sentiment', pa.string()),
+        ('sentiment_score', pa.float64()),
+        ('sentiment_confidence', pa.float64()),
+        ('submitted_at', pa.string())
+    ])
+
+    row_count = 0
+    with pq.ParquetWriter(output_path, schema) as writer:
+        for rows in chunks:
+            columns = list(zip(*rows))
+            arrays = []
+            for i, field in enumerate(schema):
+                values = columns[i]
+                # Ratings arrive as form strings on some rows
+                if field.type == pa.int64():
+                    values = [int(v) if v not in (None, '') else None for v in values]
+                elif field.type == pa.string():
+                    values = [str(v) if v is not None else None for v in values]
+                arrays.append(pa.array(values, type=field.type))
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            row_count += len(rows)
+
+    return row_count
+
+
+def export_event(event_id, output_path, export_format='csv', db_path='feedback_portal.db',
+                 chunk_size=DEFAULT_CHUNK_SIZE, connect=None):
+    """Export every answer, live answer and feedback row for an event to a file"""
+    chunks = iter_export_chunks(event_id, db_path, chunk_size, connect)
+
+    if export_format == 'parquet':
+        return write_parquet(chunks, output_path)
+
+    encoder = EXPORT_FORMATS[export_format][0]
+    row_count = 0
+
+    def counted(chunks):
+        nonlocal row_count
+        for rows in chunks:
+            row_count += len(rows)
+            yield rows
+
+    if output_path == '-':
+        for text in encoder(counted(chunks)):
+            sys.stdout.write(text)
+    else:
+        with open(output_path, 'w', newline='', encoding='utf-8') as f:
+            for text in encoder(counted(chunks)):
+                f.write(text)
+
+    return row_count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export an event's answers with sentiment")
+    parser.add_argument('event_id', type=int)
+    parser.add_argument('-f', '--format', choices=['csv', 'jsonl', 'parquet'], default='csv')
+    parser.add_argument('-o', '--output', default='-', help="output file ('-' for stdout, not for parquet)")
+    parser.add_argument('--db', default='feedback_portal.db')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--shard-mode', choices=['none', 'event', 'hash'], default=os.environ.get('SHARD_MODE', 'none'))
+    parser.add_argument('--shard-dir', default=os.environ.get('SHARD_DIR', 'shards'))
+    parser.add_argument('--shard-count', type=int, default=int(os.environ.get('SHARD_COUNT', '16')))
+    args = parser.parse_args(argv)
+
+    if args.format == 'parquet' and args.output == '-':
+        parser.error('parquet export needs an --output file')
+
+    router = ShardRouter(args.db, args.shard_mode, args.shard_dir, args.shard_count)
+    row_count = export_event(args.event_id, args.output, args.format, args.db, args.chunk_size,
+                             router.connect_event)
+    print(f"Exported {row_count} rows", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
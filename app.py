@@ -1,20 +1,166 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify
-from werkzeug.security import check_password_hash, generate_password_hash
+from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify, Response
+from markupsafe import Markup
 import sqlite3
 from datetime import datetime
+from collections import OrderedDict
 from flask_socketio import SocketIO, emit, join_room, leave_room
-from sentiment_analyzer import sentiment_analyzer
+from sentiment_analyzer import sentiment_analyzer, online_learner, SENTIMENT_LABELS, ModelNotReady
+from answer_export import iter_export_chunks, EXPORT_FORMATS
+from analytics_store import analytics_store, GROUP_BY_FIELDS
+from password_hashing import PasswordHashPool, PasswordHashBusy
+from live_state import LiveRoomRegistry, LiveQuestion, LiveAnswer
+from trending import SlidingTermCounter
+from event_archive import EventArchive, EVENT_STAT_QUERIES, create_archive_table
+from traffic_replay import TrafficRecorder
+from inference_scheduler import InferenceScheduler, parse_weights
+from sampling_profiler import SamplingProfiler, ProfilerBusy
+from dashboard_cache import DashboardSummaryCache
+from storage import (ShardRouter, create_event_tables, ensure_column, attendee_identity, live_answer_exists,
+                     add_live_answer_to_rollups, move_live_answer_in_rollups)
 import json
+import threading
+import os
+import gzip
+import hashlib
+import inspect
+import time
 
 app = Flask(__name__)
 app.secret_key = 'your-secret-key-change-this-in-production'
+
+# Serve attendee pages as prebuilt static shells that bootstrap over JSON
+app.config['ATTENDEE_STATIC_SHELLS'] = os.environ.get('ATTENDEE_STATIC_SHELLS', '0') == '1'
+app.config['ATTENDEE_SHELL_MAX_AGE'] = int(os.environ.get('ATTENDEE_SHELL_MAX_AGE', '86400'))
+# Public event details kept in memory for attendee pages: how many events, and for how many seconds
+app.config['ATTENDEE_EVENT_CACHE_SIZE'] = int(os.environ.get('ATTENDEE_EVENT_CACHE_SIZE', '1000'))
+app.config['ATTENDEE_EVENT_CACHE_SECONDS'] = int(os.environ.get('ATTENDEE_EVENT_CACHE_SECONDS', '60'))
+
+# Upper bound (seconds) a long-polling get_live_questions request may stay parked. Only
+# eventlet/gevent (or live_async.py) park polls cheaply; under threading, `wait` is ignored
+app.config['LIVE_POLL_MAX_WAIT'] = int(os.environ.get('LIVE_POLL_MAX_WAIT', '30'))
+
+# Seconds between analytics store compactions (0 disables the background job)
+app.config['ANALYTICS_COMPACT_INTERVAL'] = int(os.environ.get('ANALYTICS_COMPACT_INTERVAL', '300'))
+
+# Events dated more than ARCHIVE_AFTER_DAYS ago are moved to compressed files in ARCHIVE_DIR
+# every ARCHIVE_INTERVAL seconds (0 leaves archiving to `python event_archive.py archive`)
+app.config['ARCHIVE_DIR'] = os.environ.get('ARCHIVE_DIR', 'archive')
+app.config['ARCHIVE_AFTER_DAYS'] = int(os.environ.get('ARCHIVE_AFTER_DAYS', '90'))
+app.config['ARCHIVE_INTERVAL'] = int(os.environ.get('ARCHIVE_INTERVAL', '0'))
+
+# Update the sentiment model in the background from organizer corrections
+app.config['ONLINE_LEARNING'] = os.environ.get('ONLINE_LEARNING', '1') == '1'
+
+# Concurrent password hashes allowed during login, and how many may queue behind them
+app.config['PASSWORD_HASH_WORKERS'] = int(os.environ.get('PASSWORD_HASH_WORKERS', '2'))
+app.config['PASSWORD_HASH_MAX_PENDING'] = int(os.environ.get('PASSWORD_HASH_MAX_PENDING', '64'))
+
+# In-memory live rooms: how many events stay loaded and how many recent answers each keeps
+app.config['LIVE_ROOM_LIMIT'] = int(os.environ.get('LIVE_ROOM_LIMIT', '500'))
+app.config['LIVE_ROOM_ANSWERS'] = int(os.environ.get('LIVE_ROOM_ANSWERS', '200'))
+# Most positive / most negative answers kept per live question for the drill-down
+app.config['LIVE_TOP_ANSWERS'] = int(os.environ.get('LIVE_TOP_ANSWERS', '5'))
+# Each live question's filter of attendees who already answered it: the attendee count it is
+# first sized for (it grows past that) and its false positive rate, i.e. the share of first
+# answers that still need a database lookup
+app.config['LIVE_ANSWER_FILTER_CAPACITY'] = int(os.environ.get('LIVE_ANSWER_FILTER_CAPACITY', '1000'))
+app.config['LIVE_ANSWER_FILTER_ERROR_RATE'] = float(os.environ.get('LIVE_ANSWER_FILTER_ERROR_RATE', '0.01'))
+
+# Trending terms per live event: sliding window, its bucket count, terms tracked per
+# bucket and sentiment, and the minimum seconds between Socket.IO pushes (0 window disables)
+app.config['TRENDING_WINDOW'] = int(os.environ.get('TRENDING_WINDOW', '600'))
+app.config['TRENDING_BUCKETS'] = int(os.environ.get('TRENDING_BUCKETS', '10'))
+app.config['TRENDING_CAPACITY'] = int(os.environ.get('TRENDING_CAPACITY', '50'))
+app.config['TRENDING_EMIT_INTERVAL'] = float(os.environ.get('TRENDING_EMIT_INTERVAL', '5'))
+
+# Sentiment inference workers shared by all requests. Batch work (rescoring) may hold at most
+# INFERENCE_BATCH_WORKERS of them and pauses while live answers' queue-wait p99 exceeds the budget;
+# INFERENCE_EVENT_WEIGHTS ('event_id:weight,...') gives events a larger round-robin share
+app.config['INFERENCE_WORKERS'] = int(os.environ.get('INFERENCE_WORKERS', '2'))
+app.config['INFERENCE_BATCH_WORKERS'] = int(os.environ.get('INFERENCE_BATCH_WORKERS', '1'))
+app.config['INFERENCE_LIVE_BUDGET_MS'] = float(os.environ.get('INFERENCE_LIVE_BUDGET_MS', '50'))
+app.config['INFERENCE_EVENT_WEIGHTS'] = os.environ.get('INFERENCE_EVENT_WEIGHTS', '')
+
+# Organizer emails allowed to run the sampling profiler (comma-separated), and its longest run;
+# these accounts are not auto-registered at login and must be created by an operator
+app.config['PROFILER_ADMINS'] = {email.strip().lower() for email in os.environ.get('PROFILER_ADMINS', '').split(',')
+                                 if email.strip()}
+app.config['PROFILER_MAX_SECONDS'] = int(os.environ.get('PROFILER_MAX_SECONDS', '60'))
+
+# Organizers whose dashboard summaries stay in memory
+app.config['DASHBOARD_CACHE_ORGANIZERS'] = int(os.environ.get('DASHBOARD_CACHE_ORGANIZERS', '1000'))
+# Longest a cached summary is served before a full rebuild; writes made by other workers,
+# live_async.py or the archive job don't mark this process's entries dirty
+app.config['DASHBOARD_CACHE_SECONDS'] = float(os.environ.get('DASHBOARD_CACHE_SECONDS', '30'))
+
+# Where live_answers, answers and feedback live: 'none' (catalog db), 'event' or 'hash' shards
+app.config['SHARD_MODE'] = os.environ.get('SHARD_MODE', 'none')
+app.config['SHARD_DIR'] = os.environ.get('SHARD_DIR', 'shards')
+app.config['SHARD_COUNT'] = int(os.environ.get('SHARD_COUNT', '16'))
+
+# Append anonymized requests and Socket.IO events to this JSONL file for traffic_replay.py
+# (empty disables); free text keeps model vocabulary words only ('vocab'), none ('mask') or all ('keep')
+app.config['TRAFFIC_CAPTURE'] = os.environ.get('TRAFFIC_CAPTURE', '')
+app.config['TRAFFIC_CAPTURE_TEXT'] = os.environ.get('TRAFFIC_CAPTURE_TEXT', 'vocab')
+
 socketio = SocketIO(app, cors_allowed_origins="*")
 
+def make_trend_counter():
+    return SlidingTermCounter(app.config['TRENDING_WINDOW'], app.config['TRENDING_BUCKETS'],
+                              app.config['TRENDING_CAPACITY'])
+
+storage = ShardRouter(mode=app.config['SHARD_MODE'],
+                      shard_dir=app.config['SHARD_DIR'],
+                      shard_count=app.config['SHARD_COUNT'])
+event_archive = EventArchive(storage, archive_dir=app.config['ARCHIVE_DIR'])
+
+_capture_vocabulary = [None, None]
+
+def sentiment_vocabulary():
+    """Words a traffic capture may keep: the published model's vocabulary and stop words"""
+    try:
+        vectorizer = sentiment_analyzer.snapshot()[0]
+    except ModelNotReady:
+        return None
+    if _capture_vocabulary[0] is not vectorizer:
+        vocabulary = getattr(vectorizer, 'vocabulary_', None)
+        words = None
+        if vocabulary is not None:
+            words = frozenset(vocabulary) | frozenset(vectorizer.get_stop_words() or ())
+        _capture_vocabulary[:] = [vectorizer, words]
+    return _capture_vocabulary[1]
+
+traffic_recorder = TrafficRecorder(app.config['TRAFFIC_CAPTURE'], app.config['TRAFFIC_CAPTURE_TEXT'],
+                                   vocabulary=sentiment_vocabulary)
+live_rooms = LiveRoomRegistry(connect=storage.connect_event,
+                              max_rooms=app.config['LIVE_ROOM_LIMIT'],
+                              answer_capacity=app.config['LIVE_ROOM_ANSWERS'],
+                              top_k=app.config['LIVE_TOP_ANSWERS'],
+                              trend_factory=make_trend_counter if app.config['TRENDING_WINDOW'] > 0 else None,
+                              extract_terms=sentiment_analyzer.extract_terms,
+                              filter_capacity=app.config['LIVE_ANSWER_FILTER_CAPACITY'],
+                              filter_error_rate=app.config['LIVE_ANSWER_FILTER_ERROR_RATE'])
+password_hasher = PasswordHashPool(max_workers=app.config['PASSWORD_HASH_WORKERS'],
+                                   max_pending=app.config['PASSWORD_HASH_MAX_PENDING'],
+                                   sleep=socketio.sleep)
+# Train or load the sentiment model on startup, before any request can score text
+sentiment_analyzer.initialize()
+
+inference = InferenceScheduler(sentiment_analyzer,
+                               workers=app.config['INFERENCE_WORKERS'],
+                               batch_workers=app.config['INFERENCE_BATCH_WORKERS'],
+                               live_budget_ms=app.config['INFERENCE_LIVE_BUDGET_MS'],
+                               weights=parse_weights(app.config['INFERENCE_EVENT_WEIGHTS']),
+                               sleep=None if socketio.async_mode == 'threading' else socketio.sleep)
+
 # Database setup (you can replace this with your preferred database)
 def init_db():
     conn = sqlite3.connect('feedback_portal.db')
     c = conn.cursor()
     
+    # WAL lets long readers (exports, dashboards) run without blocking answer inserts
+    c.execute('PRAGMA journal_mode=WAL')
+    
     # Create organizers table
     c.execute('''
         CREATE TABLE IF NOT EXISTS organizers (
@@ -42,18 +188,8 @@ def init_db():
         )
     ''')
     
-    # Create feedback table
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS feedback (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            event_id INTEGER,
-            rating INTEGER,
-            comment TEXT,
-            attendee_name TEXT,
-            submitted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (event_id) REFERENCES events (id)
-        )
-    ''')
+    # Create feedback, answers and live_answers (shared with the per-event shards)
+    create_event_tables(c)
     
     # Create questions table
     c.execute('''
@@ -68,22 +204,6 @@ def init_db():
         )
     ''')
     
-    # Create answers table
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS answers (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            question_id INTEGER,
-            event_id INTEGER,
-            answer_text TEXT,
-            rating INTEGER,
-            attendee_name TEXT,
-            attendee_email TEXT,
-            submitted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (question_id) REFERENCES questions (id),
-            FOREIGN KEY (event_id) REFERENCES events (id)
-        )
-    ''')
-    
     # Create live_questions table
     c.execute('''
         CREATE TABLE IF NOT EXISTS live_questions (
@@ -92,27 +212,34 @@ def init_db():
             question_text TEXT NOT NULL,
             question_type TEXT DEFAULT 'text',
             is_active INTEGER DEFAULT 1,
+            revision INTEGER DEFAULT 0,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             FOREIGN KEY (event_id) REFERENCES events (id)
         )
     ''')
     
-    # Create live_answers table
+    # Per-event change counter used as the delta sync cursor
+    if ensure_column(c, 'live_questions', 'revision', 'INTEGER DEFAULT 0'):
+        c.execute('UPDATE live_questions SET revision = id')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_live_questions_revision ON live_questions (event_id, revision)')
+    
+    # Summaries of events whose answers were moved to archive files
+    create_archive_table(c)
+    
+    # Create sentiment_corrections table (organizer relabels of live answers)
     c.execute('''
-        CREATE TABLE IF NOT EXISTS live_answers (
+        CREATE TABLE IF NOT EXISTS sentiment_corrections (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
-            live_question_id INTEGER,
+            live_answer_id INTEGER,
             event_id INTEGER,
+            organizer_id INTEGER,
             answer_text TEXT,
-            rating INTEGER,
-            attendee_name TEXT,
-            attendee_email TEXT,
-            sentiment TEXT,
-            sentiment_score REAL,
-            sentiment_confidence REAL,
-            submitted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (live_question_id) REFERENCES live_questions (id),
-            FOREIGN KEY (event_id) REFERENCES events (id)
+            original_sentiment TEXT,
+            corrected_sentiment TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (live_answer_id) REFERENCES live_answers (id),
+            FOREIGN KEY (event_id) REFERENCES events (id),
+            FOREIGN KEY (organizer_id) REFERENCES organizers (id)
         )
     ''')
     
@@ -128,6 +255,14 @@ def init_db():
 # Initialize database when app starts
 init_db()
 
+# Record each request for load replay when TRAFFIC_CAPTURE is on
+@app.before_request
+def capture_traffic():
+    if traffic_recorder.enabled and request.endpoint != 'static':
+        endpoint = request.url_rule.rule if request.url_rule else request.path
+        traffic_recorder.http(request.method, endpoint, request.path, request.args, request.form,
+                              session.get('user_id'))
+
 # Home page route
 @app.route('/')
 def home():
@@ -150,23 +285,38 @@ def login():
     c.execute('SELECT id, password_hash, name FROM organizers WHERE email = ?', (email,))
     user = c.fetchone()
     
+    # Don't hold the connection while the password is hashed
+    conn.close()
+    
+    # Admin emails are never auto-registered, or whoever signs in first would get admin access
+    if not user and email.lower() in app.config['PROFILER_ADMINS']:
+        flash('No account exists for this email', 'error')
+        return redirect(url_for('home'))
+    
+    try:
+        if user:
+            password_ok = password_hasher.check(user[1], password)
+        else:
+            password_hash = password_hasher.generate(password)
+    except PasswordHashBusy:
+        flash('Too many sign-ins right now, please try again in a moment', 'error')
+        return redirect(url_for('home'))
+    
     if user:
         # User exists, check password
-        if check_password_hash(user[1], password):
+        if password_ok:
             session['user_id'] = user[0]
             session['user_name'] = user[2]
             session['user_email'] = email
             flash('Login successful!', 'success')
-            conn.close()
             return redirect(url_for('dashboard'))
         else:
             flash('Invalid password', 'error')
-            conn.close()
             return redirect(url_for('home'))
     else:
         # User does not exist → auto-register
-        from werkzeug.security import generate_password_hash
-        password_hash = generate_password_hash(password)
+        conn = sqlite3.connect('feedback_portal.db')
+        c = conn.cursor()
         c.execute('INSERT INTO organizers (email, password_hash, name) VALUES (?, ?, ?)',
                   (email, password_hash, 'Auto User'))
         conn.commit()
@@ -182,100 +332,111 @@ def login():
         return redirect(url_for('dashboard'))
 
 
-# Organizer dashboard
-@app.route('/dashboard')
-def dashboard():
-    if 'user_id' not in session:
-        flash('Please log in first', 'error')
-        return redirect(url_for('home'))
-    
-    # Get organizer's events and feedback stats
+def load_dashboard_events(organizer_id):
     conn = sqlite3.connect('feedback_portal.db')
     c = conn.cursor()
-    
-    # Get events for this organizer with comprehensive statistics
     c.execute('''
         SELECT e.id, e.name, e.date, e.time, e.venue, e.qr_code, e.created_at
         FROM events e
         WHERE e.organizer_id = ?
         ORDER BY e.created_at DESC
-    ''', (session['user_id'],))
-    
+    ''', (organizer_id,))
     events_data = c.fetchall()
-    events = []
-    
-    for event in events_data:
-        event_id = event[0]
-        
-        # Get regular feedback count and average rating
-        c.execute('''
-            SELECT COUNT(id) as feedback_count, AVG(rating) as avg_rating
-            FROM feedback 
-            WHERE event_id = ?
-        ''', (event_id,))
-        regular_feedback = c.fetchone()
-        
-        # Get live answers count and average rating
-        c.execute('''
-            SELECT COUNT(id) as live_count, AVG(rating) as live_avg_rating
-            FROM live_answers 
-            WHERE event_id = ?
-        ''', (event_id,))
-        live_feedback = c.fetchone()
-        
-        # Get sentiment statistics
-        c.execute('''
-            SELECT 
-                COUNT(*) as total_answers,
-                SUM(CASE WHEN sentiment = 'positive' THEN 1 ELSE 0 END) as positive_count,
-                SUM(CASE WHEN sentiment = 'negative' THEN 1 ELSE 0 END) as negative_count,
-                SUM(CASE WHEN sentiment = 'neutral' THEN 1 ELSE 0 END) as neutral_count,
-                AVG(sentiment_score) as avg_sentiment_score,
-                AVG(sentiment_confidence) as avg_confidence
-            FROM live_answers 
-            WHERE event_id = ?
-        ''', (event_id,))
-        sentiment_stats = c.fetchone()
-        
-        # Calculate combined statistics
-        total_feedback = (regular_feedback[0] or 0) + (live_feedback[0] or 0)
-        
-        # Calculate weighted average rating
-        regular_rating = regular_feedback[1] or 0
-        live_rating = live_feedback[1] or 0
-        regular_count = regular_feedback[0] or 0
-        live_count = live_feedback[0] or 0
-        
-        if total_feedback > 0:
-            avg_rating = ((regular_rating * regular_count) + (live_rating * live_count)) / total_feedback
-        else:
-            avg_rating = None
-        
-        events.append({
-            'id': event[0],
-            'name': event[1],
-            'date': event[2],
-            'time': event[3],
-            'venue': event[4],
-            'qr_code': event[5],
-            'created_at': event[6],
-            'feedback_count': total_feedback,
-            'avg_rating': avg_rating,
-            'regular_feedback_count': regular_feedback[0] or 0,
-            'live_feedback_count': live_feedback[0] or 0,
-            'sentiment_stats': {
-                'total_answers': sentiment_stats[0] or 0,
-                'positive_count': sentiment_stats[1] or 0,
-                'negative_count': sentiment_stats[2] or 0,
-                'neutral_count': sentiment_stats[3] or 0,
-                'avg_sentiment_score': sentiment_stats[4] or 0,
-                'avg_confidence': sentiment_stats[5] or 0
-            }
-        })
-    
     conn.close()
+    return events_data
+
+def load_dashboard_stats(event_ids):
+    """{event_id: {stat name: row}} for the EVENT_STAT_QUERIES of the given events"""
+    # Per-event statistics come from whichever shard holds each event, one grouped query per shard
+    stats = {name: storage.aggregate_by_event(event_ids, query) for name, query in EVENT_STAT_QUERIES.items()}
+    
+    # Archived events show the numbers saved when their answers were archived
+    for event_id, summary in event_archive.summaries(event_ids).items():
+        for name, row in summary.items():
+            if row:
+                stats[name][event_id] = tuple(row)
+    
+    by_event = {}
+    for name, rows in stats.items():
+        for event_id, row in rows.items():
+            by_event.setdefault(event_id, {})[name] = row
+    return by_event
+
+def dashboard_entry(event, stats):
+    """One event's dashboard row: feedback counts, weighted average rating and sentiment breakdown"""
+    stats = stats or {}
+    regular_feedback = stats.get('feedback', (0, None))
+    live_feedback = stats.get('live', (0, None))
+    sentiment_stats = stats.get('sentiment', (0, 0, 0, 0, None, None))
+    
+    # Calculate combined statistics
+    total_feedback = (regular_feedback[0] or 0) + (live_feedback[0] or 0)
+    
+    # Calculate weighted average rating
+    regular_rating = regular_feedback[1] or 0
+    live_rating = live_feedback[1] or 0
+    regular_count = regular_feedback[0] or 0
+    live_count = live_feedback[0] or 0
+    
+    if total_feedback > 0:
+        avg_rating = ((regular_rating * regular_count) + (live_rating * live_count)) / total_feedback
+    else:
+        avg_rating = None
+    
+    entry = {
+        'id': event[0],
+        'name': event[1],
+        'date': event[2],
+        'time': event[3],
+        'venue': event[4],
+        'qr_code': event[5],
+        'created_at': event[6],
+        'feedback_count': total_feedback,
+        'avg_rating': avg_rating,
+        'regular_feedback_count': regular_feedback[0] or 0,
+        'live_feedback_count': live_feedback[0] or 0,
+        'sentiment_stats': {
+            'total_answers': sentiment_stats[0] or 0,
+            'positive_count': sentiment_stats[1] or 0,
+            'negative_count': sentiment_stats[2] or 0,
+            'neutral_count': sentiment_stats[3] or 0,
+            'avg_sentiment_score': sentiment_stats[4] or 0,
+            'avg_confidence': sentiment_stats[5] or 0
+        }
+    }
+    # Rendered once here, so a dashboard load only pastes the cached cards together
+    entry['card'] = Markup(render_template('dashboard_event_card.html', event=entry))
+    return entry
+
+def dashboard_totals(events):
+    """Figures for the dashboard's overview cards"""
+    ratings = [event['avg_rating'] for event in events if event['avg_rating'] is not None]
+    return {
+        'events': len(events),
+        'feedback_count': sum(event['feedback_count'] for event in events),
+        'avg_rating': sum(ratings) / len(ratings) if ratings else None,
+        'events_with_feedback': sum(1 for event in events if event['feedback_count'] > 0),
+        'live_feedback_count': sum(event['live_feedback_count'] for event in events),
+        'total_answers': sum(event['sentiment_stats']['total_answers'] for event in events),
+        'positive_count': sum(event['sentiment_stats']['positive_count'] for event in events)
+    }
+
+# Organizers' dashboard rows; the answer, feedback and live answer write paths mark their event dirty
+dashboard_cache = DashboardSummaryCache(load_dashboard_events, load_dashboard_stats, dashboard_entry,
+                                        dashboard_totals, max_organizers=app.config['DASHBOARD_CACHE_ORGANIZERS'],
+                                        max_age=app.config['DASHBOARD_CACHE_SECONDS'])
+
+# Organizer dashboard
+@app.route('/dashboard')
+def dashboard():
+    if 'user_id' not in session:
+        flash('Please log in first', 'error')
+        return redirect(url_for('home'))
+    
+    # Get organizer's events with feedback and sentiment statistics
+    events, totals = dashboard_cache.load(session['user_id'])
     
-    return render_template('dashboard.html', events=events, user_name=session.get('user_name'))
+    return render_template('dashboard.html', events=events, totals=totals, user_name=session.get('user_name'))
 
 
 
@@ -305,6 +466,7 @@ def create_event():
             ''', (event_name, event_date, event_time, venue, organizer_name, session['user_id'], qr_code))
             conn.commit()
             conn.close()
+            dashboard_cache.events_changed(session['user_id'])
             
             flash(f'Event "{event_name}" created successfully! QR Code: {qr_code}', 'success')
             return redirect(url_for('dashboard'))
@@ -319,28 +481,209 @@ def create_event():
 def qr_scanner():
     return render_template('qr_scanner.html')
 
+# Static attendee shells - rendered once per process, served compressed and cacheable
+_attendee_shells = {}
+# (column, value) -> (cached at, event row), least recently used first
+_attendee_event_cache = OrderedDict()
+_attendee_event_lock = threading.Lock()
+
+def get_attendee_shell(template_name):
+    """Render an attendee page without event data once and keep it compressed in memory"""
+    shell = _attendee_shells.get(template_name)
+    if shell is None:
+        html = render_template(template_name, shell=True).encode('utf-8')
+        shell = {
+            'body': html,
+            'gzip': gzip.compress(html, 9),
+            'etag': hashlib.sha1(html).hexdigest()
+        }
+        _attendee_shells[template_name] = shell
+    return shell
+
+def serve_attendee_shell(template_name):
+    """Serve a static attendee shell with long-lived cache headers"""
+    shell = get_attendee_shell(template_name)
+    use_gzip = 'gzip' in request.headers.get('Accept-Encoding', '')
+    
+    response = app.response_class(shell['gzip'] if use_gzip else shell['body'], mimetype='text/html')
+    if use_gzip:
+        response.headers['Content-Encoding'] = 'gzip'
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.cache_control.public = True
+    response.cache_control.max_age = app.config['ATTENDEE_SHELL_MAX_AGE']
+    response.set_etag(shell['etag'] + ('-gz' if use_gzip else ''))
+    
+    return response.make_conditional(request)
+
+def get_attendee_event(column, value):
+    """Look up the public event details attendees see, cached per process
+
+    Entries expire after ATTENDEE_EVENT_CACHE_SECONDS. No route edits or
+    deletes an event yet; one that does should drop its entries here.
+    """
+    key = (column, value)
+    now = time.monotonic()
+    with _attendee_event_lock:
+        cached = _attendee_event_cache.get(key)
+        if cached is not None and now - cached[0] < app.config['ATTENDEE_EVENT_CACHE_SECONDS']:
+            _attendee_event_cache.move_to_end(key)
+            return cached[1]
+    
+    conn = sqlite3.connect('feedback_portal.db')
+    c = conn.cursor()
+    c.execute(f'SELECT id, name, date, time, venue, organizer_name FROM events WHERE {column} = ?', (value,))
+    event = c.fetchone()
+    conn.close()
+    
+    with _attendee_event_lock:
+        # Only cache hits so newly created events are picked up
+        if event:
+            _attendee_event_cache[key] = (now, event)
+            _attendee_event_cache.move_to_end(key)
+            while len(_attendee_event_cache) > app.config['ATTENDEE_EVENT_CACHE_SIZE']:
+                _attendee_event_cache.popitem(last=False)
+        else:
+            _attendee_event_cache.pop(key, None)
+    return event
+
+def fetch_live_question_changes(c, event_id, since):
+    """Get live questions added or deactivated after the given revision"""
+    c.execute('''
+        SELECT id, question_text, question_type, created_at, is_active, revision
+        FROM live_questions 
+        WHERE event_id = ? AND revision > ?
+        ORDER BY revision
+    ''', (event_id, since))
+    rows = c.fetchall()
+    
+    questions = [
+        {
+            'question_id': q[0],
+            'question_text': q[1],
+            'question_type': q[2],
+            'created_at': q[3]
+        } for q in rows if q[4]
+    ]
+    removed = [q[0] for q in rows if not q[4]]
+    cursor = rows[-1][5] if rows else since
+    
+    return questions, removed, cursor
+
+# Long-poll waiters - one event object per event_id, replaced after every change
+_live_question_waiters = {}
+
+def get_live_question_waiter(event_id):
+    """Get the wait handle that is set on the next live question change for an event"""
+    waiter = _live_question_waiters.get(event_id)
+    if waiter is None:
+        # Uses the Socket.IO async model, so under eventlet/gevent a parked
+        # request is a suspended green thread rather than a blocked OS thread
+        waiter = socketio.server.eio.create_event()
+        waiter = _live_question_waiters.setdefault(event_id, waiter)
+    return waiter
+
+# Extra callbacks run on every live question change (the asyncio server wakes its own waiters)
+live_question_listeners = []
+
+def notify_live_questions_changed(event_id):
+    """Wake every long-polling request waiting on this event"""
+    waiter = _live_question_waiters.pop(event_id, None)
+    if waiter is not None:
+        waiter.set()
+    for listener in live_question_listeners:
+        listener(event_id)
+
+# Set by live_async.py when the asyncio server owns the Socket.IO connections
+room_emitter = None
+
+def broadcast(event, payload, event_id):
+    """Send a Socket.IO event to every client in an event's room"""
+    if room_emitter is not None:
+        room_emitter(event, payload, event_id)
+    else:
+        socketio.emit(event, payload, room=f'event_{event_id}')
+
+def attendee_bootstrap(event):
+    """Build the single JSON payload a static attendee shell needs to render"""
+    if not event:
+        return jsonify({'error': 'Event not found'}), 404
+    
+    room = live_rooms.get(event[0])
+    
+    response = jsonify({
+        'event': {
+            'id': event[0],
+            'name': event[1],
+            'date': event[2],
+            'time': event[3],
+            'venue': event[4],
+            'organizer_name': event[5]
+        },
+        'questions': [question.to_payload() for question in room.active_questions()],
+        'cursor': room.cursor
+    })
+    response.cache_control.no_cache = True
+    return response
+
 # QR code event page - shows questions for attendees
 @app.route('/event/<qr_code>')
 def event_page(qr_code):
+    if app.config['ATTENDEE_STATIC_SHELLS']:
+        return serve_attendee_shell('event_page.html')
+    
     # Get event details from QR code
-    conn = sqlite3.connect('feedback_portal.db')
-    c = conn.cursor()
-    c.execute('SELECT id, name, date, time, venue, organizer_name FROM events WHERE qr_code = ?', (qr_code,))
-    event = c.fetchone()
+    event = get_attendee_event('qr_code', qr_code)
     
     if not event:
-        conn.close()
         flash('Invalid QR code. Please check the code and try again.', 'error')
         return redirect(url_for('qr_scanner'))
     
-    conn.close()
-    
-    return render_template('event_page.html', event=event, qr_code=qr_code)
+    return render_template('event_page.html', event=event, qr_code=qr_code, shell=False)
+
+@app.route('/api/event_bootstrap/<qr_code>')
+def event_bootstrap(qr_code):
+    """Event details and live questions for the static event page shell"""
+    return attendee_bootstrap(get_attendee_event('qr_code', qr_code))
+
+@app.route('/api/live_bootstrap/<int:event_id>')
+def live_bootstrap(event_id):
+    """Event details and live questions for the static live feedback shell"""
+    return attendee_bootstrap(get_attendee_event('id', event_id))
+
+# Per-event question metadata for submit_answers, dropped when questions change
+_event_question_maps = {}
+
+def get_event_question_map(event_id, refresh=False):
+    """Get {question_id: question_type} for an event, cached in process"""
+    questions = None if refresh else _event_question_maps.get(event_id)
+    if questions is None:
+        conn = sqlite3.connect('feedback_portal.db')
+        c = conn.cursor()
+        c.execute('SELECT id, question_type FROM questions WHERE event_id = ?', (event_id,))
+        questions = dict(c.fetchall())
+        conn.close()
+        _event_question_maps[event_id] = questions
+    return questions
+
+def store_submission(conn, answer_rows, feedback_row=None):
+    """Insert one form submission in a single short transaction"""
+    with conn:
+        conn.executemany('''
+            INSERT INTO answers (question_id, event_id, answer_text, rating, attendee_name, attendee_email,
+                                 sentiment, sentiment_score, sentiment_confidence)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', answer_rows)
+        if feedback_row:
+            conn.execute('''
+                INSERT INTO feedback (event_id, rating, comment, attendee_name,
+                                      sentiment, sentiment_score, sentiment_confidence)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', feedback_row)
 
 # Submit answers from event page
 @app.route('/submit_answers', methods=['POST'])
 def submit_answers():
-    event_id = request.form.get('event_id')
+    event_id = request.form.get('event_id', type=int)
     attendee_name = request.form.get('attendee_name', '')
     attendee_email = request.form.get('attendee_email', '')
     
@@ -348,32 +691,62 @@ def submit_answers():
         flash('Invalid event', 'error')
         return redirect(url_for('home'))
     
-    conn = sqlite3.connect('feedback_portal.db')
-    c = conn.cursor()
-    
-    # Get all questions for this event
-    c.execute('SELECT id, question_type FROM questions WHERE event_id = ?', (event_id,))
-    questions = c.fetchall()
-    
-    # Process each answer
-    for question_id, question_type in questions:
-        answer_key = f'answer_{question_id}'
-        answer_value = request.form.get(answer_key)
-        
-        if answer_value:  # Only save non-empty answers
-            if question_type == 'rating':
-                c.execute('''
-                    INSERT INTO answers (question_id, event_id, rating, attendee_name, attendee_email)
-                    VALUES (?, ?, ?, ?, ?)
-                ''', (question_id, event_id, int(answer_value), attendee_name, attendee_email))
-            else:
-                c.execute('''
-                    INSERT INTO answers (question_id, event_id, answer_text, attendee_name, attendee_email)
-                    VALUES (?, ?, ?, ?, ?)
-                ''', (question_id, event_id, answer_value, attendee_name, attendee_email))
-    
-    conn.commit()
+    # Get all questions for this event; reload if the form answers one we haven't cached
+    questions = get_event_question_map(event_id)
+    answered_ids = [int(key[len('answer_'):]) for key in request.form
+                    if key.startswith('answer_') and key[len('answer_'):].isdigit()]
+    if any(question_id not in questions for question_id in answered_ids):
+        questions = get_event_question_map(event_id, refresh=True)
+    
+    # Collect non-empty answers and any overall feedback comment
+    submitted = [
+        (question_id, question_type, request.form.get(f'answer_{question_id}'))
+        for question_id, question_type in questions.items()
+        if request.form.get(f'answer_{question_id}')
+    ]
+    comment = request.form.get('comment', '')
+    feedback_rating = request.form.get('rating')
+    
+    # Ratings must be whole numbers; reject the form before any inference or write
+    try:
+        ratings = {question_id: int(value) for question_id, question_type, value in submitted
+                   if question_type == 'rating'}
+        feedback_rating = int(feedback_rating) if feedback_rating else None
+    except ValueError:
+        flash('Ratings must be whole numbers', 'error')
+        return render_template('index.html'), 400
+    
+    # Score every text answer plus the comment in one batched inference call
+    texts = [value for _, question_type, value in submitted if question_type != 'rating']
+    if comment:
+        texts.append(comment)
+    sentiments = iter(inference.analyze_batch(texts, event_id, priority='forms')) if texts else iter(())
+    
+    # Build every answer row up front so the transaction only does inserts
+    answer_rows = []
+    for question_id, question_type, answer_value in submitted:
+        if question_type == 'rating':
+            answer_rows.append((question_id, event_id, None, ratings[question_id],
+                                attendee_name, attendee_email, None, None, None))
+        else:
+            sentiment_result = next(sentiments)
+            answer_rows.append((question_id, event_id, answer_value, None, attendee_name, attendee_email,
+                                sentiment_result['sentiment'], sentiment_result['score'],
+                                sentiment_result['confidence']))
+    
+    # Save overall feedback if the form included it
+    feedback_row = None
+    if comment or feedback_rating is not None:
+        sentiment_result = next(sentiments) if comment else {'sentiment': None, 'score': None, 'confidence': None}
+        feedback_row = (event_id, feedback_rating, comment, attendee_name,
+                        sentiment_result['sentiment'], sentiment_result['score'], sentiment_result['confidence'])
+    
+    conn = storage.connect_event(event_id)
+    store_submission(conn, answer_rows, feedback_row)
+    # Answers to an archived event bring its archived rows back, so the dashboard counts both
+    event_archive.ensure_hot(event_id, conn)
     conn.close()
+    dashboard_cache.mark_dirty(event_id)
     
     return render_template('thank_you.html')
 
@@ -383,7 +756,7 @@ def manage_event(event_id):
     if 'user_id' not in session:
         return redirect(url_for('home'))
     
-    conn = sqlite3.connect('feedback_portal.db')
+    conn = storage.connect_event(event_id)
     c = conn.cursor()
     
     # Check if this event belongs to the logged-in organizer
@@ -399,6 +772,8 @@ def manage_event(event_id):
         flash('Event not found or access denied', 'error')
         return redirect(url_for('dashboard'))
     
+    event_archive.ensure_hot(event_id)
+    
     # Get questions for this event
     c.execute('''
         SELECT id, question_text, question_type, is_required, created_at
@@ -449,6 +824,8 @@ def add_question(event_id):
     conn.commit()
     conn.close()
     
+    _event_question_maps.pop(event_id, None)
+    
     flash('Question added successfully!', 'success')
     return redirect(url_for('manage_event', event_id=event_id))
 
@@ -458,7 +835,7 @@ def view_answers(event_id):
     if 'user_id' not in session:
         return redirect(url_for('home'))
     
-    conn = sqlite3.connect('feedback_portal.db')
+    conn = storage.connect_event(event_id)
     c = conn.cursor()
     
     # Check if this event belongs to the logged-in organizer
@@ -471,6 +848,9 @@ def view_answers(event_id):
         flash('Event not found or access denied', 'error')
         return redirect(url_for('dashboard'))
     
+    # Opening an archived event brings its answers back into the hot tables
+    event_archive.ensure_hot(event_id)
+    
     # Get all answers with question details
     c.execute('''
         SELECT q.question_text, q.question_type, a.answer_text, a.rating,
@@ -507,6 +887,36 @@ def view_answers(event_id):
                          submissions=submissions.values(),
                          event_id=event_id)
 
+# Stream an event's answers, live answers and feedback as CSV or JSONL
+@app.route('/export_answers/<int:event_id>')
+def export_answers(event_id):
+    if 'user_id' not in session:
+        return redirect(url_for('home'))
+    
+    export_format = request.args.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': 'Unsupported export format'}), 400
+    
+    conn = sqlite3.connect('feedback_portal.db')
+    c = conn.cursor()
+    
+    # Check if this event belongs to the logged-in organizer
+    c.execute('SELECT name FROM events WHERE id = ? AND organizer_id = ?', 
+              (event_id, session['user_id']))
+    event = c.fetchone()
+    conn.close()
+    
+    if not event:
+        flash('Event not found or access denied', 'error')
+        return redirect(url_for('dashboard'))
+    
+    event_archive.ensure_hot(event_id)
+    
+    encoder, mimetype = EXPORT_FORMATS[export_format]
+    response = Response(encoder(iter_export_chunks(event_id, connect=storage.connect_event)), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename=event_{event_id}_answers.{export_format}'
+    return response
+
 # Logout
 @app.route('/logout')
 def logout():
@@ -567,10 +977,6 @@ def live_questions(event_id):
     if 'user_id' not in session:
         return redirect(url_for('home'))
     
-    # Debug: Print session info
-    print(f"DEBUG: Session user_id: {session.get('user_id')}")
-    print(f"DEBUG: Session user_name: {session.get('user_name')}")
-    
     conn = sqlite3.connect('feedback_portal.db')
     c = conn.cursor()
     
@@ -578,41 +984,19 @@ def live_questions(event_id):
     c.execute('SELECT name FROM events WHERE id = ? AND organizer_id = ?', 
               (event_id, session['user_id']))
     event = c.fetchone()
-    
-    print(f"DEBUG: Event lookup result: {event}")
+    conn.close()
     
     if not event:
-        conn.close()
         flash('Event not found or access denied', 'error')
         return redirect(url_for('dashboard'))
     
-    # Get live questions
-    c.execute('''
-        SELECT id, question_text, question_type, is_active, created_at
-        FROM live_questions 
-        WHERE event_id = ? 
-        ORDER BY created_at DESC
-    ''', (event_id,))
-    live_questions = c.fetchall()
+    # Opening an archived event brings its answers back
+    ensure_live_event_hot(event_id)
     
-    # Debug: Print questions to console
-    print(f"DEBUG: Event ID: {event_id}")
-    print(f"DEBUG: Live questions count: {len(live_questions)}")
-    print(f"DEBUG: Live questions data: {live_questions}")
-    
-    # Get live answers with sentiment analysis
-    c.execute('''
-        SELECT la.id, la.answer_text, la.rating, la.attendee_name, 
-               la.sentiment, la.sentiment_score, la.sentiment_confidence, la.submitted_at,
-               lq.question_text
-        FROM live_answers la
-        JOIN live_questions lq ON la.live_question_id = lq.id
-        WHERE la.event_id = ?
-        ORDER BY la.submitted_at DESC
-    ''', (event_id,))
-    live_answers = c.fetchall()
-    
-    conn.close()
+    # Live questions and the most recent answers come from the in-memory room
+    room = live_rooms.get(event_id)
+    live_questions = room.all_questions()
+    live_answers = room.recent_answers()
     
     return render_template('live_questions.html', 
                          event_id=event_id, 
@@ -641,30 +1025,99 @@ def add_live_question(event_id):
         conn.close()
         return jsonify({'success': False, 'message': 'Access denied'})
     
-    # Add live question
-    c.execute('''
-        INSERT INTO live_questions (event_id, question_text, question_type)
-        VALUES (?, ?, ?)
-    ''', (event_id, question_text, question_type))
+    # Until the room has the question, a concurrent load of it is not cached
+    with live_rooms.writing(event_id):
+        # Add live question
+        c.execute('''
+            INSERT INTO live_questions (event_id, question_text, question_type, revision)
+            VALUES (?, ?, ?, (SELECT COALESCE(MAX(revision), 0) + 1 FROM live_questions WHERE event_id = ?))
+        ''', (event_id, question_text, question_type, event_id))
+        
+        question_id = c.lastrowid
+        conn.commit()
+        conn.close()
+        
+        question = LiveQuestion(question_id, question_text, question_type, 1,
+                                datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S'))
+        room = live_rooms.peek(event_id)
+        if room:
+            room.add_question(question)
     
-    question_id = c.lastrowid
-    conn.commit()
-    conn.close()
+    notify_live_questions_changed(event_id)
     
     # Emit to all connected clients for this event
-    socketio.emit('new_live_question', {
-        'question_id': question_id,
-        'question_text': question_text,
-        'question_type': question_type,
-        'event_id': event_id
-    }, room=f'event_{event_id}')
+    payload = question.to_payload()
+    payload['event_id'] = event_id
+    broadcast('new_live_question', payload, event_id)
     
     return jsonify({'success': True, 'message': 'Live question added successfully'})
 
+DUPLICATE_LIVE_ANSWER = {
+    'success': False,
+    'duplicate': True,
+    'message': 'You have already answered this question'
+}
+
+def save_live_answer(conn, live_question_id, event_id, answer_text, rating,
+                     attendee_name, attendee_email, sentiment_result):
+    """Insert a live answer and count it in the rollups
+
+    Returns the new answer id, or None when the attendee already answered the question.
+    """
+    c = conn.cursor()
+    try:
+        c.execute('''
+            INSERT INTO live_answers (live_question_id, event_id, answer_text, rating, 
+                                    attendee_name, attendee_email, sentiment, sentiment_score, sentiment_confidence)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (live_question_id, event_id, answer_text, rating, attendee_name, attendee_email,
+              sentiment_result['sentiment'], sentiment_result['score'], sentiment_result['confidence']))
+    except sqlite3.IntegrityError:
+        # Raced a concurrent submit from the same attendee past the pre-check
+        return None
+    
+    answer_id = c.lastrowid
+    add_live_answer_to_rollups(c, answer_id)
+    conn.commit()
+    # Checked after the commit so an archive that ran meanwhile is caught as well
+    ensure_live_event_hot(event_id, conn)
+    dashboard_cache.mark_dirty(event_id)
+    return answer_id
+
+def ensure_live_event_hot(event_id, conn=None):
+    """Rehydrate the event if it is archived; a room loaded while its answers were away is dropped"""
+    with live_rooms.writing(event_id):
+        if event_archive.ensure_hot(event_id, conn):
+            live_rooms.discard(event_id)
+
+def known_live_room(event_id):
+    """The event's live room, or None for an unknown event
+
+    Checked before loading, so unauthenticated requests for made-up event ids
+    cannot push real rooms out of the LRU.
+    """
+    room = live_rooms.peek(event_id)
+    if room is None and get_attendee_event('id', event_id):
+        room = live_rooms.get(event_id)
+    return room
+
+def publish_live_answer(answer, event_id, terms=None, attendee=None):
+    """Add a saved answer to its live room and push it to connected clients"""
+    room = live_rooms.peek(event_id)
+    if room:
+        if terms is None and room.trends is not None:
+            terms = sentiment_analyzer.extract_terms(answer.answer_text)
+        room.add_answer(answer, terms or (), attendee)
+    
+    # Emit to all connected clients for this event
+    broadcast('new_live_answer', answer.to_payload(event_id), event_id)
+    if room and room.trends is not None:
+        emit_trending_terms(room)
+
 @app.route('/submit_live_answer', methods=['POST'])
 def submit_live_answer():
-    live_question_id = request.form.get('live_question_id')
-    event_id = request.form.get('event_id')
+    live_question_id = request.form.get('live_question_id', type=int)
+    event_id = request.form.get('event_id', type=int)
     answer_text = request.form.get('answer_text', '')
     rating = request.form.get('rating')
     attendee_name = request.form.get('attendee_name', '')
@@ -673,87 +1126,361 @@ def submit_live_answer():
     if not live_question_id or not event_id:
         return jsonify({'success': False, 'message': 'Invalid request'})
     
+    # An archived event's answers come back first, so the duplicate check below sees them
+    ensure_live_event_hot(event_id)
+    room = known_live_room(event_id)
+    if room is None:
+        return jsonify({'success': False, 'message': 'Event not found'}), 404
+    
+    # One answer per attendee email; the room's filter clears most submissions without a lookup
+    attendee = attendee_identity(attendee_email)
+    if attendee and room.may_have_answered(live_question_id, attendee):
+        conn = storage.connect_event(event_id)
+        duplicate = live_answer_exists(conn.cursor(), live_question_id, attendee)
+        conn.close()
+        if duplicate:
+            return jsonify(DUPLICATE_LIVE_ANSWER)
+    
     # Analyze sentiment
-    sentiment_result = sentiment_analyzer.predict_sentiment(answer_text)
+    sentiment_result = inference.predict(answer_text, event_id)
+    
+    with live_rooms.writing(event_id):
+        conn = storage.connect_event(event_id)
+        answer_id = save_live_answer(conn, live_question_id, event_id, answer_text, rating,
+                                     attendee_name, attendee_email, sentiment_result)
+        conn.close()
+        if answer_id is None:
+            return jsonify(DUPLICATE_LIVE_ANSWER)
+        
+        answer = LiveAnswer(answer_id, live_question_id, answer_text, rating, attendee_name,
+                            sentiment_result['sentiment'], sentiment_result['score'], sentiment_result['confidence'],
+                            datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S'), None)
+        publish_live_answer(answer, event_id, attendee=attendee)
+    
+    return jsonify({'success': True, 'message': 'Answer submitted successfully'})
+
+def trending_payload(room, limit=10):
+    return {
+        'event_id': room.event_id,
+        'window_seconds': room.trends.window_seconds,
+        'terms': room.trending_terms(limit)
+    }
+
+def emit_trending_terms(room):
+    """Push trending terms to the event room at most once per TRENDING_EMIT_INTERVAL"""
+    now = time.time()
+    if now - room.trends.last_emitted < app.config['TRENDING_EMIT_INTERVAL']:
+        return
+    room.trends.last_emitted = now
+    broadcast('trending_terms', trending_payload(room), room.event_id)
+
+@app.route('/get_trending_terms/<int:event_id>')
+def get_trending_terms(event_id):
+    if 'user_id' not in session:
+        return redirect(url_for('home'))
     
     conn = sqlite3.connect('feedback_portal.db')
     c = conn.cursor()
     
-    # Save live answer
-    c.execute('''
-        INSERT INTO live_answers (live_question_id, event_id, answer_text, rating, 
-                                attendee_name, attendee_email, sentiment, sentiment_score, sentiment_confidence)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-    ''', (live_question_id, event_id, answer_text, rating, attendee_name, attendee_email,
-          sentiment_result['sentiment'], sentiment_result['score'], sentiment_result['confidence']))
+    # Check if event belongs to organizer
+    c.execute('SELECT name FROM events WHERE id = ? AND organizer_id = ?', 
+              (event_id, session['user_id']))
+    event = c.fetchone()
     
-    answer_id = c.lastrowid
-    conn.commit()
     conn.close()
     
-    # Emit to all connected clients for this event
-    socketio.emit('new_live_answer', {
-        'answer_id': answer_id,
-        'answer_text': answer_text,
-        'rating': rating,
-        'attendee_name': attendee_name,
-        'sentiment': sentiment_result['sentiment'],
-        'sentiment_score': sentiment_result['score'],
-        'sentiment_confidence': sentiment_result['confidence'],
-        'event_id': event_id,
-        'live_question_id': live_question_id
-    }, room=f'event_{event_id}')
+    if not event:
+        return jsonify({'error': 'Access denied'})
     
-    return jsonify({'success': True, 'message': 'Answer submitted successfully'})
+    room = live_rooms.get(event_id)
+    if room.trends is None:
+        return jsonify({'error': 'Trending terms are disabled'}), 404
+    
+    limit = min(request.args.get('limit', 10, type=int), 50)
+    return jsonify(trending_payload(room, limit))
 
-@app.route('/get_live_questions/<int:event_id>')
-def get_live_questions(event_id):
-    """Get live questions for attendees (no authentication required) - limited to top 5 most recent"""
+@app.route('/deactivate_live_question/<int:question_id>', methods=['POST'])
+def deactivate_live_question(question_id):
+    if 'user_id' not in session:
+        return redirect(url_for('home'))
+    
     conn = sqlite3.connect('feedback_portal.db')
     c = conn.cursor()
     
-    # Get active live questions (all)
+    # Verify question belongs to one of the organizer's events
     c.execute('''
-        SELECT id, question_text, question_type, created_at
-        FROM live_questions 
-        WHERE event_id = ? AND is_active = 1
-        ORDER BY created_at DESC
-    ''', (event_id,))
-    questions = c.fetchall()
+        SELECT lq.event_id
+        FROM live_questions lq
+        JOIN events e ON lq.event_id = e.id
+        WHERE lq.id = ? AND e.organizer_id = ?
+    ''', (question_id, session['user_id']))
+    question = c.fetchone()
+    
+    if not question:
+        conn.close()
+        return jsonify({'success': False, 'message': 'Access denied'})
+    
+    event_id = question[0]
+    with live_rooms.writing(event_id):
+        c.execute('''
+            UPDATE live_questions
+            SET is_active = 0,
+                revision = (SELECT COALESCE(MAX(revision), 0) + 1 FROM live_questions WHERE event_id = ?)
+            WHERE id = ?
+        ''', (event_id, question_id))
+        
+        conn.commit()
+        conn.close()
+        
+        room = live_rooms.peek(event_id)
+        if room:
+            room.deactivate_question(question_id)
     
+    notify_live_questions_changed(event_id)
+    broadcast('live_question_removed', {
+        'question_id': question_id,
+        'event_id': event_id
+    }, event_id)
+    
+    return jsonify({'success': True, 'message': 'Live question closed'})
+
+@app.route('/correct_sentiment/<int:answer_id>', methods=['POST'])
+def correct_sentiment(answer_id):
+    if 'user_id' not in session:
+        return redirect(url_for('home'))
+    
+    sentiment = request.form.get('sentiment')
+    if sentiment not in SENTIMENT_LABELS:
+        return jsonify({'success': False, 'message': 'Invalid sentiment'})
+    
+    # Answer ids are only unique within a shard, so sharded storage needs the event as well
+    event_id = request.form.get('event_id', type=int)
+    if storage.sharded and not event_id:
+        return jsonify({'success': False, 'message': 'Invalid request'})
+    
+    conn = storage.connect_event(event_id) if event_id else storage.connect_catalog()
+    c = conn.cursor()
+    
+    # Verify answer belongs to one of the organizer's events
+    c.execute('''
+        SELECT la.event_id, la.live_question_id, la.answer_text,
+               la.sentiment, la.sentiment_score, la.sentiment_confidence
+        FROM live_answers la
+        JOIN events e ON la.event_id = e.id
+        WHERE la.id = ? AND e.organizer_id = ?
+    ''', (answer_id, session['user_id']))
+    answer = c.fetchone()
+    
+    if not answer:
+        conn.close()
+        return jsonify({'success': False, 'message': 'Access denied'})
+    
+    event_id, live_question_id, answer_text, original_sentiment, original_score, original_confidence = answer
+    score = {'positive': 1.0, 'negative': -1.0, 'neutral': 0.0}[sentiment]
+    
+    with live_rooms.writing(event_id):
+        c.execute('''
+            INSERT INTO sentiment_corrections (live_answer_id, event_id, organizer_id, answer_text,
+                                               original_sentiment, corrected_sentiment)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (answer_id, event_id, session['user_id'], answer_text, original_sentiment, sentiment))
+        move_live_answer_in_rollups(c, answer_id, original_sentiment, original_score, original_confidence,
+                                    sentiment, score, 1.0)
+        c.execute('''
+            UPDATE live_answers
+            SET sentiment = ?, sentiment_score = ?, sentiment_confidence = 1.0
+            WHERE id = ?
+        ''', (sentiment, score, answer_id))
+        
+        conn.commit()
+        conn.close()
+        dashboard_cache.mark_dirty(event_id)
+        
+        room = live_rooms.peek(event_id)
+        if room:
+            room.correct_answer(answer_id, original_sentiment, original_score, original_confidence,
+                                sentiment, score, 1.0, live_question_id, answer_text)
+    
+    # The model only learns from corrections with words it knows; say so when it can't
+    learned = None
+    if app.config['ONLINE_LEARNING'] and answer_text:
+        learned = online_learner.submit(answer_text, sentiment)
+    
+    broadcast('sentiment_corrected', {
+        'answer_id': answer_id,
+        'sentiment': sentiment,
+        'event_id': event_id
+    }, event_id)
+    
+    if learned is False:
+        return jsonify({'success': True, 'learned': False,
+                        'message': 'Sentiment corrected, but the model knows none of these words '
+                                   'and cannot learn from it'})
+    return jsonify({'success': True, 'learned': learned, 'message': 'Sentiment corrected'})
+
+def rescore_event(event_id):
+    """Re-score an event's live answers with the published model, as batch-priority inference
+
+    Answers an organizer corrected keep their label. Rows, rollups and the live
+    room are updated; like corrections, rows already compacted into the
+    analytics store keep their old sentiment there. Returns how many answers
+    changed.
+    """
+    changed = 0
+    last_id = 0
+    while True:
+        conn = storage.connect_event(event_id)
+        c = conn.cursor()
+        c.execute('''
+            SELECT la.id, la.live_question_id, la.answer_text,
+                   la.sentiment, la.sentiment_score, la.sentiment_confidence
+            FROM live_answers la
+            WHERE la.event_id = ? AND la.id > ?
+              AND NOT EXISTS (SELECT 1 FROM sentiment_corrections sc
+                              WHERE sc.event_id = la.event_id AND sc.live_answer_id = la.id)
+            ORDER BY la.id
+            LIMIT ?
+        ''', (event_id, last_id, inference.chunk_size))
+        rows = c.fetchall()
+        conn.close()
+        if not rows:
+            return changed
+        last_id = rows[-1][0]
+        
+        results = inference.analyze_batch([row[2] or '' for row in rows], event_id, priority='batch')
+        moved = []
+        with live_rooms.writing(event_id):
+            conn = storage.connect_event(event_id)
+            c = conn.cursor()
+            for (answer_id, live_question_id, answer_text, sentiment, score, confidence), result in zip(rows, results):
+                if (result['sentiment'] == sentiment and abs(result['score'] - (score or 0)) < 1e-6
+                        and abs(result['confidence'] - (confidence or 0)) < 1e-6):
+                    continue
+                # Skip answers corrected or changed since they were read
+                c.execute('''
+                    UPDATE live_answers
+                    SET sentiment = ?, sentiment_score = ?, sentiment_confidence = ?
+                    WHERE id = ? AND sentiment IS ? AND sentiment_score IS ? AND sentiment_confidence IS ?
+                ''', (result['sentiment'], result['score'], result['confidence'],
+                      answer_id, sentiment, score, confidence))
+                if c.rowcount:
+                    # The rollup keys (question, attendee) are untouched by the update above
+                    move_live_answer_in_rollups(c, answer_id, sentiment, score, confidence,
+                                                result['sentiment'], result['score'], result['confidence'])
+                    moved.append((answer_id, live_question_id, answer_text, sentiment, score, confidence, result))
+            conn.commit()
+            conn.close()
+            if moved:
+                dashboard_cache.mark_dirty(event_id)
+            
+            room = live_rooms.peek(event_id)
+            if room:
+                for answer_id, live_question_id, answer_text, sentiment, score, confidence, result in moved:
+                    room.correct_answer(answer_id, sentiment, score, confidence, result['sentiment'],
+                                        result['score'], result['confidence'], live_question_id, answer_text)
+        changed += len(moved)
+
+_rescoring_events = {}
+
+def run_rescore(event_id):
+    try:
+        changed = rescore_event(event_id)
+        print(f"Rescored event {event_id}: {changed} answers changed")
+        if changed:
+            broadcast('sentiment_rescored', {'event_id': event_id, 'changed': changed}, event_id)
+    except Exception as e:
+        print(f"Error rescoring event {event_id}: {e}")
+    finally:
+        _rescoring_events.pop(event_id, None)
+
+# Re-score an event's live answers in the background (e.g. after a model update)
+@app.route('/api/events/<int:event_id>/rescore', methods=['POST'])
+def start_rescore(event_id):
+    if 'user_id' not in session:
+        return jsonify({'error': 'Please log in first'}), 401
+    
+    conn = sqlite3.connect('feedback_portal.db')
+    c = conn.cursor()
+    c.execute('SELECT 1 FROM events WHERE id = ? AND organizer_id = ?', (event_id, session['user_id']))
+    owned = c.fetchone()
     conn.close()
     
-    return jsonify({
-        'questions': [
-            {
-                'question_id': q[0],
-                'question_text': q[1],
-                'question_type': q[2],
-                'created_at': q[3]
-            } for q in questions
-        ]
-    })
+    if not owned:
+        return jsonify({'success': False, 'message': 'Access denied'}), 403
+    
+    token = object()
+    if _rescoring_events.setdefault(event_id, token) is not token:
+        return jsonify({'success': False, 'message': 'Rescoring already running'}), 409
+    
+    socketio.start_background_task(run_rescore, event_id)
+    return jsonify({'success': True, 'message': 'Rescoring started'}), 202
+
+@app.route('/get_live_questions/<int:event_id>')
+def get_live_questions(event_id):
+    """Get live questions for attendees (no authentication required)
+    
+    Without `since` returns every active question. With `since=<cursor>` returns
+    only questions added or deactivated after that cursor, and `wait=<seconds>`
+    parks the request until a change arrives or the wait times out. Under the
+    threading async mode a parked poll would hold an OS thread, so `wait` is
+    ignored there and the changes (possibly none) are returned at once.
+    """
+    since = request.args.get('since', type=int)
+    wait = min(request.args.get('wait', 0, type=float), app.config['LIVE_POLL_MAX_WAIT'])
+    if socketio.async_mode == 'threading':
+        wait = 0
+    
+    room = known_live_room(event_id)
+    if room is None:
+        return jsonify({'error': 'Event not found'}), 404
+    
+    if since is None:
+        # Get active live questions (all)
+        questions = [question.to_payload() for question in room.active_questions()]
+        return jsonify({'questions': questions, 'cursor': room.cursor})
+    
+    while True:
+        # Grab the waiter before querying so a change in between is not missed
+        waiter = get_live_question_waiter(event_id) if wait > 0 else None
+        
+        # A cached room's cursor says whether there is anything newer without a query;
+        # a room served uncached (loaded while writes landed) may already be behind
+        if live_rooms.peek(event_id) is room and room.cursor <= since:
+            questions, removed, cursor = [], [], since
+        else:
+            conn = sqlite3.connect('feedback_portal.db')
+            c = conn.cursor()
+            questions, removed, cursor = fetch_live_question_changes(c, event_id, since)
+            conn.close()
+        
+        if questions or removed or waiter is None:
+            break
+        
+        # Park without a DB connection until the next change or the timeout
+        started = datetime.now()
+        if not waiter.wait(wait):
+            break
+        wait -= (datetime.now() - started).total_seconds()
+    
+    return jsonify({'questions': questions, 'removed': removed, 'cursor': cursor})
 
 @app.route('/live_feedback/<int:event_id>')
 def live_feedback(event_id):
     """Live feedback page for attendees"""
-    conn = sqlite3.connect('feedback_portal.db')
-    c = conn.cursor()
+    if app.config['ATTENDEE_STATIC_SHELLS']:
+        return serve_attendee_shell('live_feedback.html')
     
     # Get event details
-    c.execute('SELECT name FROM events WHERE id = ?', (event_id,))
-    event = c.fetchone()
+    event = get_attendee_event('id', event_id)
     
     if not event:
-        conn.close()
         flash('Event not found', 'error')
         return redirect(url_for('home'))
     
-    conn.close()
-    
     return render_template('live_feedback.html', 
                          event_id=event_id, 
-                         event_name=event[0])
+                         event_name=event[1],
+                         shell=False)
 
 @app.route('/get_sentiment_analysis/<int:event_id>')
 def get_sentiment_analysis(event_id):
@@ -768,43 +1495,33 @@ def get_sentiment_analysis(event_id):
               (event_id, session['user_id']))
     event = c.fetchone()
     
+    conn.close()
+    
     if not event:
-        conn.close()
         return jsonify({'error': 'Access denied'})
     
-    # Get all live answers for sentiment analysis
-    c.execute('''
-        SELECT answer_text, sentiment, sentiment_score, sentiment_confidence
-        FROM live_answers 
-        WHERE event_id = ?
-    ''', (event_id,))
-    answers = c.fetchall()
-    
-    conn.close()
+    # Running sentiment totals from the live room
+    return jsonify(sentiment_analysis_payload(live_rooms.get(event_id).sentiment_summary()))
+
+def sentiment_analysis_payload(summary):
+    """Percentages and averages for a live room's sentiment summary"""
+    total_answers = summary['total_answers']
     
-    if not answers:
-        return jsonify({
+    if not total_answers:
+        return {
             'total_answers': 0,
             'sentiment_counts': {'positive': 0, 'negative': 0, 'neutral': 0},
             'sentiment_percentages': {'positive': 0, 'negative': 0, 'neutral': 0},
             'average_score': 0,
             'average_confidence': 0
-        })
+        }
     
     # Calculate sentiment statistics
-    sentiment_counts = {'positive': 0, 'negative': 0, 'neutral': 0}
-    total_score = 0
-    total_confidence = 0
+    sentiment_counts = summary['sentiment_counts']
+    total_score = summary['score_sum']
+    total_confidence = summary['confidence_sum']
     
-    for answer in answers:
-        sentiment = answer[1] or 'neutral'
-        sentiment_counts[sentiment] += 1
-        total_score += answer[2] or 0
-        total_confidence += answer[3] or 0
-    
-    total_answers = len(answers)
-    
-    return jsonify({
+    return {
         'total_answers': total_answers,
         'sentiment_counts': sentiment_counts,
         'sentiment_percentages': {
@@ -814,17 +1531,241 @@ def get_sentiment_analysis(event_id):
         },
         'average_score': round(total_score / total_answers, 3),
         'average_confidence': round(total_confidence / total_answers, 3)
-    })
+    }
+
+def rollup_payload(row):
+    """Shape a rollup row (answers, positive, negative, neutral, score_sum, confidence_sum)"""
+    answers, positive, negative, neutral, score_sum, confidence_sum = row
+    return {
+        'total_answers': answers,
+        'sentiment_counts': {'positive': positive, 'negative': negative, 'neutral': neutral},
+        'average_score': round(score_sum / answers, 3) if answers else 0,
+        'average_confidence': round(confidence_sum / answers, 3) if answers else 0
+    }
+
+# Per-question and per-attendee sentiment, read from the rollup tables
+@app.route('/get_sentiment_breakdown/<int:event_id>')
+def get_sentiment_breakdown(event_id):
+    if 'user_id' not in session:
+        return redirect(url_for('home'))
+    
+    attendee_limit = min(request.args.get('attendees', 50, type=int), 500)
+    
+    conn = storage.connect_event(event_id)
+    c = conn.cursor()
+    
+    # Check if event belongs to organizer
+    c.execute('SELECT name FROM events WHERE id = ? AND organizer_id = ?', 
+              (event_id, session['user_id']))
+    event = c.fetchone()
+    
+    if not event:
+        conn.close()
+        return jsonify({'error': 'Access denied'})
+    
+    c.execute('''
+        SELECT live_question_id, answers, positive, negative, neutral, score_sum, confidence_sum
+        FROM live_question_rollups
+        WHERE event_id = ?
+    ''', (event_id,))
+    question_rollups = {row[0]: row[1:] for row in c.fetchall()}
+    
+    c.execute('''
+        SELECT attendee_key, attendee_name, answers, positive, negative, neutral, score_sum, confidence_sum
+        FROM live_attendee_rollups
+        WHERE event_id = ?
+        ORDER BY answers DESC, attendee_key
+        LIMIT ?
+    ''', (event_id, attendee_limit))
+    attendee_rollups = c.fetchall()
+    
+    conn.close()
+    
+    # Question text and the top answers come from the live room; each list holds at most K answers
+    room = live_rooms.get(event_id)
+    questions = []
+    for question in room.all_questions():
+        breakdown = rollup_payload(question_rollups.get(question.question_id, (0, 0, 0, 0, 0, 0)))
+        breakdown.update(room.top_answers_for(question.question_id))
+        breakdown.update({
+            'question_id': question.question_id,
+            'question_text': question.question_text,
+            'is_active': bool(question.is_active)
+        })
+        questions.append(breakdown)
+    
+    attendees = []
+    for row in attendee_rollups:
+        breakdown = rollup_payload(row[2:])
+        breakdown['attendee'] = row[1] or ('Anonymous' if row[0] == 'anonymous' else row[0])
+        attendees.append(breakdown)
+    
+    return jsonify({'questions': questions, 'attendees': attendees})
+
+# Memory held by in-memory live rooms
+@app.route('/api/live_rooms/stats')
+def live_room_stats():
+    if 'user_id' not in session:
+        return jsonify({'error': 'Please log in first'}), 401
+    
+    # Admins see every loaded room; organizers see their own rooms and only their totals
+    if is_admin_session(session):
+        return jsonify(live_rooms.report())
+    
+    conn = sqlite3.connect('feedback_portal.db')
+    c = conn.cursor()
+    c.execute('SELECT id FROM events WHERE organizer_id = ?', (session['user_id'],))
+    event_ids = {row[0] for row in c.fetchall()}
+    conn.close()
+    
+    return jsonify(live_rooms.report(event_ids))
+
+def is_admin_session(session):
+    """Whether the session's organizer account exists and its email is in PROFILER_ADMINS
+
+    Login never auto-registers those emails, so their accounts were created by an operator.
+    """
+    email = (session.get('user_email') or '').lower()
+    if 'user_id' not in session or email not in app.config['PROFILER_ADMINS']:
+        return False
+    conn = sqlite3.connect('feedback_portal.db')
+    c = conn.cursor()
+    c.execute('SELECT 1 FROM organizers WHERE id = ? AND LOWER(email) = ?', (session['user_id'], email))
+    exists = c.fetchone() is not None
+    conn.close()
+    return exists
+
+# Share of sentiment predictions settled by each inference tier
+@app.route('/api/sentiment/cascade')
+def sentiment_cascade_stats():
+    if 'user_id' not in session:
+        return jsonify({'error': 'Please log in first'}), 401
+    # Server-wide counters, so admins only
+    if not is_admin_session(session):
+        return jsonify({'error': 'Admin access required'}), 403
+    
+    return jsonify(sentiment_analyzer.cascade_stats())
+
+# Extra {code: label} sources for the profiler (the asyncio server adds its coroutine handlers)
+profiler_label_sources = []
+
+def handler_code_labels():
+    """Route and Socket.IO handler code objects mapped to the labels profiles group by"""
+    labels = {}
+    for rule in app.url_map.iter_rules():
+        view = app.view_functions.get(rule.endpoint)
+        if view is not None and rule.endpoint != 'static':
+            methods = ','.join(sorted(rule.methods - {'HEAD', 'OPTIONS'}))
+            labels[inspect.unwrap(view).__code__] = f'{methods} {rule.rule}'
+    for handlers in socketio.server.handlers.values():
+        for event, handler in handlers.items():
+            labels[inspect.unwrap(handler).__code__] = f'socketio {event}'
+    for source in profiler_label_sources:
+        labels.update(source())
+    return labels
+
+profiler = SamplingProfiler(handler_code_labels, max_seconds=app.config['PROFILER_MAX_SECONDS'])
+
+# Sample every thread's stack for a few seconds; format=folded returns flame graph input
+@app.route('/api/admin/profile')
+def admin_profile():
+    if 'user_id' not in session:
+        return jsonify({'error': 'Please log in first'}), 401
+    if not is_admin_session(session):
+        return jsonify({'error': 'Admin access required'}), 403
+    
+    seconds = request.args.get('seconds', 10, type=float)
+    hz = request.args.get('hz', 100, type=int)
+    try:
+        result = profiler.profile(seconds, hz, include_idle=request.args.get('idle') == '1', sleep=socketio.sleep)
+    except ProfilerBusy:
+        return jsonify({'error': 'A profile is already running'}), 409
+    
+    if request.args.get('format') == 'folded':
+        return Response('\n'.join(result['folded']) + '\n', mimetype='text/plain')
+    return jsonify(result)
+
+# Queue depth and queue-wait percentiles per inference priority class
+@app.route('/api/inference/stats')
+def inference_stats():
+    if 'user_id' not in session:
+        return jsonify({'error': 'Please log in first'}), 401
+    # Server-wide counters, so admins only
+    if not is_admin_session(session):
+        return jsonify({'error': 'Admin access required'}), 403
+    
+    return jsonify(inference.stats())
+
+# Dashboard summary cache: organizers held, dirty events and rows served vs recomputed
+@app.route('/api/dashboard/cache_stats')
+def dashboard_cache_stats():
+    if 'user_id' not in session:
+        return jsonify({'error': 'Please log in first'}), 401
+    # Server-wide counters, so admins only
+    if not is_admin_session(session):
+        return jsonify({'error': 'Admin access required'}), 403
+    
+    return jsonify(dashboard_cache.stats())
+
+# Cross-event analytics for the logged-in organizer
+@app.route('/api/analytics/sentiment')
+def analytics_sentiment():
+    if 'user_id' not in session:
+        return jsonify({'error': 'Please log in first'}), 401
+    
+    group_by = request.args.get('group_by', 'event')
+    if group_by not in GROUP_BY_FIELDS:
+        return jsonify({'error': f"group_by must be one of {', '.join(GROUP_BY_FIELDS)}"}), 400
+    
+    groups = analytics_store.sentiment_by(group_by,
+                                          organizer_id=session['user_id'],
+                                          date_from=request.args.get('date_from'),
+                                          date_to=request.args.get('date_to'))
+    
+    return jsonify({'group_by': group_by, 'groups': groups})
+
+def analytics_compaction_loop():
+    """Periodically move new answers into the columnar analytics store"""
+    while True:
+        socketio.sleep(app.config['ANALYTICS_COMPACT_INTERVAL'])
+        try:
+            rows = analytics_store.compact(storage)
+            if rows:
+                print(f"Analytics store compacted {rows} rows")
+        except Exception as e:
+            print(f"Error compacting analytics store: {e}")
+
+def event_archive_loop():
+    """Periodically archive events older than ARCHIVE_AFTER_DAYS"""
+    while True:
+        socketio.sleep(app.config['ARCHIVE_INTERVAL'])
+        try:
+            moved = event_archive.archive_due(app.config['ARCHIVE_AFTER_DAYS'],
+                                              compact=lambda: analytics_store.compact(storage))
+            if moved:
+                print(f"Archived {len(moved)} events ({sum(moved.values())} rows)")
+        except Exception as e:
+            print(f"Error archiving events: {e}")
 
 # WebSocket event handlers
+@socketio.on('connect')
+def on_connect(auth=None):
+    traffic_recorder.socket('connect', request.sid)
+
+@socketio.on('disconnect')
+def on_disconnect(reason=None):
+    traffic_recorder.socket('disconnect', request.sid)
+
 @socketio.on('join_event')
 def on_join_event(data):
+    traffic_recorder.socket('join_event', request.sid, data)
     event_id = data['event_id']
     join_room(f'event_{event_id}')
     emit('status', {'msg': f'Joined event {event_id}'})
 
 @socketio.on('leave_event')
 def on_leave_event(data):
+    traffic_recorder.socket('leave_event', request.sid, data)
     event_id = data['event_id']
     leave_room(f'event_{event_id}')
     emit('status', {'msg': f'Left event {event_id}'})
@@ -838,5 +1779,18 @@ def not_found_error(error):
 def internal_error(error):
     return render_template('500.html'), 500
 
+@app.errorhandler(ModelNotReady)
+def model_not_ready(error):
+    return jsonify({'success': False, 'message': str(error)}), 503
+
+if app.config['ONLINE_LEARNING']:
+    online_learner.load_or_initialize()
+
 if __name__ == '__main__':
+    if app.config['ONLINE_LEARNING']:
+        socketio.start_background_task(online_learner.run)
+    if app.config['ANALYTICS_COMPACT_INTERVAL'] > 0:
+        socketio.start_background_task(analytics_compaction_loop)
+    if app.config['ARCHIVE_INTERVAL'] > 0:
+        socketio.start_background_task(event_archive_loop)
     socketio.run(app, debug=True)
\ No newline at end of file
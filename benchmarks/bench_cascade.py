@@ -0,0 +1,66 @@
+"""Accuracy parity and latency of the lexicon cascade against the full model
+
+Trains one TF-IDF model on the same split as bench_feature_modes.py, then
+scores the held-out texts one at a time with the cascade off and at several
+confidence thresholds. For each setting it reports the share of texts the
+lexicon tier settled, agreement with the full model, held-out accuracy and
+mean latency per text.
+
+Usage:
+    python benchmarks/bench_cascade.py [sentiment140.csv] [rows] [max_tokens]
+"""
+import os
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from sklearn.linear_model import LogisticRegression
+
+from bench_feature_modes import load_split
+from sentiment_analyzer import SentimentAnalyzer, SENTIMENT_LABELS, build_vectorizer
+
+THRESHOLDS = (0.5, 0.6, 0.7, 0.8, 0.9)
+
+
+def score_all(analyzer, texts):
+    started = time.perf_counter()
+    results = [analyzer.predict_sentiment(text) for text in texts]
+    return results, (time.perf_counter() - started) / len(texts) * 1e6
+
+
+def main():
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else None
+    rows = int(sys.argv[2]) if len(sys.argv) > 2 else 50000
+    max_tokens = int(sys.argv[3]) if len(sys.argv) > 3 else 3
+
+    X_train, X_test, y_train, y_test = load_split(SentimentAnalyzer(), csv_path, rows)
+    vectorizer = build_vectorizer('tfidf')
+    model = LogisticRegression(random_state=42, max_iter=1000)
+    model.fit(vectorizer.fit_transform(X_train), y_train)
+
+    reference = SentimentAnalyzer(cascade_tokens=0)
+    reference.publish(vectorizer, model)
+    expected, reference_us = score_all(reference, X_test)
+
+    def accuracy(results):
+        return sum(SENTIMENT_LABELS[r['sentiment']] == label for r, label in zip(results, y_test)) / len(y_test)
+
+    print(f"{len(X_train)} training / {len(X_test)} held-out texts "
+          f"({'Sentiment140 sample' if csv_path else 'synthetic data'}), lexicon tier up to {max_tokens} tokens")
+    print(f"{'threshold':>9} {'lexicon %':>10} {'agreement':>10} {'accuracy':>9} {'us/text':>8}")
+    print(f"{'off':>9} {0:>10.1f} {1:>10.4f} {accuracy(expected):>9.3f} {reference_us:>8.1f}")
+
+    for threshold in THRESHOLDS:
+        cascade = SentimentAnalyzer(cascade_tokens=max_tokens, cascade_confidence=threshold)
+        cascade.publish(vectorizer, model)
+        results, us = score_all(cascade, X_test)
+        agreement = sum(r['sentiment'] == e['sentiment'] for r, e in zip(results, expected)) / len(expected)
+        tiers = cascade.cascade_stats()['tiers']
+        print(f"{threshold:>9.2f} {tiers['lexicon']['share'] * 100:>10.1f} {agreement:>10.4f} "
+              f"{accuracy(results):>9.3f} {us:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
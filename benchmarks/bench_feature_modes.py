@@ -0,0 +1,102 @@
+"""Accuracy, latency and featurizer size: TF-IDF vocabulary vs hashed features
+
+Trains one LogisticRegression per feature mode on the same split and scores
+the same held-out texts. By default the split comes from the built-in
+synthetic training data; pass a Sentiment140-format CSV to use a sample of
+real tweets instead (the first `rows` rows, every 5th held out).
+
+Usage:
+    python benchmarks/bench_feature_modes.py [sentiment140.csv] [rows]
+"""
+import os
+import pickle
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import train_test_split
+
+from sentiment_analyzer import SentimentAnalyzer, FEATURE_MODES, build_vectorizer
+
+
+def load_split(analyzer, csv_path=None, rows=50000):
+    """Preprocessed (train_texts, test_texts, train_labels, test_labels)"""
+    if csv_path:
+        from train_sentiment import iter_csv_chunks
+
+        labels, texts = [], []
+        for chunk_labels, chunk_texts in iter_csv_chunks(csv_path, 10000, 0, 5, 'latin-1'):
+            labels.extend(chunk_labels)
+            texts.extend(chunk_texts)
+            if len(labels) >= rows:
+                break
+        labels, texts = labels[:rows], texts[:rows]
+    else:
+        df = analyzer.create_synthetic_sentiment140_data()
+        labels, texts = df['sentiment'].tolist(), df['text'].tolist()
+
+    processed = [(analyzer.preprocess_text(text), label) for text, label in zip(texts, labels)]
+    processed = [(text, label) for text, label in processed if text]
+    X = [text for text, _ in processed]
+    y = [label for _, label in processed]
+    return train_test_split(X, y, test_size=0.2, random_state=42)
+
+
+def featurizer_bytes(vectorizer):
+    """Pickled size of a fitted featurizer: what every worker process holds"""
+    return len(pickle.dumps(vectorizer))
+
+
+def bench_mode(features, X_train, X_test, y_train, y_test):
+    vectorizer = build_vectorizer(features)
+    model = LogisticRegression(random_state=42, max_iter=1000)
+
+    started = time.perf_counter()
+    model.fit(vectorizer.fit_transform(X_train), y_train)
+    fit_seconds = time.perf_counter() - started
+
+    analyzer = SentimentAnalyzer(features)
+    analyzer.publish(vectorizer, model)
+
+    # One text per call, as on the submit_live_answer path
+    started = time.perf_counter()
+    for text in X_test:
+        analyzer.predict_sentiment(text)
+    single_us = (time.perf_counter() - started) / len(X_test) * 1e6
+
+    # One call for the whole held-out set, as on the submit_answers path
+    started = time.perf_counter()
+    analyzer.analyze_batch(X_test)
+    batch_us = (time.perf_counter() - started) / len(X_test) * 1e6
+
+    accuracy = accuracy_score(y_test, model.predict(vectorizer.transform(X_test)))
+    return {
+        'features': features,
+        'accuracy': accuracy,
+        'fit_s': fit_seconds,
+        'single_us': single_us,
+        'batch_us': batch_us,
+        'featurizer_kb': featurizer_bytes(vectorizer) / 1024
+    }
+
+
+def main():
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else None
+    rows = int(sys.argv[2]) if len(sys.argv) > 2 else 50000
+
+    X_train, X_test, y_train, y_test = load_split(SentimentAnalyzer(), csv_path, rows)
+    print(f"{len(X_train)} training / {len(X_test)} held-out texts "
+          f"({'Sentiment140 sample' if csv_path else 'synthetic data'})")
+    print(f"{'features':>8} {'accuracy':>9} {'fit s':>7} {'us/text':>8} {'us/text batch':>14} {'featurizer KB':>14}")
+    for features in FEATURE_MODES:
+        r = bench_mode(features, X_train, X_test, y_train, y_test)
+        print(f"{r['features']:>8} {r['accuracy']:>9.3f} {r['fit_s']:>7.2f} {r['single_us']:>8.1f} "
+              f"{r['batch_us']:>14.1f} {r['featurizer_kb']:>14.1f}")
+
+
+if __name__ == '__main__':
+    main()
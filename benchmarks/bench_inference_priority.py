@@ -0,0 +1,129 @@
+"""Live answer latency while a backfill rescoring runs: shared FIFO pool vs priority scheduler
+
+Loads the repo's sentiment model and replays a steady stream of live
+answers spread over several events (one answer every `interval_ms`), while
+a backfill rescoring `backfill` texts for one event is queued up front.
+
+- "fifo": one ThreadPoolExecutor with the same number of workers runs both
+  in submission order, as scoring did before priority classes.
+- "priority": InferenceScheduler with live work above batch and a live
+  queue-wait budget.
+
+Reports live queue wait and end-to-end latency (p50/p99), and how long the
+backfill took.
+
+Usage:
+    python benchmarks/bench_inference_priority.py [backfill] [live_answers] [interval_ms] [workers] [budget_ms]
+"""
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from inference_scheduler import InferenceScheduler, percentile
+from sentiment_analyzer import SentimentAnalyzer
+
+LIVE_TEXTS = [
+    'Great talk, really enjoyed the demo',
+    'The audio was terrible and I could not hear anything',
+    'It was okay, a bit long',
+    'Loved the speaker, very clear explanations',
+    'Too crowded and the room was hot'
+]
+EVENTS = 8
+
+
+def timed(fn, *args):
+    """Wrap a job so it reports when it started running"""
+    def run():
+        started = time.perf_counter()
+        return started, fn(*args)
+    return run
+
+
+def drive(submit, analyzer, backfill_texts, live_count, interval, chunk_size):
+    backfill_started = time.perf_counter()
+    backfill = [submit('batch', 0, timed(analyzer.analyze_batch, backfill_texts[start:start + chunk_size]))
+                for start in range(0, len(backfill_texts), chunk_size)]
+
+    live = []
+    next_at = time.perf_counter()
+    for n in range(live_count):
+        delay = next_at - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        live.append((time.perf_counter(), submit('live', 1 + n % EVENTS,
+                                                 timed(analyzer.predict_sentiment, LIVE_TEXTS[n % len(LIVE_TEXTS)]))))
+        next_at += interval
+
+    waits = []
+    for submitted, future in live:
+        started, _ = future.result()
+        waits.append((started - submitted) * 1000)
+    for future in backfill:
+        future.result()
+    return sorted(waits), time.perf_counter() - backfill_started
+
+
+def run_mode(mode, analyzer, backfill_texts, live_count, interval, workers, budget_ms, chunk_size=64):
+    done = {}
+
+    if mode == 'fifo':
+        pool = ThreadPoolExecutor(max_workers=workers)
+
+        def submit(priority, event_id, fn):
+            return pool.submit(fn)
+    else:
+        scheduler = InferenceScheduler(analyzer, workers=workers, batch_workers=max(1, workers - 1),
+                                       live_budget_ms=budget_ms, chunk_size=chunk_size)
+
+        def submit(priority, event_id, fn):
+            return scheduler.submit(priority, event_id, fn)
+
+    def tracked(priority, event_id, fn):
+        # End-to-end latency is taken when the future completes, not when drive() collects it
+        submitted = time.perf_counter()
+        future = submit(priority, event_id, fn)
+        if priority == 'live':
+            future.add_done_callback(lambda f: done.setdefault(f, (time.perf_counter() - submitted) * 1000))
+        return future
+
+    waits, backfill_seconds = drive(tracked, analyzer, backfill_texts, live_count, interval, chunk_size)
+    latencies = sorted(done.values())
+    return {
+        'mode': mode,
+        'wait_p50': percentile(waits, 0.50),
+        'wait_p99': percentile(waits, 0.99),
+        'latency_p50': percentile(latencies, 0.50),
+        'latency_p99': percentile(latencies, 0.99),
+        'backfill_s': backfill_seconds
+    }
+
+
+def main():
+    backfill = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    live_count = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    interval_ms = float(sys.argv[3]) if len(sys.argv) > 3 else 5
+    workers = int(sys.argv[4]) if len(sys.argv) > 4 else 2
+    budget_ms = float(sys.argv[5]) if len(sys.argv) > 5 else 50
+
+    analyzer = SentimentAnalyzer(model_path=os.path.join(REPO_ROOT, 'sentiment_model.pkl'),
+                                 vectorizer_path=os.path.join(REPO_ROOT, 'sentiment_vectorizer.pkl'))
+    analyzer.initialize()
+    samples = analyzer.create_synthetic_sentiment140_data()['text'].tolist()
+    backfill_texts = [samples[i % len(samples)] for i in range(backfill)]
+
+    print(f"{backfill} backfill texts, {live_count} live answers every {interval_ms} ms over {EVENTS} events, "
+          f"{workers} workers, live budget {budget_ms} ms")
+    print(f"{'mode':>9} {'wait p50':>9} {'wait p99':>9} {'live p50':>9} {'live p99':>9} {'backfill s':>11}")
+    for mode in ('fifo', 'priority'):
+        r = run_mode(mode, analyzer, backfill_texts, live_count, interval_ms / 1000, workers, budget_ms)
+        print(f"{r['mode']:>9} {r['wait_p50']:>9.1f} {r['wait_p99']:>9.1f} {r['latency_p50']:>9.1f} "
+              f"{r['latency_p99']:>9.1f} {r['backfill_s']:>11.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,184 @@
+"""Connected clients and live answers/sec: threaded Socket.IO server vs asyncio mode
+
+Starts the portal in a subprocess on a scratch copy of the database, once
+with `socketio.run` (the current mode: whichever async_mode Flask-SocketIO
+picks) and once with live_async.py under uvicorn. For each server it
+connects `clients` Socket.IO clients to one event's room, posts `answers`
+live answers with `concurrency` requests in flight, and reports how many
+clients stayed connected, answers/sec and how many new_live_answer
+broadcasts reached the clients.
+
+Needs python-socketio[asyncio_client] (aiohttp), plus uvicorn and asgiref
+for the asyncio mode.
+
+Usage:
+    python benchmarks/bench_live_serving.py [clients] [answers] [concurrency]
+"""
+import asyncio
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+import aiohttp
+import socketio
+
+SERVERS = {
+    'threaded': "import app; app.socketio.run(app.app, host='127.0.0.1', port={port}, allow_unsafe_werkzeug=True)",
+    'asyncio': "import live_async; live_async.main(['--port', '{port}'])"
+}
+
+ANSWERS = [
+    'Great talk, really enjoyed the demo',
+    'The audio was terrible and I could not hear anything',
+    'It was okay, a bit long',
+    'Loved the speaker, very clear explanations',
+    'Too crowded and the room was hot'
+]
+
+
+def start_server(mode, port, workdir):
+    env = dict(os.environ,
+               PYTHONPATH=REPO_ROOT,
+               ONLINE_LEARNING='0',
+               ANALYTICS_COMPACT_INTERVAL='0',
+               SENTIMENT_MODEL_PATH=os.path.join(REPO_ROOT, 'sentiment_model.pkl'),
+               SENTIMENT_VECTORIZER_PATH=os.path.join(REPO_ROOT, 'sentiment_vectorizer.pkl'))
+    return subprocess.Popen([sys.executable, '-c', SERVERS[mode].format(port=port)], cwd=workdir, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+async def wait_until_up(http, base, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            async with http.get(base + '/') as response:
+                if response.status == 200:
+                    return
+        except aiohttp.ClientError:
+            pass
+        await asyncio.sleep(0.5)
+    raise RuntimeError(f"server at {base} did not start")
+
+
+async def create_live_question(http, base, workdir):
+    """Sign in as an organizer and open one event with one live question"""
+    await http.post(base + '/login', data={'email': 'bench@example.com', 'password': 'bench'})
+    await http.post(base + '/create_event', data={
+        'event_name': 'Serving benchmark', 'event_date': '2026-01-01', 'event_time': '10:00',
+        'venue': 'Hall', 'organizer_name': 'Bench'
+    })
+    conn = sqlite3.connect(os.path.join(workdir, 'feedback_portal.db'))
+    event_id = conn.execute('SELECT MAX(id) FROM events').fetchone()[0]
+    conn.close()
+
+    await http.post(f'{base}/add_live_question/{event_id}',
+                    data={'question_text': 'How is it going?', 'question_type': 'text'})
+    conn = sqlite3.connect(os.path.join(workdir, 'feedback_portal.db'))
+    question_id = conn.execute('SELECT MAX(id) FROM live_questions WHERE event_id = ?', (event_id,)).fetchone()[0]
+    conn.close()
+    return event_id, question_id
+
+
+async def connect_clients(base, event_id, count):
+    received = [0]
+    clients = []
+
+    async def connect():
+        client = socketio.AsyncClient(reconnection=False)
+
+        @client.on('new_live_answer')
+        async def on_answer(data):
+            received[0] += 1
+
+        try:
+            await client.connect(base, transports=['websocket'], wait_timeout=10)
+            await client.emit('join_event', {'event_id': event_id})
+            clients.append(client)
+        except (socketio.exceptions.ConnectionError, asyncio.TimeoutError):
+            pass
+
+    # Connect in waves so the listen backlog is not the bottleneck being measured
+    for start in range(0, count, 50):
+        await asyncio.gather(*(connect() for _ in range(min(50, count - start))))
+    await asyncio.sleep(1)
+    return clients, received
+
+
+async def post_answers(http, base, event_id, question_id, count, concurrency):
+    gate = asyncio.Semaphore(concurrency)
+    ok = [0]
+
+    async def post(n):
+        async with gate:
+            async with http.post(base + '/submit_live_answer', data={
+                'live_question_id': question_id, 'event_id': event_id,
+                'answer_text': ANSWERS[n % len(ANSWERS)], 'attendee_name': f'attendee {n}'
+            }) as response:
+                if response.status == 200 and (await response.json()).get('success'):
+                    ok[0] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(post(n) for n in range(count)))
+    return ok[0], time.perf_counter() - started
+
+
+async def bench_mode(mode, port, clients, answers, concurrency):
+    workdir = tempfile.mkdtemp(prefix=f'bench-{mode}-')
+    db_path = os.path.join(REPO_ROOT, 'feedback_portal.db')
+    if os.path.exists(db_path):
+        shutil.copy(db_path, workdir)
+    server = start_server(mode, port, workdir)
+    base = f'http://127.0.0.1:{port}'
+    try:
+        # unsafe=True: the default jar ignores cookies from IP hosts, which would drop the organizer session
+        async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=concurrency),
+                                         cookie_jar=aiohttp.CookieJar(unsafe=True)) as http:
+            await wait_until_up(http, base)
+            event_id, question_id = await create_live_question(http, base, workdir)
+
+            connected, received = await connect_clients(base, event_id, clients)
+            saved, seconds = await post_answers(http, base, event_id, question_id, answers, concurrency)
+
+            # Give the last broadcasts time to arrive
+            expected = saved * len(connected)
+            deadline = time.monotonic() + 10
+            while received[0] < expected and time.monotonic() < deadline:
+                await asyncio.sleep(0.2)
+            still_connected = sum(1 for client in connected if client.connected)
+            await asyncio.gather(*(client.disconnect() for client in connected))
+
+        return {
+            'mode': mode,
+            'clients': still_connected,
+            'answers_per_s': saved / seconds if seconds else 0.0,
+            'saved': saved,
+            'delivered': received[0],
+            'expected': expected
+        }
+    finally:
+        server.terminate()
+        server.wait()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+async def main():
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    answers = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    concurrency = int(sys.argv[3]) if len(sys.argv) > 3 else 32
+
+    print(f"{clients} clients, {answers} answers, {concurrency} requests in flight")
+    print(f"{'mode':>9} {'clients':>8} {'answers/s':>10} {'saved':>6} {'broadcasts delivered':>21}")
+    for port, mode in enumerate(SERVERS, start=5091):
+        r = await bench_mode(mode, port, clients, answers, concurrency)
+        print(f"{r['mode']:>9} {r['clients']:>8} {r['answers_per_s']:>10.1f} {r['saved']:>6} "
+              f"{r['delivered']:>12}/{r['expected']:<8}")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,117 @@
+"""Submissions/sec for the submit_answers write path, before and after batching
+
+Runs against a scratch database in a temporary directory. "before" replays
+the original per-answer INSERT loop (question SELECT + one statement per
+answer); "after" uses the cached question map and one executemany
+transaction from app.py. Sentiment inference is identical in both paths
+and is left out so the numbers isolate the database work.
+
+Usage:
+    python benchmarks/bench_submit_answers.py [submissions] [questions]
+"""
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def legacy_submit(event_id, form, attendee_name, attendee_email):
+    """The original submit_answers database loop"""
+    conn = sqlite3.connect('feedback_portal.db')
+    c = conn.cursor()
+
+    c.execute('SELECT id, question_type FROM questions WHERE event_id = ?', (event_id,))
+    questions = c.fetchall()
+
+    for question_id, question_type in questions:
+        answer_value = form.get(f'answer_{question_id}')
+        if answer_value:
+            if question_type == 'rating':
+                c.execute('''
+                    INSERT INTO answers (question_id, event_id, rating, attendee_name, attendee_email)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', (question_id, event_id, int(answer_value), attendee_name, attendee_email))
+            else:
+                c.execute('''
+                    INSERT INTO answers (question_id, event_id, answer_text, attendee_name, attendee_email)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', (question_id, event_id, answer_value, attendee_name, attendee_email))
+
+    conn.commit()
+    conn.close()
+
+
+def batched_submit(app, event_id, form, attendee_name, attendee_email):
+    """The executemany path used by submit_answers"""
+    questions = app.get_event_question_map(event_id)
+    answer_rows = []
+    for question_id, question_type in questions.items():
+        answer_value = form.get(f'answer_{question_id}')
+        if not answer_value:
+            continue
+        if question_type == 'rating':
+            answer_rows.append((question_id, event_id, None, int(answer_value),
+                                attendee_name, attendee_email, None, None, None))
+        else:
+            answer_rows.append((question_id, event_id, answer_value, None,
+                                attendee_name, attendee_email, 'neutral', 0.0, 0.5))
+
+    conn = sqlite3.connect('feedback_portal.db')
+    app.store_submission(conn, answer_rows)
+    conn.close()
+
+
+def run(label, submit, submissions):
+    started = time.perf_counter()
+    for i in range(submissions):
+        submit(f'Attendee {i}', f'attendee{i}@example.com')
+    elapsed = time.perf_counter() - started
+    print(f"{label:>7}: {submissions / elapsed:8.1f} submissions/sec ({elapsed:.2f}s)")
+    return submissions / elapsed
+
+
+def main():
+    submissions = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    question_count = int(sys.argv[2]) if len(sys.argv) > 2 else 30
+
+    workdir = tempfile.mkdtemp(prefix='bench_submit_')
+    for name in ('sentiment_model.pkl', 'sentiment_vectorizer.pkl'):
+        shutil.copy(os.path.join(REPO_ROOT, name), workdir)
+    os.chdir(workdir)
+    os.environ.setdefault('ONLINE_LEARNING', '0')
+    sys.path.insert(0, REPO_ROOT)
+
+    try:
+        import app
+
+        conn = sqlite3.connect('feedback_portal.db')
+        c = conn.cursor()
+        c.execute("INSERT INTO events (name, qr_code) VALUES ('Benchmark', 'BENCH')")
+        event_id = c.lastrowid
+        for i in range(question_count):
+            question_type = 'rating' if i % 3 == 0 else 'text'
+            c.execute('INSERT INTO questions (event_id, question_text, question_type) VALUES (?, ?, ?)',
+                      (event_id, f'Question {i}', question_type))
+        conn.commit()
+        c.execute('SELECT id, question_type FROM questions WHERE event_id = ?', (event_id,))
+        form = {
+            f'answer_{question_id}': '4' if question_type == 'rating' else 'Great sessions, long queues'
+            for question_id, question_type in c.fetchall()
+        }
+        conn.close()
+
+        print(f"{submissions} submissions x {question_count} questions")
+        before = run('before', lambda name, email: legacy_submit(event_id, form, name, email), submissions)
+        after = run('after', lambda name, email: batched_submit(app, event_id, form, name, email), submissions)
+        print(f"speedup: {after / before:.2f}x")
+    finally:
+        os.chdir(REPO_ROOT)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
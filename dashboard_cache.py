@@ -0,0 +1,131 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class OrganizerSummary:
+    __slots__ = ('event_rows', 'events', 'totals', 'dirty', 'rows_stale', 'built_at', 'lock')
+
+    def __init__(self):
+        # Event rows in dashboard order, and the built dashboard entry for each event id
+        self.event_rows = []
+        self.events = {}
+        self.totals = None
+        self.dirty = set()
+        self.rows_stale = True
+        # time.monotonic() of the last full rebuild; None before the first
+        self.built_at = None
+        self.lock = threading.Lock()
+
+
+class DashboardSummaryCache:
+    """Process-wide LRU of organizers' dashboard summaries
+
+    An organizer's summary is built on their first dashboard load. After that
+    the write paths in app.py mark the events whose answers, feedback or live
+    answers changed, and a load recomputes only those (plus events created
+    since); every other event, and the page totals, are served from memory.
+    Only this process's writes are marked, so a summary older than `max_age`
+    seconds is rebuilt in full, which bounds how long another process's
+    writes stay invisible.
+
+    - load_events(organizer_id) -> event rows, id first, in dashboard order
+    - load_stats(event_ids) -> {event_id: stats}
+    - build(row, stats) -> the dashboard entry for one event (stats is None when
+      load_stats had nothing for it)
+    - summarize(entries) -> totals over all of an organizer's entries
+    """
+
+    def __init__(self, load_events, load_stats, build, summarize, max_organizers=1000, max_age=30):
+        self.load_events = load_events
+        self.load_stats = load_stats
+        self.build = build
+        self.summarize = summarize
+        self.max_organizers = max_organizers
+        self.max_age = max_age
+        self.organizers = OrderedDict()
+        # event id -> organizer id, for the events of cached summaries only
+        self.owners = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.recomputed = 0
+
+    def _summary(self, organizer_id):
+        with self.lock:
+            summary = self.organizers.get(organizer_id)
+            if summary is None:
+                summary = self.organizers[organizer_id] = OrganizerSummary()
+                while len(self.organizers) > self.max_organizers:
+                    _, evicted = self.organizers.popitem(last=False)
+                    for event_id in evicted.events:
+                        self.owners.pop(event_id, None)
+            self.organizers.move_to_end(organizer_id)
+            return summary
+
+    def load(self, organizer_id):
+        """(entries, totals) for the organizer's dashboard, refreshing only dirty or new events"""
+        summary = self._summary(organizer_id)
+        # One refresh per organizer at a time, so an older result never overwrites a newer one
+        with summary.lock:
+            started = time.monotonic()
+            expired = summary.built_at is None or started - summary.built_at >= self.max_age
+            with self.lock:
+                reload_rows = summary.rows_stale or expired
+                summary.rows_stale = False
+                # Taken before reading, so a write landing during the refresh marks the event again
+                dirty = summary.dirty
+                summary.dirty = set()
+
+            try:
+                if reload_rows:
+                    summary.event_rows = self.load_events(organizer_id)
+                    with self.lock:
+                        for row in summary.event_rows:
+                            self.owners[row[0]] = organizer_id
+
+                stale = [row for row in summary.event_rows
+                         if expired or row[0] in dirty or row[0] not in summary.events]
+                if stale:
+                    stats = self.load_stats([row[0] for row in stale])
+                    for row in stale:
+                        summary.events[row[0]] = self.build(row, stats.get(row[0]))
+            except BaseException:
+                # Leave the marks for the next load to retry
+                with self.lock:
+                    summary.dirty |= dirty
+                    summary.rows_stale = summary.rows_stale or reload_rows
+                raise
+            if expired:
+                summary.built_at = started
+            entries = [summary.events[row[0]] for row in summary.event_rows]
+            if stale or reload_rows or summary.totals is None:
+                summary.totals = self.summarize(entries)
+            with self.lock:
+                self.hits += len(summary.event_rows) - len(stale)
+                self.recomputed += len(stale)
+            return entries, summary.totals
+
+    def mark_dirty(self, event_id):
+        """Recompute this event on its organizer's next dashboard load"""
+        with self.lock:
+            organizer_id = self.owners.get(event_id)
+            summary = self.organizers.get(organizer_id) if organizer_id is not None else None
+            if summary is not None:
+                summary.dirty.add(event_id)
+
+    def events_changed(self, organizer_id):
+        """Re-read the organizer's event list on the next load (e.g. after creating an event)"""
+        with self.lock:
+            summary = self.organizers.get(organizer_id)
+            if summary is not None:
+                summary.rows_stale = True
+
+    def stats(self):
+        with self.lock:
+            return {
+                'organizers': len(self.organizers),
+                'events': len(self.owners),
+                'dirty': sum(len(summary.dirty) for summary in self.organizers.values()),
+                'hits': self.hits,
+                'recomputed': self.recomputed
+            }
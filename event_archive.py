@@ -0,0 +1,392 @@
+import argparse
+import gzip
+import json
+import logging
+import os
+import sqlite3
+import statistics
+import threading
+import time
+
+from analytics_store import AnalyticsStore
+from storage import ShardRouter, MAX_BATCH_PARAMS, ensure_column, remove_live_answers_from_rollups, table_columns
+
+logger = logging.getLogger(__name__)
+
+# Answer tables moved out of the hot database; the rollups stay behind as the event's summary
+ARCHIVE_TABLES = ('live_answers', 'answers', 'feedback')
+
+ARCHIVE_TABLE_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS event_archive (
+        event_id INTEGER PRIMARY KEY,
+        archive_path TEXT NOT NULL,
+        archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        rehydrated_at TIMESTAMP,
+        row_count INTEGER NOT NULL DEFAULT 0,
+        archive_bytes INTEGER NOT NULL DEFAULT 0,
+        stats TEXT NOT NULL,
+        conflicts INTEGER NOT NULL DEFAULT 0
+    )
+'''
+
+# Per-event dashboard statistics; ShardRouter.aggregate_by_event fills in {event_ids}
+EVENT_STAT_QUERIES = {
+    # Regular feedback count and average rating
+    'feedback': '''
+        SELECT event_id, COUNT(id) as feedback_count, AVG(rating) as avg_rating
+        FROM feedback
+        WHERE event_id IN ({event_ids})
+        GROUP BY event_id
+    ''',
+    # Live answers count and average rating
+    'live': '''
+        SELECT event_id, COUNT(id) as live_count, AVG(rating) as live_avg_rating
+        FROM live_answers
+        WHERE event_id IN ({event_ids})
+        GROUP BY event_id
+    ''',
+    # Sentiment statistics across live answers, text answers and feedback comments
+    'sentiment': '''
+        SELECT
+            event_id,
+            COUNT(*) as total_answers,
+            SUM(CASE WHEN sentiment = 'positive' THEN 1 ELSE 0 END) as positive_count,
+            SUM(CASE WHEN sentiment = 'negative' THEN 1 ELSE 0 END) as negative_count,
+            SUM(CASE WHEN sentiment = 'neutral' THEN 1 ELSE 0 END) as neutral_count,
+            AVG(sentiment_score) as avg_sentiment_score,
+            AVG(sentiment_confidence) as avg_confidence
+        FROM (
+            SELECT event_id, sentiment, sentiment_score, sentiment_confidence
+            FROM live_answers WHERE event_id IN ({event_ids})
+            UNION ALL
+            SELECT event_id, sentiment, sentiment_score, sentiment_confidence
+            FROM answers WHERE event_id IN ({event_ids}) AND sentiment IS NOT NULL
+            UNION ALL
+            SELECT event_id, sentiment, sentiment_score, sentiment_confidence
+            FROM feedback WHERE event_id IN ({event_ids}) AND sentiment IS NOT NULL
+        )
+        GROUP BY event_id
+    '''
+}
+
+
+def create_archive_table(c):
+    c.execute(ARCHIVE_TABLE_SCHEMA)
+    # Archived rows a rehydration could not put back (added after release)
+    ensure_column(c, 'event_archive', 'conflicts', 'INTEGER NOT NULL DEFAULT 0')
+
+
+def write_archive(path, tables):
+    """Write (table, columns, rows) sections to a gzip archive file, complete on disk before it appears"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as raw:
+        with gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=6) as f:
+            for table, columns, rows in tables:
+                f.write(json.dumps({'table': table, 'columns': columns, 'rows': len(rows)}).encode() + b'\n')
+                for row in rows:
+                    f.write(json.dumps(row).encode() + b'\n')
+        raw.flush()
+        os.fsync(raw.fileno())
+    os.replace(tmp_path, path)
+
+
+def read_archive(path):
+    """Yield (table, columns, rows) from an event archive file"""
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            header = json.loads(line)
+            rows = [json.loads(next(f)) for _ in range(header['rows'])]
+            yield header['table'], header['columns'], rows
+
+
+def file_bytes(path):
+    """Size of a SQLite file including its WAL"""
+    return sum(os.path.getsize(p) for p in (path, path + '-wal') if os.path.exists(p))
+
+
+class EventArchive:
+    """Moves old events' answers out of the hot SQLite tables into gzip files
+
+    Each archived event gets one archive/event_<id>.jsonl.gz holding its
+    live_answers, answers and feedback rows, plus an event_archive row in
+    the catalog with the dashboard numbers it had when it was archived.
+    Opening one of the event's answer pages, or a new answer arriving, puts
+    the rows back, ids included, so sentiment corrections and analytics
+    high-water marks stay valid. Events, questions and rollups never leave the hot database.
+    """
+
+    def __init__(self, router, archive_dir='archive'):
+        self.router = router
+        self.archive_dir = archive_dir
+        # Serializes rehydration so two page loads don't restore one event twice
+        self.lock = threading.Lock()
+
+    def archive_path(self, event_id):
+        return os.path.join(self.archive_dir, f'event_{int(event_id)}.jsonl.gz')
+
+    def due_events(self, days):
+        """Events dated more than `days` ago that are hot and were not rehydrated within that time"""
+        conn = self.router.connect_catalog()
+        c = conn.cursor()
+        c.execute('''
+            SELECT e.id
+            FROM events e
+            LEFT JOIN event_archive ea ON ea.event_id = e.id
+            WHERE e.date < date('now', ?)
+              AND (ea.event_id IS NULL
+                   OR (ea.rehydrated_at IS NOT NULL AND ea.rehydrated_at < datetime('now', ?)))
+            ORDER BY e.id
+        ''', (f'-{days} days', f'-{days} days'))
+        event_ids = [row[0] for row in c.fetchall()]
+        conn.close()
+        return event_ids
+
+    def archive_event(self, event_id):
+        """Move one event's answer rows into its archive file; returns the rows moved"""
+        stats = {
+            name: list(self.router.aggregate_by_event([event_id], query).get(event_id, ()))
+            for name, query in EVENT_STAT_QUERIES.items()
+        }
+
+        conn = self.router.connect_event(event_id)
+        try:
+            c = conn.cursor()
+            tables = []
+            for table in ARCHIVE_TABLES:
+                columns = table_columns(c, table)
+                c.execute(f'SELECT {", ".join(columns)} FROM main.{table} WHERE event_id = ? ORDER BY id',
+                          (event_id,))
+                tables.append((table, columns, c.fetchall()))
+
+            # The file is complete on disk before any row leaves the database
+            os.makedirs(self.archive_dir, exist_ok=True)
+            path = self.archive_path(event_id)
+            write_archive(path, tables)
+
+            row_count = sum(len(rows) for _, _, rows in tables)
+            with conn:
+                conn.execute('''
+                    INSERT OR REPLACE INTO event_archive
+                        (event_id, archive_path, archived_at, rehydrated_at, row_count, archive_bytes, stats, conflicts)
+                    VALUES (?, ?, CURRENT_TIMESTAMP, NULL, ?, ?, ?, 0)
+                ''', (event_id, path, row_count, os.path.getsize(path), json.dumps(stats)))
+                for table, columns, rows in tables:
+                    if rows:
+                        conn.execute(f'DELETE FROM main.{table} WHERE event_id = ? AND id <= ?',
+                                     (event_id, rows[-1][columns.index('id')]))
+
+            # Rows written after the read above have higher ids and stayed hot. Writers check
+            # for an archive after they commit, so only rows committed before the archive row
+            # can be left here unseen; put the archive back rather than hide them
+            late = any(
+                conn.execute(f'SELECT 1 FROM main.{table} WHERE event_id = ? LIMIT 1', (event_id,)).fetchone()
+                for table in ARCHIVE_TABLES
+            )
+        finally:
+            conn.close()
+
+        if late:
+            logger.warning("Event %s got answers while it was archived; restoring it", event_id)
+            self.rehydrate(event_id)
+            return 0
+        return row_count
+
+    def conflicts_path(self, event_id):
+        """A new file for the rows one rehydration could not put back"""
+        name = f'event_{int(event_id)}.conflicts-{time.strftime("%Y%m%d%H%M%S")}.jsonl.gz'
+        return os.path.join(self.archive_dir, name)
+
+    def archive_due(self, days, compact=None):
+        """Archive every event older than `days`; returns {event_id: rows moved}
+
+        `compact` runs first so the analytics store has every row before it leaves.
+        """
+        if compact:
+            compact()
+        return {event_id: self.archive_event(event_id) for event_id in self.due_events(days)}
+
+    def is_archived(self, event_id, conn=None):
+        """`conn` may be any open connection that sees the catalog, to skip opening one"""
+        c = (conn or self.router.connect_catalog()).cursor()
+        c.execute('SELECT 1 FROM event_archive WHERE event_id = ? AND rehydrated_at IS NULL', (event_id,))
+        archived = c.fetchone() is not None
+        if conn is None:
+            c.connection.close()
+        return archived
+
+    def rehydrate(self, event_id):
+        """Put an archived event's rows back in the hot tables; returns the rows restored
+
+        Archived rows that conflict with hot ones written since (a live answer from
+        an email that answered the question again) are left out. They are kept in a
+        conflicts archive file, counted in event_archive.conflicts and taken out of
+        the live rollups, which still counted them.
+        """
+        with self.lock:
+            conn = self.router.connect_event(event_id)
+            try:
+                c = conn.cursor()
+                c.execute('SELECT archive_path FROM event_archive WHERE event_id = ? AND rehydrated_at IS NULL',
+                          (event_id,))
+                row = c.fetchone()
+                if row is None:
+                    return 0
+
+                restored = 0
+                dropped = []
+                with conn:
+                    for table, columns, rows in read_archive(row[0]):
+                        # Rows of an archive interrupted before its delete are still here
+                        hot_ids = {hot_id for (hot_id,) in conn.execute(
+                            f'SELECT id FROM main.{table} WHERE event_id = ?', (event_id,))}
+                        id_index = columns.index('id')
+                        rows = [archived for archived in rows if archived[id_index] not in hot_ids]
+                        if not rows:
+                            continue
+                        inserted = conn.executemany(f'INSERT OR IGNORE INTO main.{table} ({", ".join(columns)}) '
+                                                    f'VALUES ({", ".join("?" * len(columns))})', rows).rowcount
+                        restored += inserted
+                        if inserted < len(rows):
+                            hot_ids = {hot_id for (hot_id,) in conn.execute(
+                                f'SELECT id FROM main.{table} WHERE event_id = ?', (event_id,))}
+                            dropped.append((table, columns, [
+                                archived for archived in rows if archived[id_index] not in hot_ids
+                            ]))
+
+                    # The rollups kept counting the dropped live answers; their rows go to a file of their own
+                    conflicts = sum(len(rows) for _, _, rows in dropped)
+                    path = row[0]
+                    if conflicts:
+                        for table, columns, rows in dropped:
+                            if table == 'live_answers':
+                                remove_live_answers_from_rollups(c, [dict(zip(columns, archived)) for archived in rows])
+                        path = self.conflicts_path(event_id)
+                        write_archive(path, dropped)
+                    conn.execute('''
+                        UPDATE event_archive SET rehydrated_at = CURRENT_TIMESTAMP, conflicts = ?, archive_path = ?
+                        WHERE event_id = ?
+                    ''', (conflicts, path, event_id))
+            finally:
+                conn.close()
+
+            if conflicts:
+                logger.warning("Event %s: %s archived rows conflicted with newer ones and were not restored; "
+                               "they are kept in %s", event_id, conflicts, path)
+            try:
+                os.remove(row[0])
+            except OSError:
+                pass
+            return restored
+
+    def ensure_hot(self, event_id, conn=None):
+        """Rehydrate the event if it is archived; one primary key lookup when it is not"""
+        return self.rehydrate(event_id) if self.is_archived(event_id, conn) else 0
+
+    def summaries(self, event_ids):
+        """{event_id: dashboard stats saved at archive time} for the archived ones among event_ids"""
+        summaries = {}
+        conn = self.router.connect_catalog()
+        c = conn.cursor()
+        for start in range(0, len(event_ids), MAX_BATCH_PARAMS):
+            batch = event_ids[start:start + MAX_BATCH_PARAMS]
+            c.execute(f'''
+                SELECT event_id, stats FROM event_archive
+                WHERE rehydrated_at IS NULL AND event_id IN ({','.join('?' * len(batch))})
+            ''', batch)
+            for event_id, stats in c.fetchall():
+                summaries[event_id] = json.loads(stats)
+        conn.close()
+        return summaries
+
+    def vacuum(self):
+        """Give the space freed by archiving back to the filesystem"""
+        for path in self.router.shard_paths():
+            conn = sqlite3.connect(path)
+            conn.execute('VACUUM')
+            conn.close()
+
+    def report(self, repeat=5):
+        """Hot database size, archive size and the latency of queries that scan answer tables"""
+        paths = self.router.shard_paths()
+        if self.router.sharded:
+            paths.append(self.router.catalog_path)
+
+        rows = dict.fromkeys(ARCHIVE_TABLES, 0)
+        for _, conn in self.router.iter_shard_connections():
+            for table in ARCHIVE_TABLES:
+                rows[table] += conn.execute(f'SELECT COUNT(*) FROM main.{table}').fetchone()[0]
+
+        conn = self.router.connect_catalog()
+        event_ids = [row[0] for row in conn.execute('SELECT id FROM events ORDER BY id')]
+        archived, archive_bytes = conn.execute('''
+            SELECT COUNT(*), COALESCE(SUM(archive_bytes), 0) FROM event_archive WHERE rehydrated_at IS NULL
+        ''').fetchone()
+        conn.close()
+
+        def median_ms(fn):
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                fn()
+                timings.append((time.perf_counter() - started) * 1000)
+            return round(statistics.median(timings), 3)
+
+        def newest_event_answers():
+            conn = self.router.connect_event(event_ids[-1])
+            for table in ARCHIVE_TABLES:
+                conn.execute(f'SELECT * FROM {table} WHERE event_id = ?', (event_ids[-1],)).fetchall()
+            conn.close()
+
+        return {
+            'hot_bytes': sum(file_bytes(path) for path in paths),
+            'hot_rows': rows,
+            'events': len(event_ids),
+            'archived_events': archived,
+            'archive_bytes': archive_bytes,
+            'latency_ms': {
+                'dashboard_all_events': median_ms(lambda: [
+                    self.router.aggregate_by_event(event_ids, query) for query in EVENT_STAT_QUERIES.values()
+                ]) if event_ids else 0,
+                'newest_event_answers': median_ms(newest_event_answers) if event_ids else 0
+            }
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Archive old events out of the hot database')
+    parser.add_argument('--shard-mode', choices=['none', 'event', 'hash'], default=os.environ.get('SHARD_MODE', 'none'))
+    parser.add_argument('--shard-dir', default=os.environ.get('SHARD_DIR', 'shards'))
+    parser.add_argument('--shard-count', type=int, default=int(os.environ.get('SHARD_COUNT', '16')))
+    parser.add_argument('--archive-dir', default=os.environ.get('ARCHIVE_DIR', 'archive'))
+    parser.add_argument('--catalog', default='feedback_portal.db')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    archive = subparsers.add_parser('archive', help='archive events older than --days')
+    archive.add_argument('--days', type=int, default=int(os.environ.get('ARCHIVE_AFTER_DAYS', '90')))
+    archive.add_argument('--vacuum', action='store_true', help='VACUUM the hot databases afterwards')
+    rehydrate = subparsers.add_parser('rehydrate', help='move an archived event back into the hot tables')
+    rehydrate.add_argument('event_id', type=int)
+    subparsers.add_parser('report', help='hot database size and query latency')
+    args = parser.parse_args(argv)
+
+    router = ShardRouter(args.catalog, args.shard_mode, args.shard_dir, args.shard_count)
+    conn = router.connect_catalog()
+    create_archive_table(conn.cursor())
+    conn.commit()
+    conn.close()
+    event_archive = EventArchive(router, args.archive_dir)
+
+    if args.command == 'archive':
+        before = event_archive.report()
+        moved = event_archive.archive_due(args.days, compact=lambda: AnalyticsStore(db_path=args.catalog).compact(router))
+        if args.vacuum:
+            event_archive.vacuum()
+        print(f"Archived {len(moved)} events ({sum(moved.values())} rows)")
+        print(json.dumps({'before': before, 'after': event_archive.report()}, indent=2))
+    elif args.command == 'rehydrate':
+        print(f"Restored {event_archive.rehydrate(args.event_id)} rows")
+    else:
+        print(json.dumps(event_archive.report(), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,248 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+# Highest priority first: live answers, then feedback forms, then background work (rescoring)
+PRIORITY_CLASSES = ('live', 'forms', 'batch')
+
+
+def parse_weights(spec):
+    """{event_id: weight} from 'event_id:weight,...' (e.g. '12:4,15:2')"""
+    weights = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        event_id, weight = item.split(':')
+        weights[int(event_id)] = max(1, int(weight))
+    return weights
+
+
+def percentile(ordered, q):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class InferenceJob:
+    __slots__ = ('priority', 'event_id', 'fn', 'args', 'future', 'enqueued')
+
+    def __init__(self, priority, event_id, fn, args):
+        self.priority = priority
+        self.event_id = event_id
+        self.fn = fn
+        self.args = args
+        self.future = Future()
+        self.enqueued = time.monotonic()
+
+
+class FairQueue:
+    """Per-event FIFO queues served in weighted round-robin
+
+    The event at the head of the ring gets up to `weight(event_id)` jobs in a
+    row before the next event's turn, so one busy event cannot starve the
+    others in the same priority class.
+    """
+    __slots__ = ('weight', 'queues', 'ring', 'credit', 'size')
+
+    def __init__(self, weight):
+        self.weight = weight
+        self.queues = {}
+        self.ring = deque()
+        self.credit = {}
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def push(self, event_id, job):
+        queue = self.queues.get(event_id)
+        if queue is None:
+            queue = self.queues[event_id] = deque()
+            self.ring.append(event_id)
+            self.credit[event_id] = self.weight(event_id)
+        queue.append(job)
+        self.size += 1
+
+    def pop(self):
+        event_id = self.ring[0]
+        queue = self.queues[event_id]
+        job = queue.popleft()
+        self.size -= 1
+        self.credit[event_id] -= 1
+        if not queue:
+            del self.queues[event_id]
+            del self.credit[event_id]
+            self.ring.popleft()
+        elif self.credit[event_id] <= 0:
+            self.credit[event_id] = self.weight(event_id)
+            self.ring.rotate(-1)
+        return job
+
+
+class ClassMetrics:
+    """Queue wait and run time samples for one priority class over a sliding window"""
+    __slots__ = ('waits', 'completed', 'failed', 'run_seconds')
+
+    def __init__(self, max_samples=2000):
+        # (finished at, wait ms)
+        self.waits = deque(maxlen=max_samples)
+        self.completed = 0
+        self.failed = 0
+        self.run_seconds = 0.0
+
+    def recent_waits(self, now, window_seconds):
+        return sorted(wait for at, wait in self.waits if now - at <= window_seconds)
+
+
+class InferenceScheduler:
+    """Runs sentiment inference for every caller on one pool, by priority class
+
+    Workers always take live work first, then forms, then batch. Within a
+    class, events share the workers in weighted round-robin. Batch work is
+    submitted in chunks of `chunk_size` texts and may use at most
+    `batch_workers` workers. It is held back entirely while the live class's
+    recent queue-wait p99 is above `live_budget_ms`, so a backfill yields
+    whenever live answers start to queue.
+
+    Callers get a concurrent.futures.Future from submit(); predict() and
+    analyze_batch() wait for it. With a cooperative `sleep` (eventlet/gevent)
+    they poll instead of blocking the hub.
+    """
+
+    def __init__(self, analyzer, workers=2, batch_workers=1, live_budget_ms=50.0, weights=None,
+                 chunk_size=64, window_seconds=10.0, sleep=None, poll_interval=0.002):
+        self.analyzer = analyzer
+        self.batch_workers = max(1, min(batch_workers, workers))
+        self.live_budget_ms = live_budget_ms
+        self.weights = dict(weights or {})
+        self.chunk_size = chunk_size
+        self.window_seconds = window_seconds
+        self.sleep = sleep
+        self.poll_interval = poll_interval
+        self.cond = threading.Condition()
+        self.queues = {name: FairQueue(self.weight) for name in PRIORITY_CLASSES}
+        self.running = {name: 0 for name in PRIORITY_CLASSES}
+        self.metrics = {name: ClassMetrics() for name in PRIORITY_CLASSES}
+        # Cached over-budget verdict, refreshed at most every 100 ms
+        self.budget_checked = 0.0
+        self.over_budget = False
+        self.batch_deferrals = 0
+        self.workers = [threading.Thread(target=self.work, name=f'inference-{i}', daemon=True)
+                        for i in range(workers)]
+        for worker in self.workers:
+            worker.start()
+
+    def weight(self, event_id):
+        return self.weights.get(event_id, 1)
+
+    def set_weight(self, event_id, weight):
+        with self.cond:
+            self.weights[event_id] = max(1, int(weight))
+
+    def submit(self, priority, event_id, fn, *args):
+        """Queue fn(*args) for one event in a priority class; returns a Future"""
+        if priority not in PRIORITY_CLASSES:
+            raise ValueError(f"Unknown inference priority: {priority}")
+        job = InferenceJob(priority, event_id, fn, args)
+        with self.cond:
+            self.queues[priority].push(event_id, job)
+            self.cond.notify()
+        return job.future
+
+    def wait(self, future):
+        if self.sleep is not None:
+            while not future.done():
+                self.sleep(self.poll_interval)
+        return future.result()
+
+    def predict(self, text, event_id=None, priority='live'):
+        return self.wait(self.submit(priority, event_id, self.analyzer.predict_sentiment, text))
+
+    def analyze_batch(self, texts, event_id=None, priority='forms'):
+        """analyzer.analyze_batch in chunk_size pieces, so no single job holds a worker for long"""
+        futures = [self.submit(priority, event_id, self.analyzer.analyze_batch, texts[start:start + self.chunk_size])
+                   for start in range(0, len(texts), self.chunk_size)]
+        return [result for future in futures for result in self.wait(future)]
+
+    def _live_over_budget(self, now):
+        if now - self.budget_checked >= 0.1:
+            waits = self.metrics['live'].recent_waits(now, self.window_seconds)
+            self.over_budget = percentile(waits, 0.99) > self.live_budget_ms
+            self.budget_checked = now
+        return self.over_budget
+
+    def _next_job(self):
+        """Highest-priority runnable job, or None; call with the condition held"""
+        for name in PRIORITY_CLASSES:
+            queue = self.queues[name]
+            if not queue:
+                continue
+            if name == 'batch':
+                if self.running['batch'] >= self.batch_workers:
+                    return None
+                if self._live_over_budget(time.monotonic()):
+                    self.batch_deferrals += 1
+                    return None
+            return queue.pop()
+        return None
+
+    def work(self):
+        while True:
+            with self.cond:
+                job = self._next_job()
+                while job is None:
+                    # Deferred batch work is retried once the live waits age out of the window
+                    self.cond.wait(0.1 if self.queues['batch'] else None)
+                    job = self._next_job()
+                self.running[job.priority] += 1
+
+            started = time.monotonic()
+            wait_ms = (started - job.enqueued) * 1000
+            failed = False
+            if job.future.set_running_or_notify_cancel():
+                try:
+                    job.future.set_result(job.fn(*job.args))
+                except BaseException as e:
+                    failed = True
+                    job.future.set_exception(e)
+            finished = time.monotonic()
+
+            with self.cond:
+                self.running[job.priority] -= 1
+                metrics = self.metrics[job.priority]
+                metrics.waits.append((finished, wait_ms))
+                metrics.completed += 1
+                metrics.failed += failed
+                metrics.run_seconds += finished - started
+                # A freed batch slot may let a waiting worker take batch work
+                self.cond.notify()
+
+    def stats(self):
+        """Per-class queue depth, queue-wait percentiles over the window and run time"""
+        now = time.monotonic()
+        with self.cond:
+            classes = {}
+            for name in PRIORITY_CLASSES:
+                metrics = self.metrics[name]
+                waits = metrics.recent_waits(now, self.window_seconds)
+                classes[name] = {
+                    'queued': len(self.queues[name]),
+                    'queued_events': len(self.queues[name].queues),
+                    'running': self.running[name],
+                    'completed': metrics.completed,
+                    'failed': metrics.failed,
+                    'wait_ms': {
+                        'p50': round(percentile(waits, 0.50), 2),
+                        'p99': round(percentile(waits, 0.99), 2),
+                        'max': round(waits[-1], 2) if waits else 0.0
+                    },
+                    'mean_run_ms': round(metrics.run_seconds / metrics.completed * 1000, 2) if metrics.completed else 0.0
+                }
+            return {
+                'workers': len(self.workers),
+                'batch_workers': self.batch_workers,
+                'live_budget_ms': self.live_budget_ms,
+                'window_seconds': self.window_seconds,
+                'live_over_budget': self._live_over_budget(now),
+                'batch_deferrals': self.batch_deferrals,
+                'classes': classes
+            }
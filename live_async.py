@@ -0,0 +1,501 @@
+"""Asyncio serving mode for the live endpoints
+
+Serves the whole app as one ASGI application under uvicorn:
+- Socket.IO (join_event / leave_event and every broadcast) runs on a
+  python-socketio AsyncServer.
+- submit_live_answer, get_live_questions and get_sentiment_analysis are
+  native coroutines. SQLite work goes to AsyncDB's thread pool and
+  sentiment inference to InferencePool, so the event loop only parses,
+  routes and emits.
+- /api/admin/profile samples on an executor thread, so a profile never
+  blocks the Flask routes below.
+- Every other route is the unchanged Flask app, run by asgiref on a pool of
+  FLASK_WORKERS threads, so logins, dashboards and exports run side by side.
+
+Live rooms, shard routing and the model are the objects app.py already
+holds, so Flask routes and the async endpoints share one state.
+
+Usage:
+    pip install uvicorn asgiref
+    python live_async.py [--host 127.0.0.1] [--port 5000]
+"""
+import argparse
+import asyncio
+import functools
+import io
+import json
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http.cookies import SimpleCookie
+from urllib.parse import parse_qs
+
+import socketio
+from itsdangerous import BadSignature
+from werkzeug.datastructures import MultiDict
+from werkzeug.formparser import parse_form_data
+
+import app as portal
+from live_state import LiveAnswer
+from sampling_profiler import ProfilerBusy
+from sentiment_analyzer import ModelNotReady
+from storage import attendee_identity, live_answer_exists
+
+# Threads for blocking SQLite calls (inference runs on app.inference's workers)
+ASYNC_DB_WORKERS = int(os.environ.get('ASYNC_DB_WORKERS', '4'))
+# Threads for the Flask routes behind the async ones; they share the GIL with the
+# event loop, so a large pool of busy exports slows the live endpoints down
+FLASK_WORKERS = int(os.environ.get('FLASK_WORKERS', '4'))
+
+
+class AsyncDB:
+    """Runs blocking sqlite3 work on a small thread pool so the event loop never waits on disk
+
+    Every call opens its own connection on the worker thread, because sqlite3
+    connections cannot be shared between threads.
+    """
+
+    def __init__(self, router, max_workers=4):
+        self.router = router
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='async-db')
+
+    async def call(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+    async def run(self, fn, *args, event_id=None):
+        """Call fn(conn, *args) on the event's shard, or on the catalog without an event"""
+        def work():
+            conn = self.router.connect_event(event_id) if event_id is not None else self.router.connect_catalog()
+            try:
+                return fn(conn, *args)
+            finally:
+                conn.close()
+        return await self.call(work)
+
+
+class InferencePool:
+    """Scores answers off the event loop as live-priority jobs on the shared inference scheduler"""
+
+    def __init__(self, scheduler):
+        self.scheduler = scheduler
+        self.analyzer = scheduler.analyzer
+
+    def _score(self, text, with_terms):
+        result = self.analyzer.predict_sentiment(text)
+        terms = self.analyzer.extract_terms(text) if with_terms else None
+        return result, terms
+
+    async def score(self, text, event_id, with_terms=False):
+        """(sentiment_result, trending terms or None) for one answer"""
+        return await asyncio.wrap_future(self.scheduler.submit('live', event_id, self._score, text, with_terms))
+
+
+class QuestionWaiters:
+    """asyncio version of app.py's long-poll waiters; notify() may be called from any thread"""
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.events = {}
+
+    def get(self, event_id):
+        waiter = self.events.get(event_id)
+        if waiter is None:
+            waiter = self.events[event_id] = asyncio.Event()
+        return waiter
+
+    def notify(self, event_id):
+        self.loop.call_soon_threadsafe(self._wake, event_id)
+
+    def _wake(self, event_id):
+        waiter = self.events.pop(event_id, None)
+        if waiter is not None:
+            waiter.set()
+
+
+def organizer_owns_event(conn, event_id, user_id):
+    c = conn.cursor()
+    c.execute('SELECT name FROM events WHERE id = ? AND organizer_id = ?', (event_id, user_id))
+    return c.fetchone() is not None
+
+
+def answered_before(conn, live_question_id, attendee):
+    return live_answer_exists(conn.cursor(), live_question_id, attendee)
+
+
+def question_changes(conn, event_id, since):
+    return portal.fetch_live_question_changes(conn.cursor(), event_id, since)
+
+
+async def read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body'):
+            return b''.join(chunks)
+
+
+def header(scope, name):
+    for key, value in scope['headers']:
+        if key == name:
+            return value.decode('latin-1')
+    return ''
+
+
+def parse_form(scope, body):
+    """Form fields of a urlencoded or multipart body, parsed the way Flask does"""
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'CONTENT_TYPE': header(scope, b'content-type'),
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.input': io.BytesIO(body)
+    }
+    _, form, _ = parse_form_data(environ)
+    return form
+
+
+def query_args(scope):
+    return MultiDict([
+        (key, value)
+        for key, values in parse_qs(scope.get('query_string', b'').decode('latin-1')).items()
+        for value in values
+    ])
+
+
+def session_data(scope):
+    """Contents of Flask's signed session cookie, or {}"""
+    flask_app = portal.app
+    cookie = SimpleCookie(header(scope, b'cookie')).get(flask_app.config['SESSION_COOKIE_NAME'])
+    if cookie is None:
+        return {}
+    serializer = flask_app.session_interface.get_signing_serializer(flask_app)
+    try:
+        return serializer.loads(cookie.value, max_age=int(flask_app.permanent_session_lifetime.total_seconds()))
+    except BadSignature:
+        return {}
+
+
+def session_user_id(scope):
+    """user_id from Flask's signed session cookie, or None"""
+    return session_data(scope).get('user_id')
+
+
+async def send_json(send, payload, status=200):
+    body = json.dumps(payload).encode('utf-8')
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())]
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def send_text(send, text, status=200):
+    body = text.encode('utf-8')
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'text/plain; charset=utf-8'), (b'content-length', str(len(body)).encode())]
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def send_redirect(send, location):
+    await send({'type': 'http.response.start', 'status': 302, 'headers': [(b'location', location.encode())]})
+    await send({'type': 'http.response.body', 'body': b''})
+
+
+class LiveServer:
+    def __init__(self, db_workers=ASYNC_DB_WORKERS):
+        self.sio = socketio.AsyncServer(async_mode='asgi', cors_allowed_origins='*')
+        self.sio.on('connect', self.on_connect)
+        self.sio.on('disconnect', self.on_disconnect)
+        self.sio.on('join_event', self.on_join_event)
+        self.sio.on('leave_event', self.on_leave_event)
+        self.db = AsyncDB(portal.storage, db_workers)
+        self.inference = InferencePool(portal.inference)
+        self.loop = None
+        self.waiters = None
+        # Emits scheduled from the loop thread, kept referenced until they finish
+        self.pending = set()
+        self.routes = [
+            ('POST', re.compile(r'/submit_live_answer$'), self.submit_live_answer),
+            ('GET', re.compile(r'/get_live_questions/(\d+)$'), self.get_live_questions),
+            ('GET', re.compile(r'/get_sentiment_analysis/(\d+)$'), self.get_sentiment_analysis),
+            ('GET', re.compile(r'/api/admin/profile$'), self.admin_profile)
+        ]
+
+    async def startup(self):
+        self.loop = asyncio.get_running_loop()
+        self.waiters = QuestionWaiters(self.loop)
+
+        # Flask routes running on worker threads reach clients and waiters through these hooks
+        portal.live_question_listeners.append(self.waiters.notify)
+        portal.room_emitter = self.emit_to_room
+        portal.profiler_label_sources.append(self.profile_labels)
+
+        if portal.app.config['ONLINE_LEARNING']:
+            threading.Thread(target=portal.online_learner.run, name='online-learner', daemon=True).start()
+        if portal.app.config['ANALYTICS_COMPACT_INTERVAL'] > 0:
+            self.schedule(self.analytics_compaction_loop())
+        if portal.app.config['ARCHIVE_INTERVAL'] > 0:
+            self.schedule(self.event_archive_loop())
+
+    def profile_labels(self):
+        """Coroutine handlers for the profiler, labelled like the Flask routes they replace"""
+        rules = {rule.endpoint: rule.rule for rule in portal.app.url_map.iter_rules()}
+        labels = {handler.__func__.__code__: f'{method} {rules[handler.__name__]}'
+                  for method, _, handler in self.routes}
+        for handlers in self.sio.handlers.values():
+            for event, handler in handlers.items():
+                labels[handler.__func__.__code__] = f'socketio {event}'
+        return labels
+
+    def schedule(self, coro):
+        task = self.loop.create_task(coro)
+        self.pending.add(task)
+        task.add_done_callback(self.pending.discard)
+
+    def emit_to_room(self, event, payload, event_id):
+        """app.broadcast replacement: emit on the async server from the loop or any thread"""
+        coro = self.sio.emit(event, payload, room=f'event_{event_id}')
+        try:
+            on_loop = asyncio.get_running_loop() is self.loop
+        except RuntimeError:
+            on_loop = False
+        if on_loop:
+            self.schedule(coro)
+        else:
+            asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    async def event_archive_loop(self):
+        """Periodically archive events older than ARCHIVE_AFTER_DAYS"""
+        while True:
+            await asyncio.sleep(portal.app.config['ARCHIVE_INTERVAL'])
+            try:
+                moved = await self.db.call(portal.event_archive.archive_due, portal.app.config['ARCHIVE_AFTER_DAYS'],
+                                           lambda: portal.analytics_store.compact(portal.storage))
+                if moved:
+                    print(f"Archived {len(moved)} events ({sum(moved.values())} rows)")
+            except Exception as e:
+                print(f"Error archiving events: {e}")
+
+    async def analytics_compaction_loop(self):
+        """Periodically move new answers into the columnar analytics store"""
+        while True:
+            await asyncio.sleep(portal.app.config['ANALYTICS_COMPACT_INTERVAL'])
+            try:
+                rows = await self.db.call(portal.analytics_store.compact, portal.storage)
+                if rows:
+                    print(f"Analytics store compacted {rows} rows")
+            except Exception as e:
+                print(f"Error compacting analytics store: {e}")
+
+    async def live_room(self, event_id):
+        room = portal.live_rooms.peek(event_id)
+        if room is None:
+            # A cold room is loaded from SQLite, so do it on the DB pool
+            room = await self.db.call(portal.live_rooms.get, event_id)
+        return room
+
+    async def known_live_room(self, event_id):
+        """The event's live room, or None for an unknown event (see app.known_live_room)"""
+        room = portal.live_rooms.peek(event_id)
+        if room is None:
+            room = await self.db.call(portal.known_live_room, event_id)
+        return room
+
+    async def on_connect(self, sid, environ, auth=None):
+        portal.traffic_recorder.socket('connect', sid)
+
+    async def on_disconnect(self, sid, reason=None):
+        portal.traffic_recorder.socket('disconnect', sid)
+
+    async def on_join_event(self, sid, data):
+        portal.traffic_recorder.socket('join_event', sid, data)
+        event_id = data['event_id']
+        await self.sio.enter_room(sid, f'event_{event_id}')
+        await self.sio.emit('status', {'msg': f'Joined event {event_id}'}, to=sid)
+
+    async def on_leave_event(self, sid, data):
+        portal.traffic_recorder.socket('leave_event', sid, data)
+        event_id = data['event_id']
+        await self.sio.leave_room(sid, f'event_{event_id}')
+        await self.sio.emit('status', {'msg': f'Left event {event_id}'}, to=sid)
+
+    async def submit_live_answer(self, scope, receive, send):
+        form = parse_form(scope, await read_body(receive))
+        portal.traffic_recorder.http('POST', '/submit_live_answer', scope['path'], query_args(scope), form)
+        live_question_id = form.get('live_question_id', type=int)
+        event_id = form.get('event_id', type=int)
+        answer_text = form.get('answer_text', '')
+        rating = form.get('rating')
+        attendee_name = form.get('attendee_name', '')
+        attendee_email = form.get('attendee_email', '')
+
+        if not live_question_id or not event_id:
+            return await send_json(send, {'success': False, 'message': 'Invalid request'})
+
+        # An archived event's answers come back first, so the duplicate check below sees them
+        await self.db.call(portal.ensure_live_event_hot, event_id)
+        room = await self.known_live_room(event_id)
+        if room is None:
+            return await send_json(send, {'success': False, 'message': 'Event not found'}, 404)
+
+        # One answer per attendee email, checked before any inference is spent on it
+        attendee = attendee_identity(attendee_email)
+        if attendee and room.may_have_answered(live_question_id, attendee):
+            if await self.db.run(answered_before, live_question_id, attendee, event_id=event_id):
+                return await send_json(send, portal.DUPLICATE_LIVE_ANSWER)
+
+        sentiment_result, terms = await self.inference.score(
+            answer_text, event_id, with_terms=room is not None and room.trends is not None)
+
+        # Open from before the commit until the room has the answer (see LiveRoomRegistry.writing)
+        with portal.live_rooms.writing(event_id):
+            answer_id = await self.db.run(portal.save_live_answer, live_question_id, event_id, answer_text,
+                                          rating, attendee_name, attendee_email, sentiment_result,
+                                          event_id=event_id)
+            if answer_id is None:
+                return await send_json(send, portal.DUPLICATE_LIVE_ANSWER)
+
+            answer = LiveAnswer(answer_id, live_question_id, answer_text, rating, attendee_name,
+                                sentiment_result['sentiment'], sentiment_result['score'],
+                                sentiment_result['confidence'], datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S'),
+                                None)
+            portal.publish_live_answer(answer, event_id, terms, attendee)
+
+        await send_json(send, {'success': True, 'message': 'Answer submitted successfully'})
+
+    async def get_live_questions(self, scope, receive, send, event_id):
+        event_id = int(event_id)
+        args = query_args(scope)
+        portal.traffic_recorder.http('GET', '/get_live_questions/<int:event_id>', scope['path'], args, MultiDict())
+        since = args.get('since', type=int)
+        wait = min(args.get('wait', 0, type=float), portal.app.config['LIVE_POLL_MAX_WAIT'])
+
+        room = await self.known_live_room(event_id)
+        if room is None:
+            return await send_json(send, {'error': 'Event not found'}, 404)
+
+        if since is None:
+            questions = [question.to_payload() for question in room.active_questions()]
+            return await send_json(send, {'questions': questions, 'cursor': room.cursor})
+
+        deadline = self.loop.time() + wait
+        while True:
+            # Grab the waiter before checking so a change in between is not missed
+            waiter = self.waiters.get(event_id) if wait > 0 else None
+
+            # Only a cached room's cursor is trusted to be current (see app.get_live_questions)
+            if portal.live_rooms.peek(event_id) is room and room.cursor <= since:
+                questions, removed, cursor = [], [], since
+            else:
+                questions, removed, cursor = await self.db.run(question_changes, event_id, since)
+
+            remaining = deadline - self.loop.time()
+            if questions or removed or waiter is None or remaining <= 0:
+                break
+
+            # A parked poll is a suspended coroutine: no thread, no DB connection
+            try:
+                await asyncio.wait_for(waiter.wait(), remaining)
+            except asyncio.TimeoutError:
+                break
+
+        await send_json(send, {'questions': questions, 'removed': removed, 'cursor': cursor})
+
+    async def get_sentiment_analysis(self, scope, receive, send, event_id):
+        event_id = int(event_id)
+        user_id = session_user_id(scope)
+        portal.traffic_recorder.http('GET', '/get_sentiment_analysis/<int:event_id>', scope['path'],
+                                     query_args(scope), MultiDict(), user_id)
+        if user_id is None:
+            return await send_redirect(send, '/')
+
+        if not await self.db.run(organizer_owns_event, event_id, user_id):
+            return await send_json(send, {'error': 'Access denied'})
+
+        room = await self.live_room(event_id)
+        await send_json(send, portal.sentiment_analysis_payload(room.sentiment_summary()))
+
+    async def admin_profile(self, scope, receive, send):
+        session = session_data(scope)
+        if 'user_id' not in session:
+            return await send_json(send, {'error': 'Please log in first'}, 401)
+        if not await self.db.call(portal.is_admin_session, session):
+            return await send_json(send, {'error': 'Admin access required'}, 403)
+
+        args = query_args(scope)
+        profile = functools.partial(portal.profiler.profile, args.get('seconds', 10, type=float),
+                                    args.get('hz', 100, type=int), include_idle=args.get('idle') == '1')
+        try:
+            result = await self.loop.run_in_executor(None, profile)
+        except ProfilerBusy:
+            return await send_json(send, {'error': 'A profile is already running'}, 409)
+
+        if args.get('format') == 'folded':
+            return await send_text(send, '\n'.join(result['folded']) + '\n')
+        await send_json(send, result)
+
+    def asgi_app(self, fallback):
+        """Socket.IO, then the async live routes, then `fallback` (the Flask app) for the rest"""
+        async def live_routes(scope, receive, send):
+            if scope['type'] == 'http':
+                for method, pattern, handler in self.routes:
+                    match = pattern.match(scope['path'])
+                    if match and scope['method'] == method:
+                        try:
+                            return await handler(scope, receive, send, *match.groups())
+                        except ModelNotReady as e:
+                            return await send_json(send, {'success': False, 'message': str(e)}, 503)
+            await fallback(scope, receive, send)
+
+        return socketio.ASGIApp(self.sio, other_asgi_app=live_routes, on_startup=self.startup)
+
+
+def pooled_wsgi_app(wsgi_app, max_workers):
+    """asgiref's WSGI adapter, but run on its own thread pool
+
+    WsgiToAsgi runs the app with sync_to_async(thread_sensitive=True), i.e. on
+    one shared thread, which would serve every Flask request one at a time.
+    """
+    try:
+        from asgiref.sync import SyncToAsync
+        from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+    except ImportError:
+        raise RuntimeError("The asyncio server requires asgiref (pip install asgiref uvicorn)")
+
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='flask')
+    run_wsgi_app = SyncToAsync(WsgiToAsgiInstance.__dict__['run_wsgi_app'].func, thread_sensitive=False, executor=executor)
+    instance_class = type('PooledWsgiToAsgiInstance', (WsgiToAsgiInstance,), {'run_wsgi_app': run_wsgi_app})
+
+    class PooledWsgiToAsgi(WsgiToAsgi):
+        async def __call__(self, scope, receive, send):
+            await instance_class(self.wsgi_application, self.duplicate_header_limit)(scope, receive, send)
+
+    return PooledWsgiToAsgi(wsgi_app)
+
+
+def create_app():
+    """The ASGI application: async live endpoints in front of the Flask app"""
+    return LiveServer().asgi_app(pooled_wsgi_app(portal.app, FLASK_WORKERS))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run the feedback portal on an asyncio (ASGI) server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5000)
+    args = parser.parse_args(argv)
+
+    try:
+        import uvicorn
+    except ImportError:
+        raise SystemExit("The asyncio server requires uvicorn (pip install uvicorn asgiref)")
+    uvicorn.run(create_app(), host=args.host, port=args.port)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,565 @@
+import hashlib
+import heapq
+import math
+import sqlite3
+import sys
+import threading
+from array import array
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from storage import ATTENDEE_IDENTITY_SQL
+from trending import SlidingTermCounter, parse_submitted_at
+
+SENTIMENT_INDEX = {'negative': 0, 'positive': 1, 'neutral': 2}
+
+# Longest answer text kept in memory; the database keeps the full answer
+MAX_CACHED_TEXT = 500
+
+
+class LiveQuestion:
+    __slots__ = ('question_id', 'question_text', 'question_type', 'is_active', 'created_at')
+
+    def __init__(self, question_id, question_text, question_type, is_active, created_at):
+        self.question_id = question_id
+        self.question_text = question_text
+        self.question_type = question_type
+        self.is_active = is_active
+        self.created_at = created_at
+
+    def to_payload(self):
+        return {
+            'question_id': self.question_id,
+            'question_text': self.question_text,
+            'question_type': self.question_type,
+            'created_at': self.created_at
+        }
+
+
+class LiveAnswer:
+    __slots__ = ('answer_id', 'live_question_id', 'answer_text', 'rating', 'attendee_name',
+                 'sentiment', 'sentiment_score', 'sentiment_confidence', 'submitted_at', 'question_text')
+
+    def __init__(self, answer_id, live_question_id, answer_text, rating, attendee_name,
+                 sentiment, sentiment_score, sentiment_confidence, submitted_at, question_text):
+        self.answer_id = answer_id
+        self.live_question_id = live_question_id
+        self.answer_text = (answer_text or '')[:MAX_CACHED_TEXT]
+        self.rating = rating
+        self.attendee_name = attendee_name
+        self.sentiment = sentiment
+        self.sentiment_score = sentiment_score
+        self.sentiment_confidence = sentiment_confidence
+        self.submitted_at = submitted_at
+        self.question_text = question_text
+
+    def to_payload(self, event_id):
+        return {
+            'answer_id': self.answer_id,
+            'answer_text': self.answer_text,
+            'rating': self.rating,
+            'attendee_name': self.attendee_name,
+            'sentiment': self.sentiment,
+            'sentiment_score': self.sentiment_score,
+            'sentiment_confidence': self.sentiment_confidence,
+            'event_id': event_id,
+            'live_question_id': self.live_question_id
+        }
+
+
+class AnswerRing:
+    """Fixed-capacity buffer holding the most recent answers"""
+    __slots__ = ('slots', 'head', 'size')
+
+    def __init__(self, capacity):
+        self.slots = [None] * capacity
+        self.head = 0
+        self.size = 0
+
+    def append(self, answer):
+        self.slots[self.head] = answer
+        self.head = (self.head + 1) % len(self.slots)
+        self.size = min(self.size + 1, len(self.slots))
+
+    def newest_first(self):
+        capacity = len(self.slots)
+        for i in range(1, self.size + 1):
+            yield self.slots[(self.head - i) % capacity]
+
+    def find(self, answer_id):
+        for answer in self.newest_first():
+            if answer.answer_id == answer_id:
+                return answer
+        return None
+
+
+class TopAnswers:
+    """The K most positive and K most negative answers to one question
+
+    Each side is a min-heap of (strength, answer_id, text) capped at K
+    entries, so adding an answer is O(log K) and reading a side is O(K)
+    however many answers the question has.
+    """
+    __slots__ = ('capacity', 'positive', 'negative')
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.positive = []
+        self.negative = []
+
+    def add(self, answer_id, text, score):
+        if not score:
+            return
+        heap = self.positive if score > 0 else self.negative
+        entry = (abs(score), answer_id, text)
+        if len(heap) < self.capacity:
+            heapq.heappush(heap, entry)
+        elif entry > heap[0]:
+            heapq.heapreplace(heap, entry)
+
+    def discard(self, answer_id):
+        for heap in (self.positive, self.negative):
+            for i, entry in enumerate(heap):
+                if entry[1] == answer_id:
+                    heap[i] = heap[-1]
+                    heap.pop()
+                    heapq.heapify(heap)
+                    return
+
+    @staticmethod
+    def _ranked(heap, sign):
+        return [
+            {'answer_id': answer_id, 'answer_text': text, 'sentiment_score': sign * strength}
+            for strength, answer_id, text in sorted(heap, reverse=True)
+        ]
+
+    def to_payload(self):
+        return {
+            'top_positive': self._ranked(self.positive, 1),
+            'top_negative': self._ranked(self.negative, -1)
+        }
+
+
+class BloomFilter:
+    """Set membership filter: "absent" is certain, "present" may be a false positive
+
+    The first layer is sized for `capacity` keys. Once that many are added a new
+    layer with twice the capacity and half the false positive rate is started,
+    so the overall rate stays under `error_rate` however many keys arrive. Bit
+    positions for every layer come from one blake2b digest by double hashing.
+    """
+    __slots__ = ('layers', 'count')
+
+    def __init__(self, capacity=1000, error_rate=0.01):
+        # [bits, hashes, capacity, false positive rate] per layer
+        self.layers = [self._layer(capacity, error_rate / 2)]
+        # Keys added to the newest layer
+        self.count = 0
+
+    @staticmethod
+    def _layer(capacity, error_rate):
+        size = max(64, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        hashes = max(1, round(size / capacity * math.log(2)))
+        return [bytearray((size + 7) // 8), hashes, capacity, error_rate]
+
+    @staticmethod
+    def _positions(digest, layer):
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        size = len(layer[0]) * 8
+        return [(h1 + i * h2) % size for i in range(layer[1])]
+
+    @staticmethod
+    def _digest(key):
+        return hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+
+    def _contains(self, digest):
+        for layer in self.layers:
+            bits = layer[0]
+            if all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(digest, layer)):
+                return True
+        return False
+
+    def add(self, key):
+        digest = self._digest(key)
+        if self._contains(digest):
+            return
+        layer = self.layers[-1]
+        if self.count >= layer[2]:
+            layer = self._layer(layer[2] * 2, layer[3] / 2)
+            self.layers.append(layer)
+            self.count = 0
+        for position in self._positions(digest, layer):
+            layer[0][position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        return self._contains(self._digest(key))
+
+    @property
+    def nbytes(self):
+        return sum(len(layer[0]) for layer in self.layers)
+
+
+class LiveRoom:
+    """In-memory state for one live event: questions, recent answers and sentiment totals"""
+    __slots__ = ('event_id', 'questions', 'cursor', 'answers', 'sentiment_counts', 'totals',
+                 'top_k', 'top_answers', 'trends', 'filter_capacity', 'filter_error_rate', 'answered', 'lock')
+
+    def __init__(self, event_id, answer_capacity, top_k=5, filter_capacity=1000, filter_error_rate=0.01):
+        self.event_id = event_id
+        self.questions = {}
+        # Mirrors MAX(live_questions.revision) for the delta sync cursor
+        self.cursor = 0
+        self.answers = AnswerRing(answer_capacity)
+        # negative, positive, neutral
+        self.sentiment_counts = array('q', [0, 0, 0])
+        # answer count, score sum, confidence sum
+        self.totals = array('d', [0, 0, 0])
+        self.top_k = top_k
+        # question_id -> TopAnswers
+        self.top_answers = {}
+        # SlidingTermCounter, or None when trending is disabled
+        self.trends = None
+        self.filter_capacity = filter_capacity
+        self.filter_error_rate = filter_error_rate
+        # question_id -> BloomFilter of attendee identities that answered it
+        self.answered = {}
+        self.lock = threading.Lock()
+
+    def load(self, conn):
+        """Warm the room from the database"""
+        c = conn.cursor()
+        c.execute('''
+            SELECT id, question_text, question_type, is_active, created_at
+            FROM live_questions
+            WHERE event_id = ?
+            ORDER BY created_at, id
+        ''', (self.event_id,))
+        for row in c.fetchall():
+            self.questions[row[0]] = LiveQuestion(*row)
+
+        c.execute('SELECT COALESCE(MAX(revision), 0) FROM live_questions WHERE event_id = ?', (self.event_id,))
+        self.cursor = c.fetchone()[0]
+
+        c.execute('''
+            SELECT la.id, la.live_question_id, la.answer_text, la.rating, la.attendee_name,
+                   la.sentiment, la.sentiment_score, la.sentiment_confidence, la.submitted_at,
+                   lq.question_text
+            FROM live_answers la
+            JOIN live_questions lq ON la.live_question_id = lq.id
+            WHERE la.event_id = ?
+            ORDER BY la.id DESC
+            LIMIT ?
+        ''', (self.event_id, len(self.answers.slots)))
+        for row in reversed(c.fetchall()):
+            self.answers.append(LiveAnswer(*row))
+
+        c.execute('''
+            SELECT
+                SUM(CASE WHEN sentiment = 'negative' THEN 1 ELSE 0 END),
+                SUM(CASE WHEN sentiment = 'positive' THEN 1 ELSE 0 END),
+                SUM(CASE WHEN sentiment = 'neutral' OR sentiment IS NULL THEN 1 ELSE 0 END),
+                COUNT(*), SUM(sentiment_score), SUM(sentiment_confidence)
+            FROM live_answers
+            WHERE event_id = ?
+        ''', (self.event_id,))
+        row = c.fetchone()
+        self.sentiment_counts = array('q', [row[0] or 0, row[1] or 0, row[2] or 0])
+        self.totals = array('d', [row[3] or 0, row[4] or 0, row[5] or 0])
+
+        # Strongest answers per question, read through the (question, score) index
+        for question_id in self.questions:
+            top = self.top_answers[question_id] = TopAnswers(self.top_k)
+            for order in ('DESC', 'ASC'):
+                c.execute(f'''
+                    SELECT id, answer_text, sentiment_score
+                    FROM live_answers
+                    WHERE live_question_id = ? AND sentiment_score {'>' if order == 'DESC' else '<'} 0
+                    ORDER BY sentiment_score {order}
+                    LIMIT ?
+                ''', (question_id, self.top_k))
+                for answer_id, text, score in c.fetchall():
+                    top.add(answer_id, (text or '')[:MAX_CACHED_TEXT], score)
+
+        # Who already answered what, so new answers skip the duplicate lookup
+        c.execute(f'''
+            SELECT live_question_id, {ATTENDEE_IDENTITY_SQL}
+            FROM live_answers
+            WHERE event_id = ? AND {ATTENDEE_IDENTITY_SQL} IS NOT NULL
+        ''', (self.event_id,))
+        for question_id, attendee in c.fetchall():
+            self._answered_filter(question_id).add(attendee)
+
+    def load_trends(self, conn, trends, extract_terms):
+        """Replay answers still inside the trending window from the database"""
+        self.trends = trends
+        c = conn.cursor()
+        c.execute('''
+            SELECT answer_text, sentiment, submitted_at
+            FROM live_answers
+            WHERE event_id = ? AND submitted_at >= datetime('now', ?)
+            ORDER BY id
+        ''', (self.event_id, f'-{trends.window_seconds} seconds'))
+        for answer_text, sentiment, submitted_at in c.fetchall():
+            trends.add(extract_terms(answer_text), sentiment, parse_submitted_at(submitted_at))
+
+    def add_question(self, question):
+        with self.lock:
+            self.questions[question.question_id] = question
+            self.cursor += 1
+
+    def deactivate_question(self, question_id):
+        with self.lock:
+            question = self.questions.get(question_id)
+            if question:
+                question.is_active = 0
+            self.cursor += 1
+
+    def _answered_filter(self, question_id):
+        answered = self.answered.get(question_id)
+        if answered is None:
+            answered = self.answered[question_id] = BloomFilter(self.filter_capacity, self.filter_error_rate)
+        return answered
+
+    def may_have_answered(self, question_id, attendee):
+        """False means the attendee has certainly not answered; True needs a database check"""
+        with self.lock:
+            answered = self.answered.get(question_id)
+            return answered is not None and attendee in answered
+
+    def add_answer(self, answer, terms=(), attendee=None):
+        with self.lock:
+            if attendee:
+                self._answered_filter(answer.live_question_id).add(attendee)
+            if self.trends is not None and terms:
+                self.trends.add(terms, answer.sentiment)
+            if answer.question_text is None and answer.live_question_id in self.questions:
+                answer.question_text = self.questions[answer.live_question_id].question_text
+            self.answers.append(answer)
+            top = self.top_answers.setdefault(answer.live_question_id, TopAnswers(self.top_k))
+            top.add(answer.answer_id, answer.answer_text, answer.sentiment_score)
+            self.sentiment_counts[SENTIMENT_INDEX.get(answer.sentiment, 2)] += 1
+            self.totals[0] += 1
+            self.totals[1] += answer.sentiment_score or 0
+            self.totals[2] += answer.sentiment_confidence or 0
+
+    def correct_answer(self, answer_id, old_sentiment, old_score, old_confidence,
+                       sentiment, score, confidence, live_question_id=None, answer_text=None):
+        """Move an answer's contribution to the counters from its old to its new sentiment"""
+        with self.lock:
+            top = self.top_answers.get(live_question_id)
+            if top:
+                # A side that loses an entry stays short until the room is reloaded
+                top.discard(answer_id)
+                top.add(answer_id, (answer_text or '')[:MAX_CACHED_TEXT], score)
+
+            self.sentiment_counts[SENTIMENT_INDEX.get(old_sentiment, 2)] -= 1
+            self.sentiment_counts[SENTIMENT_INDEX[sentiment]] += 1
+            self.totals[1] += score - (old_score or 0)
+            self.totals[2] += confidence - (old_confidence or 0)
+
+            answer = self.answers.find(answer_id)
+            if answer:
+                answer.sentiment = sentiment
+                answer.sentiment_score = score
+                answer.sentiment_confidence = confidence
+
+    def all_questions(self):
+        """Every question, newest first (organizer view)"""
+        return list(reversed(list(self.questions.values())))
+
+    def active_questions(self):
+        """Active questions, newest first (attendee view)"""
+        return [question for question in self.all_questions() if question.is_active]
+
+    def recent_answers(self):
+        return list(self.answers.newest_first())
+
+    def trending_terms(self, limit=10):
+        with self.lock:
+            return self.trends.top(limit) if self.trends is not None else None
+
+    def top_answers_for(self, question_id):
+        with self.lock:
+            top = self.top_answers.get(question_id)
+            return top.to_payload() if top else {'top_positive': [], 'top_negative': []}
+
+    def sentiment_summary(self):
+        negative, positive, neutral = self.sentiment_counts
+        total, score_sum, confidence_sum = self.totals
+        return {
+            'total_answers': int(total),
+            'sentiment_counts': {'positive': positive, 'negative': negative, 'neutral': neutral},
+            'score_sum': score_sum,
+            'confidence_sum': confidence_sum
+        }
+
+    def memory_bytes(self):
+        """Approximate bytes held by this room's records and strings"""
+        size = sys.getsizeof(self) + sys.getsizeof(self.questions) + sys.getsizeof(self.answers.slots)
+        size += sys.getsizeof(self.sentiment_counts) + sys.getsizeof(self.totals)
+        for question in self.questions.values():
+            size += sys.getsizeof(question) + sys.getsizeof(question.question_text)
+        for answer in self.answers.newest_first():
+            size += sys.getsizeof(answer) + sys.getsizeof(answer.answer_text)
+            size += sys.getsizeof(answer.attendee_name or '')
+        if self.trends is not None:
+            size += sys.getsizeof(self.trends) + sys.getsizeof(self.trends.buckets)
+            for _, summaries in self.trends.buckets:
+                for summary in summaries.values():
+                    size += sys.getsizeof(summary) + sys.getsizeof(summary.counts)
+                    size += sum(sys.getsizeof(term) for term in summary.counts)
+        size += sys.getsizeof(self.answered)
+        for answered in self.answered.values():
+            size += sys.getsizeof(answered) + answered.nbytes
+        size += sys.getsizeof(self.top_answers)
+        for top in self.top_answers.values():
+            size += sys.getsizeof(top) + sys.getsizeof(top.positive) + sys.getsizeof(top.negative)
+            for entry in top.positive + top.negative:
+                size += sys.getsizeof(entry) + sys.getsizeof(entry[2])
+        return size
+
+
+class LiveRoomRegistry:
+    """Process-wide LRU of live rooms
+
+    Rooms are loaded from the database on first use and kept current by the
+    write paths in app.py. State is per process, which matches the single
+    Socket.IO server process the app already assumes for room broadcasts.
+    """
+
+    def __init__(self, connect=None, max_rooms=500, answer_capacity=200, top_k=5,
+                 trend_factory=None, extract_terms=None, filter_capacity=1000, filter_error_rate=0.01):
+        # connect(event_id) -> sqlite3 connection that can see the event's answers
+        self.connect = connect or (lambda event_id: sqlite3.connect('feedback_portal.db'))
+        self.max_rooms = max_rooms
+        self.answer_capacity = answer_capacity
+        self.top_k = top_k
+        # Trending is on when both a counter factory and a term extractor are given
+        self.trend_factory = trend_factory
+        self.extract_terms = extract_terms
+        self.filter_capacity = filter_capacity
+        self.filter_error_rate = filter_error_rate
+        self.rooms = OrderedDict()
+        self.lock = threading.Lock()
+        # event id -> [sequence of the latest write, writes still in flight]; a load
+        # that overlaps a write may have missed it, so its room is not cached
+        self.write_seq = 0
+        self.writes = {}
+        self.loading = 0
+
+    def begin_write(self, event_id):
+        """Mark a write to the event's live tables as started (before its commit)"""
+        with self.lock:
+            self.write_seq += 1
+            entry = self.writes.setdefault(event_id, [0, 0])
+            entry[0] = self.write_seq
+            entry[1] += 1
+
+    def end_write(self, event_id):
+        """Mark the write as finished (after it was applied to any loaded room)"""
+        with self.lock:
+            entry = self.writes[event_id]
+            entry[1] -= 1
+            if entry[1] == 0 and not self.loading:
+                del self.writes[event_id]
+
+    @contextmanager
+    def writing(self, event_id):
+        """Wrap a write from before its commit until it was applied to the peeked room"""
+        self.begin_write(event_id)
+        try:
+            yield
+        finally:
+            self.end_write(event_id)
+
+    def get(self, event_id):
+        with self.lock:
+            room = self.rooms.get(event_id)
+            if room is not None:
+                self.rooms.move_to_end(event_id)
+                return room
+
+        for _ in range(3):
+            with self.lock:
+                entry = self.writes.get(event_id)
+                # Every earlier write must have been applied before the snapshot is taken
+                settled = entry is None or not entry[1]
+                started = self.write_seq
+                self.loading += 1
+            try:
+                room = self._load(event_id)
+            except BaseException:
+                with self.lock:
+                    self._load_finished()
+                raise
+
+            with self.lock:
+                entry = self.writes.get(event_id)
+                self._load_finished()
+                cached = self.rooms.get(event_id)
+                if cached is not None:
+                    # Another thread loaded the same room meanwhile; keep the first
+                    self.rooms.move_to_end(event_id)
+                    return cached
+                if settled and (entry is None or entry[0] <= started):
+                    self.rooms[event_id] = room
+                    while len(self.rooms) > self.max_rooms:
+                        self.rooms.popitem(last=False)
+                    return room
+        # Writes kept landing during the load; serve this snapshot without caching it
+        return room
+
+    def _load_finished(self):
+        # Called under the lock; entries of finished writes are kept only while a load may need them
+        self.loading -= 1
+        if not self.loading:
+            self.writes = {event_id: entry for event_id, entry in self.writes.items() if entry[1]}
+
+    def _load(self, event_id):
+        room = LiveRoom(event_id, self.answer_capacity, self.top_k, self.filter_capacity,
+                        self.filter_error_rate)
+        conn = self.connect(event_id)
+        try:
+            # One read transaction, so every query sees the same committed state
+            conn.execute('BEGIN')
+            room.load(conn)
+            if self.trend_factory and self.extract_terms:
+                room.load_trends(conn, self.trend_factory(), self.extract_terms)
+            conn.rollback()
+        finally:
+            conn.close()
+        return room
+
+    def discard(self, event_id):
+        """Drop a room so the next get() reloads it from the database"""
+        with self.lock:
+            self.rooms.pop(event_id, None)
+
+    def peek(self, event_id):
+        """Return the room only if it is already loaded"""
+        with self.lock:
+            return self.rooms.get(event_id)
+
+    def report(self, event_ids=None):
+        """Loaded rooms and their memory; with event_ids, the totals cover only those events' rooms"""
+        with self.lock:
+            rooms = [room for room in self.rooms.values() if event_ids is None or room.event_id in event_ids]
+        details = [
+            {
+                'event_id': room.event_id,
+                'questions': len(room.questions),
+                'recent_answers': room.answers.size,
+                'answer_capacity': len(room.answers.slots),
+                'trending_terms': room.trends.term_count() if room.trends is not None else 0,
+                'bytes': room.memory_bytes()
+            }
+            for room in rooms
+        ]
+        return {
+            'rooms_loaded': len(details),
+            'max_rooms': self.max_rooms,
+            'total_bytes': sum(detail['bytes'] for detail in details),
+            'rooms': details
+        }
@@ -0,0 +1,48 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class PasswordHashBusy(Exception):
+    """Raised when too many password hashes are already queued"""
+
+
+class PasswordHashPool:
+    """Runs the deliberately slow password KDFs on a small pool of OS threads
+
+    hashlib releases the GIL while deriving keys, so hashing on worker
+    threads leaves the Socket.IO server free to keep handling live traffic.
+    The caller waits by polling with a cooperative `sleep` (socketio.sleep
+    under eventlet/gevent), and at most `max_workers` hashes run at once.
+    """
+
+    def __init__(self, max_workers=2, max_pending=64, sleep=time.sleep, poll_interval=0.005):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='password-hash')
+        self.max_pending = max_pending
+        self.sleep = sleep
+        self.poll_interval = poll_interval
+        self.pending = 0
+        self.lock = threading.Lock()
+
+    def _run(self, fn, *args):
+        with self.lock:
+            if self.pending >= self.max_pending:
+                raise PasswordHashBusy()
+            self.pending += 1
+
+        try:
+            future = self.executor.submit(fn, *args)
+            while not future.done():
+                self.sleep(self.poll_interval)
+            return future.result()
+        finally:
+            with self.lock:
+                self.pending -= 1
+
+    def check(self, password_hash, password):
+        return self._run(check_password_hash, password_hash, password)
+
+    def generate(self, password):
+        return self._run(generate_password_hash, password)
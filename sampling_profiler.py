@@ -0,0 +1,152 @@
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+# Leaf frames of a thread that is parked rather than working (module basename, function)
+IDLE_FRAMES = {
+    ('threading', 'wait'),
+    ('threading', '_wait_for_tstate_lock'),
+    ('selectors', 'select'),
+    ('queue', 'get'),
+    ('socket', 'accept'),
+    ('socket', 'readinto'),
+    ('thread', '_worker'),
+    ('socketserver', 'serve_forever')
+}
+
+
+class ProfilerBusy(Exception):
+    """Raised when a profile is already being taken"""
+
+
+def frame_name(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def thread_label(name):
+    # Pool threads differ only by number; group them
+    return 'thread ' + re.sub(r'\d+', 'N', name)
+
+
+def is_idle(code):
+    return (os.path.splitext(os.path.basename(code.co_filename))[0], code.co_name) in IDLE_FRAMES
+
+
+class SamplingProfiler:
+    """Samples every thread's Python stack at a fixed rate for a few seconds
+
+    Nothing is installed on the request path: the thread taking the profile reads
+    sys._current_frames() `hz` times a second and counts each stack under the
+    outermost route or Socket.IO handler found in it (`handler_labels()` maps
+    code objects to labels). Stacks without one are grouped by thread name.
+    Only one profile runs at a time.
+    """
+
+    def __init__(self, handler_labels, max_seconds=60, max_hz=1000):
+        self.handler_labels = handler_labels
+        self.max_seconds = max_seconds
+        self.max_hz = max_hz
+        self.lock = threading.Lock()
+
+    def profile(self, seconds, hz=100, include_idle=False, sleep=time.sleep):
+        seconds = max(0.1, min(float(seconds), self.max_seconds))
+        hz = max(1, min(int(hz), self.max_hz))
+        if not self.lock.acquire(blocking=False):
+            raise ProfilerBusy()
+        try:
+            return self._sample(seconds, hz, include_idle, sleep)
+        finally:
+            self.lock.release()
+
+    def _sample(self, seconds, hz, include_idle, sleep):
+        # Keyed by id: hashing a code object is far slower than hashing an int
+        labels = {id(code): label for code, label in self.handler_labels().items()}
+        me = threading.get_ident()
+        interval = 1.0 / hz
+        # Stacks are counted as tuples of code ids; `codes` keeps the objects for rendering
+        codes = {}
+        idle_leaves = {}
+        counts = Counter()
+        threads = set()
+        ticks = idle = 0
+        sampling = 0.0
+
+        started = time.perf_counter()
+        deadline = started + seconds
+        next_tick = started
+        names = {}
+        while True:
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+            if ticks % hz == 0:
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+
+            frame = None
+            frames = sys._current_frames()
+            for ident, frame in frames.items():
+                if ident == me:
+                    continue
+                threads.add(ident)
+                if not include_idle:
+                    leaf = frame.f_code
+                    parked = idle_leaves.get(id(leaf))
+                    if parked is None:
+                        parked = idle_leaves[id(leaf)] = is_idle(leaf)
+                        codes[id(leaf)] = leaf
+                    if parked:
+                        idle += 1
+                        continue
+                stack = []
+                handler_depth = None
+                while frame is not None:
+                    code = frame.f_code
+                    codes[id(code)] = code
+                    stack.append(id(code))
+                    if id(code) in labels:
+                        handler_depth = len(stack)
+                    frame = frame.f_back
+                if handler_depth is None:
+                    label = thread_label(names.get(ident, str(ident)))
+                else:
+                    # Drop the server plumbing below the handler
+                    label = labels[stack[handler_depth - 1]]
+                    del stack[handler_depth:]
+                counts[label, tuple(stack)] += 1
+            del frames, frame
+            ticks += 1
+            sampling += time.perf_counter() - now
+
+            next_tick += interval
+            delay = next_tick - time.perf_counter()
+            if delay > 0:
+                sleep(delay)
+            else:
+                # Fell behind (e.g. GIL contention): skip missed ticks instead of bursting
+                next_tick = time.perf_counter()
+
+        elapsed = time.perf_counter() - started
+        handlers = Counter()
+        folded = []
+        for (label, stack), count in counts.most_common():
+            handlers[label] += count
+            frames = ';'.join(frame_name(codes[code_id]) for code_id in reversed(stack))
+            folded.append(f"{label};{frames} {count}")
+        busy = sum(handlers.values())
+        return {
+            'seconds': round(elapsed, 3),
+            'hz': hz,
+            'samples': ticks,
+            'threads': len(threads),
+            'busy_samples': busy,
+            'idle_samples': idle,
+            'sampling_ms': round(sampling * 1000, 1),
+            'handlers': [
+                {'handler': label, 'samples': count, 'share': round(count / busy, 4)}
+                for label, count in handlers.most_common()
+            ],
+            'folded': folded
+        }
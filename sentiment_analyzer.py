@@ -1,21 +1,207 @@
 import pandas as pd
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.feature_extraction.text import TfidfVectorizer, HashingVectorizer, TfidfTransformer
 from sklearn.linear_model import LogisticRegression
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score, classification_report
 import pickle
 import os
-from textblob import TextBlob
+import copy
+import math
+import queue
+import random
+import threading
+import time
 import re
+from collections import deque
+
+# Model class labels
+SENTIMENT_LABELS = {'negative': 0, 'positive': 1, 'neutral': 2}
+
+class ModelNotReady(RuntimeError):
+    """Raised when scoring is requested before a model has been loaded or trained"""
+
+# Feature pipelines a model artifact can be trained with
+FEATURE_MODES = ('tfidf', 'hashing')
+
+class HashingTfidfVectorizer:
+    """TF-IDF weighting over hashed features instead of a vocabulary dict
+    
+    Memory is fixed by n_features (the IDF weights plus one byte per bucket
+    marking buckets seen in training) however large the training corpus.
+    Unseen buckets are dropped at transform time, so words the model never
+    saw still produce zero features and stay neutral, as with TfidfVectorizer.
+    """
+    def __init__(self, n_features=2 ** 18, stop_words='english'):
+        self.hasher = HashingVectorizer(n_features=n_features, alternate_sign=False, norm=None,
+                                        stop_words=stop_words)
+        self.tfidf = TfidfTransformer()
+        self.seen = None
+    
+    def fit_transform(self, texts):
+        counts = self.hasher.transform(texts)
+        self.seen = np.asarray(counts.getnnz(axis=0) > 0)
+        return self.tfidf.fit_transform(counts)
+    
+    def transform(self, texts):
+        counts = self.hasher.transform(texts)
+        counts.data *= self.seen[counts.indices]
+        counts.eliminate_zeros()
+        return self.tfidf.transform(counts)
+    
+    def build_tokenizer(self):
+        return self.hasher.build_tokenizer()
+    
+    def get_stop_words(self):
+        return self.hasher.get_stop_words()
+
+# Where a prediction was resolved: neutral without model input (blank after preprocessing,
+# or no known features), token lexicon, or full model
+CASCADE_TIERS = ('empty', 'lexicon', 'model')
+
+class PolarityLexicon:
+    """Per-token class weights precomputed from a TF-IDF + LogisticRegression pair
+    
+    The model's class logits for a TF-IDF vector x are
+    intercept + sum_j x_j * coef[:, j], with x_j = tf_j * idf_j / ||tf * idf||.
+    Keeping idf_j and idf_j * coef[:, j] per vocabulary token lets a short
+    answer be scored with a few dict lookups instead of a sparse transform
+    and a predict_proba call. Longer answers are left to the model, whose
+    vectorized path wins once there are more than a handful of tokens.
+    """
+    __slots__ = ('weights', 'intercept', 'classes', 'analyze')
+    
+    def __init__(self, weights, intercept, classes, analyze):
+        # token -> (idf, per-class weight tuple)
+        self.weights = weights
+        self.intercept = intercept
+        self.classes = classes
+        self.analyze = analyze
+    
+    @classmethod
+    def from_model(cls, vectorizer, model):
+        """Lexicon for a plain TF-IDF multinomial model, or None for any other pipeline"""
+        if not isinstance(vectorizer, TfidfVectorizer) or not isinstance(model, LogisticRegression):
+            return None
+        if (vectorizer.analyzer != 'word' or vectorizer.ngram_range != (1, 1) or vectorizer.binary
+                or vectorizer.sublinear_tf or not vectorizer.use_idf or vectorizer.norm != 'l2'):
+            return None
+        coef, intercept = model.coef_, model.intercept_
+        if coef.shape[0] == 1 and len(model.classes_) == 2:
+            # A binary model scores one logit z for classes_[1]; softmax over (0, z) is its sigmoid
+            coef = np.vstack([np.zeros_like(coef), coef])
+            intercept = np.concatenate([[0.0], intercept])
+        elif coef.shape[0] != len(model.classes_):
+            return None
+        
+        idf = vectorizer.idf_
+        weighted = coef.T * idf[:, np.newaxis]
+        weights = {
+            token: (float(idf[index]), tuple(float(w) for w in weighted[index]))
+            for token, index in vectorizer.vocabulary_.items()
+        }
+        return cls(weights, tuple(float(b) for b in intercept), model.classes_.tolist(),
+                   vectorizer.build_analyzer())
+    
+    def probabilities(self, processed_text, max_tokens):
+        """Class probabilities for a preprocessed text of at most max_tokens tokens
+        
+        Returns None for longer texts and an empty tuple when no token is in
+        the vocabulary (the model's zero-feature case).
+        """
+        tokens = self.analyze(processed_text)
+        if len(tokens) > max_tokens:
+            return None
+        
+        counts = {}
+        for token in tokens:
+            counts[token] = counts.get(token, 0) + 1
+        
+        sums = [0.0] * len(self.intercept)
+        norm = 0.0
+        for token, tf in counts.items():
+            entry = self.weights.get(token)
+            if entry is None:
+                continue
+            idf, weights = entry
+            norm += (tf * idf) ** 2
+            for k, weight in enumerate(weights):
+                sums[k] += tf * weight
+        if not norm:
+            return ()
+        
+        norm = math.sqrt(norm)
+        logits = [b + total / norm for b, total in zip(self.intercept, sums)]
+        top = max(logits)
+        exps = [math.exp(logit - top) for logit in logits]
+        total = sum(exps)
+        return tuple(e / total for e in exps)
+    
+    def agrees_with(self, vectorizer, model, texts, tolerance=1e-6):
+        """Whether the lexicon reproduces the model's probabilities on `texts`"""
+        if not texts:
+            return True
+        vectors = vectorizer.transform(texts)
+        expected = model.predict_proba(vectors)
+        feature_counts = vectors.getnnz(axis=1)
+        for text, row, nnz in zip(texts, expected, feature_counts):
+            probabilities = self.probabilities(text, math.inf)
+            if not nnz:
+                if probabilities:
+                    return False
+            elif not probabilities or np.max(np.abs(np.asarray(probabilities) - row)) > tolerance:
+                return False
+        return True
+    
+    def probe_texts(self, pairs=2000):
+        """Every vocabulary token alone plus some two-token texts, for agrees_with"""
+        tokens = sorted(self.weights)
+        texts = list(tokens)
+        step = max(1, len(tokens) // pairs) if tokens else 1
+        texts.extend(f'{tokens[i]} {tokens[-1 - i]}' for i in range(0, len(tokens), step))
+        return texts
+
+def build_vectorizer(features):
+    """Untrained featurizer for one of FEATURE_MODES"""
+    if features == 'tfidf':
+        return TfidfVectorizer(max_features=10000, stop_words='english')
+    if features == 'hashing':
+        return HashingTfidfVectorizer()
+    raise ValueError(f"Unknown feature mode: {features}")
+
+def feature_mode(vectorizer):
+    """Which feature pipeline a loaded vectorizer artifact uses"""
+    if isinstance(vectorizer, (HashingTfidfVectorizer, HashingVectorizer)):
+        return 'hashing'
+    return 'tfidf'
 
 class SentimentAnalyzer:
-    def __init__(self):
-        self.vectorizer = TfidfVectorizer(max_features=10000, stop_words='english')
-        self.model = LogisticRegression(random_state=42)
-        self.is_trained = False
-        self.model_path = 'sentiment_model.pkl'
-        self.vectorizer_path = 'sentiment_vectorizer.pkl'
+    def __init__(self, features='tfidf', model_path='sentiment_model.pkl',
+                 vectorizer_path='sentiment_vectorizer.pkl', cascade_tokens=3, cascade_confidence=0.6):
+        if features not in FEATURE_MODES:
+            raise ValueError(f"Unknown feature mode: {features}")
+        # Only used when training; a loaded artifact brings its own featurizer
+        self.features = features
+        # Last published pair, kept for callers that inspect the model
+        self.vectorizer = None
+        self.model = None
+        self.model_path = model_path
+        self.vectorizer_path = vectorizer_path
+        # (vectorizer, model, lexicon) used for prediction, swapped as one reference.
+        # Published tuples are never mutated, so readers need no lock.
+        self.serving = None
+        # Held only while loading or training, so exactly one thread does it
+        self.init_lock = threading.Lock()
+        # Answers of up to cascade_tokens tokens whose lexicon confidence reaches
+        # cascade_confidence skip the model; 0 tokens turns the cascade off
+        self.cascade_tokens = cascade_tokens
+        self.cascade_confidence = cascade_confidence
+        self.tier_counts = dict.fromkeys(CASCADE_TIERS, 0)
+        self.stats_lock = threading.Lock()
+    
+    @property
+    def is_trained(self):
+        return self.serving is not None
         
     def preprocess_text(self, text):
         """Preprocess text for sentiment analysis"""
@@ -217,6 +403,10 @@ class SentimentAnalyzer:
     
     def train_model(self):
         """Train the sentiment analysis model"""
+        # Fit fresh objects; the pair being served is left untouched until publish
+        vectorizer = build_vectorizer(self.features)
+        model = LogisticRegression(random_state=42)
+        
         print("Creating training data...")
         df = self.create_synthetic_sentiment140_data()
         
@@ -234,19 +424,19 @@ class SentimentAnalyzer:
         
         # Vectorize text
         print("Vectorizing text...")
-        X_train_vec = self.vectorizer.fit_transform(X_train)
-        X_test_vec = self.vectorizer.transform(X_test)
+        X_train_vec = vectorizer.fit_transform(X_train)
+        X_test_vec = vectorizer.transform(X_test)
         
         # Train model
         print("Training model...")
-        self.model.fit(X_train_vec, y_train)
+        model.fit(X_train_vec, y_train)
         
         # Evaluate
-        y_pred = self.model.predict(X_test_vec)
+        y_pred = model.predict(X_test_vec)
         accuracy = accuracy_score(y_test, y_pred)
         print(f"Model accuracy: {accuracy:.2f}")
         
-        self.is_trained = True
+        self.publish(vectorizer, model)
         
         # Save model
         self.save_model()
@@ -258,11 +448,12 @@ class SentimentAnalyzer:
         if os.path.exists(self.model_path) and os.path.exists(self.vectorizer_path):
             try:
                 with open(self.model_path, 'rb') as f:
-                    self.model = pickle.load(f)
+                    model = pickle.load(f)
                 with open(self.vectorizer_path, 'rb') as f:
-                    self.vectorizer = pickle.load(f)
-                self.is_trained = True
-                print("Model loaded successfully")
+                    vectorizer = pickle.load(f)
+                self.features = feature_mode(vectorizer)
+                self.publish(vectorizer, model)
+                print(f"Model loaded successfully ({self.features} features)")
                 return True
             except Exception as e:
                 print(f"Error loading model: {e}")
@@ -270,40 +461,98 @@ class SentimentAnalyzer:
         return False
     
     def save_model(self):
-        """Save trained model"""
+        """Save the published model, replacing each file atomically"""
+        vectorizer, model = self.snapshot()
         try:
-            with open(self.model_path, 'wb') as f:
-                pickle.dump(self.model, f)
-            with open(self.vectorizer_path, 'wb') as f:
-                pickle.dump(self.vectorizer, f)
+            for path, obj in ((self.model_path, model), (self.vectorizer_path, vectorizer)):
+                tmp_path = path + '.tmp'
+                with open(tmp_path, 'wb') as f:
+                    pickle.dump(obj, f)
+                os.replace(tmp_path, path)
             print("Model saved successfully")
         except Exception as e:
             print(f"Error saving model: {e}")
     
-    def predict_sentiment(self, text):
-        """Predict sentiment of given text"""
-        if not self.is_trained:
-            if not self.load_model():
-                print("Training new model...")
-                self.train_model()
-        
-        # Preprocess text
-        processed_text = self.preprocess_text(text)
-        
-        if not processed_text:
-            return {'sentiment': 'neutral', 'confidence': 0.5, 'score': 0}
-        
-        # Vectorize
-        text_vec = self.vectorizer.transform([processed_text])
-        
-        # Handle out-of-vocabulary single-word or rare inputs that produce zero features
-        if hasattr(text_vec, 'nnz') and text_vec.nnz == 0:
+    def publish(self, vectorizer, model):
+        """Atomically switch prediction to a new vectorizer/model pair"""
+        lexicon = self.build_lexicon(vectorizer, model) if self.cascade_tokens else None
+        self.vectorizer = vectorizer
+        self.model = model
+        self.serving = (vectorizer, model, lexicon)
+    
+    def build_lexicon(self, vectorizer, model):
+        """Token lexicon for the cascade, or None if the pair has no exact one"""
+        lexicon = PolarityLexicon.from_model(vectorizer, model)
+        if lexicon is not None and not lexicon.agrees_with(vectorizer, model, lexicon.probe_texts()):
+            print("Token lexicon disagrees with the model; every answer will use the model")
+            return None
+        return lexicon
+    
+    def initialize(self, train=True):
+        """Load the saved model, or train one if none exists (single-flight)
+        
+        Concurrent callers wait for the one thread doing the work instead of
+        loading or training again themselves.
+        """
+        if self.serving is None:
+            with self.init_lock:
+                if self.serving is None and not self.load_model() and train:
+                    print("Training new sentiment analysis model...")
+                    self.train_model()
+        return self.serving is not None
+    
+    def published(self):
+        """The published (vectorizer, model, lexicon); never loads or trains"""
+        serving = self.serving
+        if serving is None:
+            raise ModelNotReady("Sentiment model is not loaded; call initialize() or run train_sentiment.py")
+        return serving
+    
+    def snapshot(self):
+        """The published (vectorizer, model) pair; never loads or trains"""
+        return self.published()[:2]
+    
+    def count_tiers(self, empty=0, lexicon=0, model=0):
+        with self.stats_lock:
+            self.tier_counts['empty'] += empty
+            self.tier_counts['lexicon'] += lexicon
+            self.tier_counts['model'] += model
+    
+    def lexicon_prediction(self, lexicon, processed_text):
+        """The cascade's first tier: a result for a short, confident text, else None"""
+        if lexicon is None or not self.cascade_tokens:
+            return None
+        probabilities = lexicon.probabilities(processed_text, self.cascade_tokens)
+        if probabilities is None:
+            return None
+        if not probabilities:
             return {'sentiment': 'neutral', 'confidence': 0.5, 'score': 0}
-        
-        # Predict
-        prediction = self.model.predict(text_vec)[0]
-        confidence = np.max(self.model.predict_proba(text_vec))
-        
+        best = max(range(len(probabilities)), key=probabilities.__getitem__)
+        if probabilities[best] < self.cascade_confidence:
+            return None
+        return self.format_prediction(lexicon.classes[best], probabilities[best])
+    
+    def cascade_stats(self):
+        """How many predictions each cascade tier resolved since startup"""
+        with self.stats_lock:
+            counts = dict(self.tier_counts)
+        total = sum(counts.values())
+        serving = self.serving
+        lexicon = serving[2] if serving else None
+        return {
+            'enabled': lexicon is not None and bool(self.cascade_tokens),
+            'max_tokens': self.cascade_tokens,
+            'min_confidence': self.cascade_confidence,
+            'lexicon_tokens': len(lexicon.weights) if lexicon is not None else 0,
+            'predictions': total,
+            'tiers': {
+                tier: {'count': count, 'share': round(count / total, 4) if total else 0}
+                for tier, count in counts.items()
+            }
+        }
+    
+    def format_prediction(self, prediction, confidence):
+        """Turn a class label and its probability into a sentiment result"""
         # Map prediction to sentiment
         sentiment_map = {0: 'negative', 1: 'positive', 2: 'neutral'}
         sentiment = sentiment_map.get(prediction, 'neutral')
@@ -322,14 +571,95 @@ class SentimentAnalyzer:
             'score': float(score)
         }
     
+    def predict_sentiment(self, text):
+        """Predict sentiment of given text"""
+        # Read the published pair once so a concurrent publish can't mix models
+        vectorizer, model, lexicon = self.published()
+        
+        # Preprocess text
+        processed_text = self.preprocess_text(text)
+        
+        if not processed_text:
+            self.count_tiers(empty=1)
+            return {'sentiment': 'neutral', 'confidence': 0.5, 'score': 0}
+        
+        # Short, clear-cut answers are settled from the token lexicon
+        result = self.lexicon_prediction(lexicon, processed_text)
+        if result is not None:
+            self.count_tiers(lexicon=1)
+            return result
+        
+        # Vectorize
+        text_vec = vectorizer.transform([processed_text])
+        
+        # Handle out-of-vocabulary single-word or rare inputs that produce zero features
+        if hasattr(text_vec, 'nnz') and text_vec.nnz == 0:
+            self.count_tiers(empty=1)
+            return {'sentiment': 'neutral', 'confidence': 0.5, 'score': 0}
+        self.count_tiers(model=1)
+        
+        # Predict
+        prediction = model.predict(text_vec)[0]
+        confidence = np.max(model.predict_proba(text_vec))
+        
+        return self.format_prediction(prediction, confidence)
+    
     def analyze_batch(self, texts):
-        """Analyze sentiment for multiple texts"""
-        results = []
-        for text in texts:
-            result = self.predict_sentiment(text)
-            results.append(result)
+        """Analyze sentiment for multiple texts with a single vectorize/predict call"""
+        vectorizer, model, lexicon = self.published()
+        
+        processed = [self.preprocess_text(text) for text in texts]
+        results = [{'sentiment': 'neutral', 'confidence': 0.5, 'score': 0} for _ in texts]
+        
+        # Texts the lexicon can settle never reach the batched model
+        scored = []
+        for i, text in enumerate(processed):
+            if not text:
+                continue
+            result = self.lexicon_prediction(lexicon, text)
+            if result is None:
+                scored.append(i)
+            else:
+                results[i] = result
+        empty = sum(1 for text in processed if not text)
+        lexicon_count = len(texts) - empty - len(scored)
+        if not scored:
+            self.count_tiers(empty=empty, lexicon=lexicon_count)
+            return results
+        
+        text_vecs = vectorizer.transform([processed[i] for i in scored])
+        probabilities = model.predict_proba(text_vecs)
+        feature_counts = text_vecs.getnnz(axis=1)
+        
+        # Out-of-vocabulary texts stay neutral, as in predict_sentiment
+        out_of_vocabulary = int(np.count_nonzero(feature_counts == 0))
+        self.count_tiers(empty=empty + out_of_vocabulary, lexicon=lexicon_count,
+                         model=len(scored) - out_of_vocabulary)
+        
+        for row, i in enumerate(scored):
+            if feature_counts[row] == 0:
+                continue
+            best = np.argmax(probabilities[row])
+            results[i] = self.format_prediction(model.classes_[best], probabilities[row][best])
+        
         return results
     
+    def extract_terms(self, text, max_ngram=2):
+        """Distinct words and short phrases in a text, tokenized like the served vectorizer"""
+        vectorizer, _ = self.snapshot()
+        processed = self.preprocess_text(text)
+        if not processed:
+            return []
+        
+        stop_words = vectorizer.get_stop_words() or ()
+        tokens = [token for token in vectorizer.build_tokenizer()(processed) if token not in stop_words]
+        terms = list(tokens)
+        for n in range(2, max_ngram + 1):
+            terms.extend(' '.join(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+        
+        # Count each term once per answer: trending is about how many people mention it
+        return list(dict.fromkeys(terms))
+    
     def get_sentiment_stats(self, texts):
         """Get sentiment statistics for a collection of texts"""
         results = self.analyze_batch(texts)
@@ -359,10 +689,240 @@ class SentimentAnalyzer:
             'average_confidence': avg_confidence
         }
 
-# Initialize global sentiment analyzer
-sentiment_analyzer = SentimentAnalyzer()
+class OnlineSentimentLearner:
+    """Fine-tunes a candidate copy of the served model from organizer corrections
+    
+    The candidate keeps the served pair's vectorizer and starts from its
+    weights, so it scores in the same feature space and the lexicon cascade
+    and vocabulary keep working once it is published. A LogisticRegression
+    takes softmax gradient steps on the coefficients of the features a batch
+    uses; a model with partial_fit (the out-of-core SGD pipeline) uses that.
+    
+    Each batch is learned together with as many replayed synthetic training
+    sentences. Every `holdout_every`th correction is held out instead of
+    learned from. Corrections with no word in the vectorizer's vocabulary
+    cannot move the weights; they are counted in `out_of_vocabulary` and
+    submit() reports them so the organizer can see the correction was not
+    learned.
+    The candidate only replaces the served model when it is at least as
+    accurate on those plus the synthetic training sentences, checked at most
+    once per `publish_interval` seconds; a candidate that falls behind is
+    restarted from the served model.
+    """
+    def __init__(self, analyzer, batch_size=32, learning_rate=0.5, holdout_every=5,
+                 publish_interval=30.0, max_holdout=2000):
+        self.analyzer = analyzer
+        self.batch_size = batch_size
+        self.learning_rate = learning_rate
+        self.holdout_every = holdout_every
+        self.publish_interval = publish_interval
+        self.model_path = 'sentiment_online_model.pkl'
+        self.corrections = queue.Queue()
+        # (vectorizer, model) being trained; never published itself, only copies of it
+        self.candidate = None
+        # The served model the candidate derives from, to notice a model published elsewhere
+        self.base = None
+        self.holdout = deque(maxlen=max_holdout)
+        self.reference = []
+        self.rng = random.Random(42)
+        self.received = 0
+        self.updates = 0
+        self.pending = False
+        self.last_check = 0.0
+        self.published = 0
+        self.rejected = 0
+        self.out_of_vocabulary = 0
+        # Held-out texts or weights changed since the candidate was last saved
+        self.unsaved = False
+        self.last_saved = 0.0
+    
+    def load_or_initialize(self):
+        """Prepare the reference set and resume a saved candidate, or start one from the served model"""
+        df = self.analyzer.create_synthetic_sentiment140_data()
+        reference = zip((self.analyzer.preprocess_text(text) for text in df['text']), df['sentiment'])
+        self.reference = [(text, int(label)) for text, label in reference if text]
+        
+        if os.path.exists(self.model_path):
+            try:
+                with open(self.model_path, 'rb') as f:
+                    saved = pickle.load(f)
+                self.candidate = (saved['vectorizer'], saved['model'])
+                self.holdout.extend(saved['holdout'])
+                self.received = saved['received']
+                self.base = self.analyzer.snapshot()[1]
+                # Published only if it still beats whatever is served now
+                self.pending = True
+                print("Online model candidate loaded successfully")
+                return
+            except Exception as e:
+                print(f"Error loading online model: {e}")
+        self.start_candidate()
+    
+    def start_candidate(self):
+        """Copy the served pair as the new candidate; None if its model cannot be updated"""
+        vectorizer, model = self.analyzer.snapshot()
+        self.base = model
+        self.pending = False
+        if isinstance(model, LogisticRegression) or hasattr(model, 'partial_fit'):
+            self.candidate = (vectorizer, copy.deepcopy(model))
+        else:
+            self.candidate = None
+            print(f"Online learning is off: {type(model).__name__} cannot be updated incrementally")
+    
+    def submit(self, text, sentiment):
+        """Queue an organizer correction for the background learner
+
+        Returns False when none of the text's words are in the vocabulary, so
+        the correction cannot be learned from.
+        """
+        self.corrections.put((text, SENTIMENT_LABELS[sentiment]))
+        vectorizer = self.candidate[0] if self.candidate is not None else self.analyzer.snapshot()[0]
+        processed = self.analyzer.preprocess_text(text)
+        return bool(processed) and vectorizer.transform([processed]).nnz > 0
+    
+    def step(self, model, X, y):
+        """One update of the candidate's weights towards labels y"""
+        if not isinstance(model, LogisticRegression):
+            model.partial_fit(X, y)
+            return
+        
+        # Softmax cross-entropy gradient, applied to the columns this batch uses only
+        onehot = (np.asarray(y)[:, np.newaxis] == model.classes_[np.newaxis, :]).astype(float)
+        gradient = model.predict_proba(X) - onehot
+        if model.coef_.shape[0] == 1:
+            # Binary models keep one logit, for classes_[1]
+            gradient = gradient[:, 1:]
+        columns = np.unique(X.indices)
+        rate = self.learning_rate / X.shape[0]
+        model.coef_[:, columns] -= rate * np.asarray((X[:, columns].T @ gradient).T)
+        model.intercept_ -= rate * gradient.sum(axis=0)
+    
+    def learn(self, batch):
+        """Hold out or learn from one batch of corrections"""
+        if self.base is not self.analyzer.snapshot()[1]:
+            # A retrained or reloaded model was published; fine-tune that one instead
+            self.start_candidate()
+        if self.candidate is None:
+            return
+        
+        vectorizer, model = self.candidate
+        received = self.received
+        train = []
+        for text, label in batch:
+            text = self.analyzer.preprocess_text(text)
+            if not text or vectorizer.transform([text]).nnz == 0:
+                self.out_of_vocabulary += 1
+                continue
+            self.received += 1
+            (self.holdout if self.received % self.holdout_every == 0 else train).append((text, label))
+        
+        if train:
+            self.updates += len(train)
+            # Replaying as many training sentences keeps the candidate from drifting towards the corrections' labels
+            train += self.rng.sample(self.reference, min(len(self.reference), len(train)))
+            self.step(model, vectorizer.transform([text for text, _ in train]), [label for _, label in train])
+            self.pending = True
+        # Saved by run() at most once per publish_interval
+        self.unsaved = self.unsaved or received != self.received
+    
+    def accuracy(self, vectorizer, model, examples):
+        vectors = vectorizer.transform([text for text, _ in examples])
+        predictions = model.predict(vectors)
+        # Texts with no known features score neutral, as in predict_sentiment
+        predictions[vectors.getnnz(axis=1) == 0] = SENTIMENT_LABELS['neutral']
+        return float(np.mean(predictions == np.asarray([label for _, label in examples])))
+    
+    def maybe_publish(self):
+        """Publish a copy of the candidate if it is at least as accurate as the served model"""
+        if not self.pending or self.candidate is None:
+            return
+        if time.monotonic() - self.last_check < self.publish_interval:
+            return
+        self.last_check = time.monotonic()
+        self.pending = False
+        
+        examples = self.reference + list(self.holdout)
+        served = self.analyzer.snapshot()
+        candidate_accuracy = self.accuracy(*self.candidate, examples)
+        served_accuracy = self.accuracy(*served, examples)
+        if candidate_accuracy < served_accuracy:
+            self.rejected += 1
+            print(f"Online model kept back: {candidate_accuracy:.3f} vs served {served_accuracy:.3f} "
+                  f"on {len(examples)} held-out texts")
+            # Drop the updates since the last publish rather than keep drifting from the served model
+            self.start_candidate()
+            return
+        
+        vectorizer, model = self.candidate
+        published = copy.deepcopy(model)
+        self.analyzer.publish(vectorizer, published)
+        self.base = published
+        self.published += 1
+        print(f"Online model published: {candidate_accuracy:.3f} vs {served_accuracy:.3f} "
+              f"on {len(examples)} held-out texts")
+    
+    def maybe_save(self):
+        """Save unsaved progress, at most once per publish_interval"""
+        if not self.unsaved or time.monotonic() - self.last_saved < self.publish_interval:
+            return
+        self.save_model()
+    
+    def save_model(self):
+        """Save the candidate and its held-out corrections, replacing the previous file atomically"""
+        self.unsaved = False
+        self.last_saved = time.monotonic()
+        if self.candidate is None:
+            return
+        try:
+            tmp_path = self.model_path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                pickle.dump({
+                    'vectorizer': self.candidate[0],
+                    'model': self.candidate[1],
+                    'holdout': list(self.holdout),
+                    'received': self.received
+                }, f)
+            os.replace(tmp_path, self.model_path)
+        except Exception as e:
+            print(f"Error saving online model: {e}")
+    
+    def run(self):
+        """Background loop: learn from corrections in small batches and publish when validated"""
+        while True:
+            deadlines = []
+            if self.pending:
+                deadlines.append(self.last_check + self.publish_interval)
+            if self.unsaved:
+                deadlines.append(self.last_saved + self.publish_interval)
+            timeout = max(0.1, min(deadlines) - time.monotonic()) if deadlines else None
+            try:
+                batch = [self.corrections.get(timeout=timeout)]
+            except queue.Empty:
+                batch = []
+            while batch and len(batch) < self.batch_size:
+                try:
+                    batch.append(self.corrections.get_nowait())
+                except queue.Empty:
+                    break
+            
+            try:
+                if batch:
+                    self.learn(batch)
+                self.maybe_publish()
+                self.maybe_save()
+            except Exception as e:
+                print(f"Error applying corrections: {e}")
+
+# Initialize global sentiment analyzer; the artifact pair chosen here decides the feature pipeline.
+# The app loads or trains it at startup (app.py), not on import, so tools that only need the
+# preprocessing helpers neither pay for that nor race the app over the model files
+sentiment_analyzer = SentimentAnalyzer(
+    features=os.environ.get('SENTIMENT_FEATURES', 'tfidf'),
+    model_path=os.environ.get('SENTIMENT_MODEL_PATH', 'sentiment_model.pkl'),
+    vectorizer_path=os.environ.get('SENTIMENT_VECTORIZER_PATH', 'sentiment_vectorizer.pkl'),
+    cascade_tokens=int(os.environ.get('SENTIMENT_CASCADE_TOKENS', '3')),
+    cascade_confidence=float(os.environ.get('SENTIMENT_CASCADE_CONFIDENCE', '0.6'))
+)
 
-# Train or load model on startup
-if not sentiment_analyzer.load_model():
-    print("Training new sentiment analysis model...")
-    sentiment_analyzer.train_model()
+# Learns from organizer corrections; started by the app when enabled
+online_learner = OnlineSentimentLearner(sentiment_analyzer)
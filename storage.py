@@ -0,0 +1,426 @@
+import argparse
+import os
+import sqlite3
+import string
+import threading
+
+# High-volume per-event tables; everything else lives in the catalog database
+EVENT_TABLES = ('live_answers', 'answers', 'feedback', 'live_question_rollups', 'live_attendee_rollups')
+
+EVENT_TABLE_SCHEMA = [
+    '''
+        CREATE TABLE IF NOT EXISTS feedback (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            event_id INTEGER,
+            rating INTEGER,
+            comment TEXT,
+            attendee_name TEXT,
+            sentiment TEXT,
+            sentiment_score REAL,
+            sentiment_confidence REAL,
+            submitted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (event_id) REFERENCES events (id)
+        )
+    ''',
+    '''
+        CREATE TABLE IF NOT EXISTS answers (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            question_id INTEGER,
+            event_id INTEGER,
+            answer_text TEXT,
+            rating INTEGER,
+            attendee_name TEXT,
+            attendee_email TEXT,
+            sentiment TEXT,
+            sentiment_score REAL,
+            sentiment_confidence REAL,
+            submitted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (question_id) REFERENCES questions (id),
+            FOREIGN KEY (event_id) REFERENCES events (id)
+        )
+    ''',
+    '''
+        CREATE TABLE IF NOT EXISTS live_answers (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            live_question_id INTEGER,
+            event_id INTEGER,
+            answer_text TEXT,
+            rating INTEGER,
+            attendee_name TEXT,
+            attendee_email TEXT,
+            sentiment TEXT,
+            sentiment_score REAL,
+            sentiment_confidence REAL,
+            submitted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (live_question_id) REFERENCES live_questions (id),
+            FOREIGN KEY (event_id) REFERENCES events (id)
+        )
+    '''
+]
+
+# Running per-question and per-attendee sentiment totals for live answers,
+# updated in the same transaction as each insert or correction
+ROLLUP_TABLE_SCHEMA = {
+    'live_question_rollups': '''
+        CREATE TABLE live_question_rollups (
+            event_id INTEGER NOT NULL,
+            live_question_id INTEGER NOT NULL,
+            answers INTEGER NOT NULL DEFAULT 0,
+            positive INTEGER NOT NULL DEFAULT 0,
+            negative INTEGER NOT NULL DEFAULT 0,
+            neutral INTEGER NOT NULL DEFAULT 0,
+            score_sum REAL NOT NULL DEFAULT 0,
+            confidence_sum REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (event_id, live_question_id)
+        )
+    ''',
+    'live_attendee_rollups': '''
+        CREATE TABLE live_attendee_rollups (
+            event_id INTEGER NOT NULL,
+            attendee_key TEXT NOT NULL,
+            attendee_name TEXT,
+            answers INTEGER NOT NULL DEFAULT 0,
+            positive INTEGER NOT NULL DEFAULT 0,
+            negative INTEGER NOT NULL DEFAULT 0,
+            neutral INTEGER NOT NULL DEFAULT 0,
+            score_sum REAL NOT NULL DEFAULT 0,
+            confidence_sum REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (event_id, attendee_key)
+        )
+    '''
+}
+
+# Identifies a live answer's attendee for the one-answer rule by email only; names are
+# not unique, so answers without an email have a NULL identity and are never deduplicated
+ATTENDEE_IDENTITY_SQL = "NULLIF(LOWER(attendee_email), '')"
+
+# Groups a live answer's attendee for the rollups by email, then name; blank answers are 'anonymous'
+ATTENDEE_KEY_SQL = f"COALESCE({ATTENDEE_IDENTITY_SQL}, NULLIF(attendee_name, ''), 'anonymous')"
+
+# SQLite's LOWER() only folds ASCII letters
+_ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+
+def attendee_identity(attendee_email):
+    """ATTENDEE_IDENTITY_SQL computed in Python, or None when the attendee gave no email"""
+    return (attendee_email or '').translate(_ASCII_LOWER) or None
+
+ROLLUP_VALUES_SQL = '''
+    COUNT(*),
+    SUM(CASE WHEN sentiment = 'positive' THEN 1 ELSE 0 END),
+    SUM(CASE WHEN sentiment = 'negative' THEN 1 ELSE 0 END),
+    SUM(CASE WHEN sentiment = 'neutral' OR sentiment IS NULL THEN 1 ELSE 0 END),
+    COALESCE(SUM(sentiment_score), 0),
+    COALESCE(SUM(sentiment_confidence), 0)
+'''
+
+ROLLUP_UPSERT_SQL = '''
+    ON CONFLICT ({key}) DO UPDATE SET
+        answers = answers + excluded.answers,
+        positive = positive + excluded.positive,
+        negative = negative + excluded.negative,
+        neutral = neutral + excluded.neutral,
+        score_sum = score_sum + excluded.score_sum,
+        confidence_sum = confidence_sum + excluded.confidence_sum
+'''
+
+# SQLite's historical limit on bound parameters per statement, with headroom
+MAX_BATCH_PARAMS = 900
+
+
+def table_columns(c, table, schema='main'):
+    """Column names of a table, in order (empty when the table does not exist)"""
+    c.execute(f'PRAGMA {schema}.table_info({table})')
+    return [row[1] for row in c.fetchall()]
+
+
+def ensure_column(c, table, column, definition):
+    """Add a column to an existing table if an older database lacks it"""
+    if column not in table_columns(c, table):
+        c.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+        return True
+    return False
+
+
+def create_event_tables(c):
+    """Create the per-event tables and apply their column migrations"""
+    for statement in EVENT_TABLE_SCHEMA:
+        c.execute(statement)
+
+    # Sentiment for regular answers and feedback comments (added after release)
+    for table in ('answers', 'feedback'):
+        ensure_column(c, table, 'sentiment', 'TEXT')
+        ensure_column(c, table, 'sentiment_score', 'REAL')
+        ensure_column(c, table, 'sentiment_confidence', 'REAL')
+    
+    # Loads the strongest answers per question when a live room warms up
+    c.execute('CREATE INDEX IF NOT EXISTS idx_live_answers_question_score '
+              'ON live_answers (live_question_id, sentiment_score)')
+    
+    # One answer per email and question; answers without an email have a NULL identity and never
+    # collide. The earlier index also keyed on names, which turned away different people sharing one
+    c.execute('DROP INDEX IF EXISTS idx_live_answers_one_per_attendee')
+    try:
+        c.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_live_answers_one_per_email '
+                  f'ON live_answers (live_question_id, {ATTENDEE_IDENTITY_SQL})')
+    except sqlite3.IntegrityError:
+        print("live_answers already holds repeat answers from one email; "
+              "duplicates are rejected by the app but not by the database until they are removed")
+    
+    # Rollups are backfilled from existing answers the first time they are created
+    for table, statement in ROLLUP_TABLE_SCHEMA.items():
+        c.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,))
+        if c.fetchone():
+            continue
+        c.execute(statement)
+        if table == 'live_question_rollups':
+            c.execute(f'''
+                INSERT INTO live_question_rollups
+                SELECT event_id, live_question_id, {ROLLUP_VALUES_SQL}
+                FROM live_answers
+                WHERE event_id IS NOT NULL AND live_question_id IS NOT NULL
+                GROUP BY event_id, live_question_id
+            ''')
+        else:
+            c.execute(f'''
+                INSERT INTO live_attendee_rollups
+                SELECT event_id, {ATTENDEE_KEY_SQL}, MAX(attendee_name), {ROLLUP_VALUES_SQL}
+                FROM live_answers
+                WHERE event_id IS NOT NULL
+                GROUP BY event_id, {ATTENDEE_KEY_SQL}
+            ''')
+
+
+def add_live_answer_to_rollups(c, answer_id):
+    """Count a just-inserted live answer in its question and attendee rollups"""
+    c.execute(f'''
+        INSERT INTO live_question_rollups
+        SELECT event_id, live_question_id, {ROLLUP_VALUES_SQL}
+        FROM live_answers
+        WHERE id = ?
+        {ROLLUP_UPSERT_SQL.format(key='event_id, live_question_id')}
+    ''', (answer_id,))
+    c.execute(f'''
+        INSERT INTO live_attendee_rollups
+        SELECT event_id, {ATTENDEE_KEY_SQL}, attendee_name, {ROLLUP_VALUES_SQL}
+        FROM live_answers
+        WHERE id = ?
+        {ROLLUP_UPSERT_SQL.format(key='event_id, attendee_key')}
+    ''', (answer_id,))
+
+
+def remove_live_answers_from_rollups(c, answers):
+    """Take live answers that are no longer stored out of their question and attendee rollups
+
+    `answers` are {column: value} dicts of the removed live_answers rows.
+    """
+    update = '''
+        UPDATE {table}
+        SET answers = answers - 1, positive = positive - ?, negative = negative - ?, neutral = neutral - ?,
+            score_sum = score_sum - ?, confidence_sum = confidence_sum - ?
+        WHERE event_id = ? AND {key} = ?
+    '''
+    for answer in answers:
+        sentiment = answer['sentiment'] or 'neutral'
+        params = (sentiment == 'positive', sentiment == 'negative', sentiment == 'neutral',
+                  answer['sentiment_score'] or 0, answer['sentiment_confidence'] or 0, answer['event_id'])
+        attendee_key = attendee_identity(answer['attendee_email']) or answer['attendee_name'] or 'anonymous'
+        c.execute(update.format(table='live_question_rollups', key='live_question_id'),
+                  params + (answer['live_question_id'],))
+        c.execute(update.format(table='live_attendee_rollups', key='attendee_key'), params + (attendee_key,))
+
+
+def live_answer_exists(c, live_question_id, attendee):
+    """Whether this attendee already answered the question, looked up in the unique index"""
+    c.execute(f'''
+        SELECT 1 FROM live_answers
+        WHERE live_question_id = ? AND {ATTENDEE_IDENTITY_SQL} = ?
+        LIMIT 1
+    ''', (live_question_id, attendee))
+    return c.fetchone() is not None
+
+
+def move_live_answer_in_rollups(c, answer_id, old_sentiment, old_score, old_confidence,
+                                sentiment, score, confidence):
+    """Shift a corrected answer from its old to its new sentiment in both rollups
+
+    Call before updating the live_answers row; the answer's question and
+    attendee are read from it.
+    """
+    deltas = {label: (label == sentiment) - (label == (old_sentiment or 'neutral'))
+              for label in ('positive', 'negative', 'neutral')}
+    params = (deltas['positive'], deltas['negative'], deltas['neutral'],
+              score - (old_score or 0), confidence - (old_confidence or 0))
+    update = '''
+        UPDATE {table}
+        SET positive = positive + ?, negative = negative + ?, neutral = neutral + ?,
+            score_sum = score_sum + ?, confidence_sum = confidence_sum + ?
+        WHERE (event_id, {key}) = (SELECT event_id, {value} FROM live_answers WHERE id = ?)
+    '''
+    c.execute(update.format(table='live_question_rollups', key='live_question_id', value='live_question_id'),
+              params + (answer_id,))
+    c.execute(update.format(table='live_attendee_rollups', key='attendee_key', value=ATTENDEE_KEY_SQL),
+              params + (answer_id,))
+
+
+class ShardRouter:
+    """Decides which SQLite file holds an event's live_answers, answers and feedback
+
+    mode 'none' keeps everything in the catalog database. 'event' gives each
+    event its own file and 'hash' spreads events over `shard_count` files, so
+    a busy event's writes only lock its own shard. Shard connections ATTACH
+    the catalog, so queries that join events, questions or live_questions
+    work unchanged; SQLite resolves unqualified names in the shard first.
+    """
+
+    def __init__(self, catalog_path='feedback_portal.db', mode='none', shard_dir='shards', shard_count=16):
+        if mode not in ('none', 'event', 'hash'):
+            raise ValueError(f"Unknown shard mode: {mode}")
+        self.catalog_path = catalog_path
+        self.mode = mode
+        self.shard_dir = shard_dir
+        self.shard_count = shard_count
+        self.ready_shards = set()
+        self.lock = threading.Lock()
+
+    @property
+    def sharded(self):
+        return self.mode != 'none'
+
+    def shard_path(self, event_id):
+        if self.mode == 'event':
+            return os.path.join(self.shard_dir, f'event_{int(event_id)}.db')
+        if self.mode == 'hash':
+            return os.path.join(self.shard_dir, f'shard_{int(event_id) % self.shard_count:03d}.db')
+        return self.catalog_path
+
+    def connect_catalog(self):
+        return sqlite3.connect(self.catalog_path)
+
+    def _open_shard(self, path):
+        if path not in self.ready_shards:
+            with self.lock:
+                if path not in self.ready_shards:
+                    os.makedirs(self.shard_dir, exist_ok=True)
+                    conn = sqlite3.connect(path)
+                    conn.execute('PRAGMA journal_mode=WAL')
+                    create_event_tables(conn.cursor())
+                    conn.commit()
+                    conn.close()
+                    self.ready_shards.add(path)
+
+        conn = sqlite3.connect(path)
+        conn.execute('ATTACH DATABASE ? AS catalog', (self.catalog_path,))
+        return conn
+
+    def connect_event(self, event_id):
+        """Connection for reading or writing one event's answers"""
+        if not self.sharded:
+            return self.connect_catalog()
+        return self._open_shard(self.shard_path(event_id))
+
+    def shard_paths(self):
+        """Every database file that may hold per-event rows"""
+        if not self.sharded:
+            return [self.catalog_path]
+        if not os.path.isdir(self.shard_dir):
+            return []
+        return sorted(
+            os.path.join(self.shard_dir, name)
+            for name in os.listdir(self.shard_dir)
+            if name.endswith('.db')
+        )
+
+    def iter_shard_connections(self):
+        """Yield (shard_key, connection) for every shard, catalog attached"""
+        for path in self.shard_paths():
+            key = 'main' if path == self.catalog_path else os.path.splitext(os.path.basename(path))[0]
+            conn = self.connect_catalog() if path == self.catalog_path else self._open_shard(path)
+            try:
+                yield key, conn
+            finally:
+                conn.close()
+
+    def group_events(self, event_ids):
+        """Group event ids by the shard file that holds them"""
+        groups = {}
+        for event_id in event_ids:
+            groups.setdefault(self.shard_path(event_id), []).append(event_id)
+        return groups
+
+    def aggregate_by_event(self, event_ids, query):
+        """Run a GROUP BY event_id query on every shard holding these events
+
+        The query selects event_id first and marks each id list with
+        {event_ids}. Returns {event_id: remaining columns}.
+        """
+        results = {}
+        markers = query.count('{event_ids}')
+        batch_size = max(1, MAX_BATCH_PARAMS // max(markers, 1))
+
+        for path, ids in self.group_events(event_ids).items():
+            if self.sharded and not os.path.exists(path):
+                continue
+            conn = self.connect_catalog() if path == self.catalog_path else self._open_shard(path)
+            c = conn.cursor()
+            for start in range(0, len(ids), batch_size):
+                batch = ids[start:start + batch_size]
+                sql = query.replace('{event_ids}', ','.join('?' * len(batch)))
+                c.execute(sql, batch * markers)
+                for row in c.fetchall():
+                    results[row[0]] = row[1:]
+            conn.close()
+
+        return results
+
+    def migrate(self):
+        """Move per-event rows still in the catalog into their shards
+
+        Row ids are kept so sentiment corrections and analytics high-water
+        marks stay valid. Run it before the app starts writing in sharded mode.
+        """
+        if not self.sharded:
+            return 0
+
+        catalog = self.connect_catalog()
+        c = catalog.cursor()
+        moved = 0
+        for table in EVENT_TABLES:
+            columns = table_columns(c, table)
+            if not columns:
+                continue
+            column_list = ', '.join(columns)
+            c.execute(f'SELECT DISTINCT event_id FROM {table}')
+            for (event_id,) in c.fetchall():
+                if event_id is None:
+                    continue
+                shard = self.connect_event(event_id)
+                with shard:
+                    rows = catalog.execute(f'SELECT {column_list} FROM {table} WHERE event_id = ?',
+                                           (event_id,)).fetchall()
+                    shard.executemany(f'INSERT INTO main.{table} ({column_list}) '
+                                      f'VALUES ({", ".join("?" * len(columns))})', rows)
+                shard.close()
+                with catalog:
+                    catalog.execute(f'DELETE FROM {table} WHERE event_id = ?', (event_id,))
+                moved += len(rows)
+
+        catalog.close()
+        return moved
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Per-event SQLite shard maintenance')
+    parser.add_argument('command', choices=['migrate'])
+    parser.add_argument('--mode', choices=['event', 'hash'], default=os.environ.get('SHARD_MODE', 'event'))
+    parser.add_argument('--shard-dir', default=os.environ.get('SHARD_DIR', 'shards'))
+    parser.add_argument('--shard-count', type=int, default=int(os.environ.get('SHARD_COUNT', '16')))
+    parser.add_argument('--catalog', default='feedback_portal.db')
+    args = parser.parse_args(argv)
+
+    router = ShardRouter(args.catalog, args.mode, args.shard_dir, args.shard_count)
+    print(f"Moved {router.migrate()} rows into {args.mode} shards")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,365 @@
+"""Capture live traffic to a JSONL file and replay it against a local server
+
+Capture: set TRAFFIC_CAPTURE=<path> and app.py (or live_async.py) appends one
+line per HTTP request and Socket.IO event, stamped with the wall-clock time it
+arrived. Names and emails become keyed pseudonyms (stable within one server
+run, so duplicate-answer checks still line up), passwords are replaced and
+free text keeps only the words the sentiment model knows (TRAFFIC_CAPTURE_TEXT:
+'vocab', 'mask' for none, 'keep' for all).
+
+Replay: start a server on a copy of the database as it was when the capture
+began (event and question ids in the capture refer to it), then
+
+    python traffic_replay.py replay capture.jsonl --speed 10 --json report.json
+    python traffic_replay.py replay capture.jsonl --baseline last-release.json
+    python traffic_replay.py summary capture.jsonl
+
+Requests are sent open-loop at their recorded offsets divided by --speed, so
+bursts arrive as bursts. Organizer requests carry a session cookie for the
+recorded user_id, signed with the portal's secret key. Replay needs aiohttp
+and python-socketio[asyncio_client].
+"""
+import argparse
+import asyncio
+import gzip
+import hashlib
+import hmac
+import json
+import os
+import re
+import secrets
+import threading
+import time
+from collections import Counter, defaultdict
+
+# Free-text fields; `answer_<question_id>` fields from submit_answers are text too
+TEXT_FIELDS = {'answer_text', 'comment', 'question_text', 'event_name', 'venue'}
+# Fields replaced by a keyed pseudonym
+NAME_FIELDS = {'attendee_name', 'organizer_name'}
+EMAIL_FIELDS = {'attendee_email', 'email'}
+SECRET_FIELDS = {'password'}
+REPLAY_PASSWORD = 'replay'
+
+TEXT_MODES = ('vocab', 'mask', 'keep')
+
+# Values of other fields are kept when they look like ids, ratings, dates or options
+SAFE_VALUE = re.compile(r'[\w:.\-]{0,40}')
+WORD = re.compile(r'\w+')
+
+PERCENTILES = (('p50', 0.50), ('p90', 0.90), ('p99', 0.99))
+
+
+class TrafficRecorder:
+    """Appends anonymized requests and Socket.IO events to a JSONL capture
+
+    Disabled (every method a no-op) when `path` is empty. `vocabulary` is a
+    callable returning the set of words free text may keep, or None.
+    """
+
+    def __init__(self, path=None, text_mode='vocab', vocabulary=None):
+        if text_mode not in TEXT_MODES:
+            raise ValueError(f"Unknown capture text mode: {text_mode}")
+        self.path = path or None
+        self.text_mode = text_mode
+        self.vocabulary = vocabulary
+        # Fresh per run, so pseudonyms cannot be matched across captures
+        self.salt = secrets.token_bytes(16)
+        self.lock = threading.Lock()
+        self.file = None
+        if self.path:
+            self.file = open(self.path, 'a', encoding='utf-8', buffering=1)
+            self.write({'kind': 'start', 'pid': os.getpid()})
+
+    @property
+    def enabled(self):
+        return self.file is not None
+
+    def write(self, record):
+        record['ts'] = round(time.time(), 6)
+        line = json.dumps(record, separators=(',', ':')) + '\n'
+        with self.lock:
+            self.file.write(line)
+
+    def http(self, method, endpoint, path, args, form, user_id=None):
+        """Record one request; `args` and `form` are MultiDicts"""
+        if not self.enabled:
+            return
+        self.write({
+            'kind': 'http',
+            'method': method,
+            'endpoint': endpoint,
+            'path': path,
+            'args': self.anonymize(args.items(multi=True)),
+            'form': self.anonymize(form.items(multi=True)),
+            'user': user_id
+        })
+
+    def socket(self, event, client, data=None):
+        """Record one Socket.IO event (connect, disconnect, join_event, ...) from `client` (a sid)"""
+        if not self.enabled:
+            return
+        if isinstance(data, dict):
+            data = dict(self.anonymize(data.items()))
+        self.write({'kind': 'socketio', 'event': event, 'client': self.pseudonym(client), 'data': data})
+
+    def pseudonym(self, value):
+        return hmac.new(self.salt, str(value).encode('utf-8'), hashlib.sha256).hexdigest()[:12]
+
+    def anonymize(self, items):
+        return [[name, self.anonymize_value(name, value)] for name, value in items]
+
+    def anonymize_value(self, name, value):
+        if not isinstance(value, str) or value == '':
+            return value
+        if name in SECRET_FIELDS:
+            return REPLAY_PASSWORD
+        if name in EMAIL_FIELDS:
+            # Lowercased first: attendee identity compares emails case-insensitively
+            return f'{self.pseudonym(value.lower())}@example.invalid'
+        if name in NAME_FIELDS:
+            return f'name-{self.pseudonym(value)}'
+        if name in TEXT_FIELDS or name.startswith('answer_') or not SAFE_VALUE.fullmatch(value):
+            return self.mask_text(value)
+        return value
+
+    def mask_text(self, text):
+        """Keep word count and lengths; keep only words the sentiment model knows"""
+        if self.text_mode == 'keep':
+            return text
+        vocabulary = self.vocabulary() if self.text_mode == 'vocab' and self.vocabulary else None
+        if not vocabulary:
+            return WORD.sub(lambda m: 'x' * len(m.group()), text)
+        return WORD.sub(lambda m: m.group() if m.group().lower() in vocabulary else 'x' * len(m.group()), text)
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+
+def read_capture(path):
+    """Capture records (plain or gzipped JSONL) in arrival order"""
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    return sorted((r for r in records if r['kind'] != 'start'), key=lambda r: r['ts'])
+
+
+def schedule(records, speed=1.0, max_gap=None):
+    """Seconds after replay start for each record: recorded gaps / speed, idle gaps capped at max_gap"""
+    offsets = []
+    elapsed = 0.0
+    previous = records[0]['ts'] if records else 0.0
+    for record in records:
+        gap = record['ts'] - previous
+        if max_gap is not None:
+            gap = min(gap, max_gap)
+        elapsed += gap / speed
+        offsets.append(elapsed)
+        previous = record['ts']
+    return offsets
+
+
+def percentile(ordered, q):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def latency_report(samples):
+    """Per-endpoint count, errors and latency percentiles (ms) from {endpoint: [(ms, ok), ...]}"""
+    report = {}
+    for endpoint, results in sorted(samples.items()):
+        ordered = sorted(ms for ms, _ in results)
+        row = {'count': len(results), 'errors': sum(1 for _, ok in results if not ok)}
+        for name, q in PERCENTILES:
+            row[name] = round(percentile(ordered, q), 2)
+        row['max'] = round(ordered[-1], 2) if ordered else 0.0
+        report[endpoint] = row
+    return report
+
+
+def summarize(records):
+    """Duration, per-endpoint request counts and the busiest second of a capture"""
+    if not records:
+        return {'duration_s': 0.0, 'requests': {}, 'socketio': {}, 'peak_per_second': 0}
+    per_second = Counter(int(r['ts']) for r in records)
+    return {
+        'duration_s': round(records[-1]['ts'] - records[0]['ts'], 3),
+        'requests': dict(Counter(f"{r['method']} {r['endpoint']}" for r in records if r['kind'] == 'http')),
+        'socketio': dict(Counter(r['event'] for r in records if r['kind'] == 'socketio')),
+        'peak_per_second': max(per_second.values())
+    }
+
+
+def session_cookies(user_ids):
+    """Signed Flask session cookie value for each recorded organizer id"""
+    if not user_ids:
+        return {}
+    os.environ.setdefault('ONLINE_LEARNING', '0')
+    from app import app as portal_app
+    serializer = portal_app.session_interface.get_signing_serializer(portal_app)
+    name = portal_app.config['SESSION_COOKIE_NAME']
+    return {user_id: {name: serializer.dumps({'user_id': user_id})} for user_id in user_ids}
+
+
+class Replayer:
+    """Re-drives a capture against `base_url` and collects per-endpoint latency"""
+
+    def __init__(self, base_url, records, speed=1.0, max_gap=None, connections=100):
+        self.base_url = base_url.rstrip('/')
+        self.records = records
+        self.offsets = schedule(records, speed, max_gap)
+        self.connections = connections
+        self.samples = defaultdict(list)
+        self.received = Counter()
+        self.max_lag = 0.0
+        self.clients = {}
+        self.client_queues = {}
+
+    async def run(self):
+        import aiohttp
+
+        cookies = session_cookies({r['user'] for r in self.records if r['kind'] == 'http' and r.get('user')})
+        # Cookies are set per request from the capture; responses (e.g. a replayed login) must not change them
+        connector = aiohttp.TCPConnector(limit=self.connections)
+        async with aiohttp.ClientSession(connector=connector, cookie_jar=aiohttp.DummyCookieJar()) as http:
+            started = time.monotonic()
+            tasks = []
+            for record, offset in zip(self.records, self.offsets):
+                delay = started + offset - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                self.max_lag = max(self.max_lag, time.monotonic() - started - offset)
+                if record['kind'] == 'http':
+                    tasks.append(asyncio.create_task(self.send(http, record, cookies.get(record.get('user')))))
+                else:
+                    self.queue_socket_event(record)
+            await asyncio.gather(*tasks)
+            await asyncio.gather(*(queue.join() for queue in self.client_queues.values()))
+            elapsed = time.monotonic() - started
+            for client in self.clients.values():
+                if client.connected:
+                    await client.disconnect()
+        return elapsed
+
+    async def send(self, http, record, cookies):
+        import aiohttp
+
+        started = time.perf_counter()
+        ok = False
+        try:
+            async with http.request(record['method'], self.base_url + record['path'],
+                                    params=[tuple(pair) for pair in record['args']],
+                                    data=[tuple(pair) for pair in record['form']] or None,
+                                    cookies=cookies, allow_redirects=False) as response:
+                await response.read()
+                ok = response.status < 500
+        except aiohttp.ClientError:
+            pass
+        self.samples[f"{record['method']} {record['endpoint']}"].append(
+            ((time.perf_counter() - started) * 1000, ok))
+
+    def queue_socket_event(self, record):
+        """Socket.IO events run in capture order per client, concurrently across clients"""
+        queue = self.client_queues.get(record['client'])
+        if queue is None:
+            queue = self.client_queues[record['client']] = asyncio.Queue()
+            asyncio.create_task(self.drive_client(record['client'], queue))
+        queue.put_nowait(record)
+
+    async def drive_client(self, name, queue):
+        import socketio
+
+        while True:
+            record = await queue.get()
+            try:
+                client = self.clients.get(name)
+                if record['event'] == 'disconnect':
+                    if client is not None and client.connected:
+                        await client.disconnect()
+                    continue
+                if client is None or not client.connected:
+                    # Clients already connected when the capture began have no connect record
+                    client = self.clients[name] = socketio.AsyncClient(reconnection=False)
+                    client.on('*', self.count_received)
+                    started = time.perf_counter()
+                    try:
+                        await client.connect(self.base_url, transports=['websocket'], wait_timeout=10)
+                        ok = True
+                    except (socketio.exceptions.SocketIOError, asyncio.TimeoutError):
+                        ok = False
+                    self.samples['socketio connect'].append(((time.perf_counter() - started) * 1000, ok))
+                if record['event'] != 'connect' and client.connected:
+                    # A failed emit is an error sample; the client goes on to its next record
+                    started = time.perf_counter()
+                    try:
+                        await client.emit(record['event'], record['data'])
+                        ok = True
+                    except socketio.exceptions.SocketIOError:
+                        ok = False
+                    self.samples[f"socketio {record['event']}"].append(((time.perf_counter() - started) * 1000, ok))
+            finally:
+                queue.task_done()
+
+    async def count_received(self, event, *args):
+        self.received[event] += 1
+
+
+def print_report(report, baseline=None):
+    print(f"{'endpoint':<52} {'count':>6} {'errors':>6} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for endpoint, row in report['endpoints'].items():
+        line = (f"{endpoint:<52} {row['count']:>6} {row['errors']:>6} {row['p50']:>8.1f} "
+                f"{row['p90']:>8.1f} {row['p99']:>8.1f} {row['max']:>8.1f}")
+        before = (baseline or {}).get('endpoints', {}).get(endpoint)
+        if before and before['p99']:
+            line += f"  p99 {(row['p99'] - before['p99']) / before['p99'] * 100:+.0f}% vs baseline"
+        print(line)
+    print(f"replayed {report['records']} records in {report['elapsed_s']:.1f}s "
+          f"(max scheduling lag {report['max_lag_ms']:.0f} ms); broadcasts received: {report['received']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Replay captured portal traffic and report latency per endpoint')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    replay = subparsers.add_parser('replay', help='re-drive a capture against a running server')
+    replay.add_argument('capture')
+    replay.add_argument('--base-url', default='http://127.0.0.1:5000')
+    replay.add_argument('--speed', type=float, default=1.0, help='time compression factor (10 = ten times faster)')
+    replay.add_argument('--max-gap', type=float, default=None, help='cap idle gaps in the capture at this many seconds')
+    replay.add_argument('--connections', type=int, default=100, help='concurrent HTTP connections')
+    replay.add_argument('--json', help='also write the report to this file')
+    replay.add_argument('--baseline', help='report from an earlier replay to compare p99 against')
+    summary = subparsers.add_parser('summary', help='describe a capture')
+    summary.add_argument('capture')
+    args = parser.parse_args(argv)
+
+    records = read_capture(args.capture)
+    if args.command == 'summary':
+        print(json.dumps(summarize(records), indent=2))
+        return
+
+    replayer = Replayer(args.base_url, records, args.speed, args.max_gap, args.connections)
+    elapsed = asyncio.run(replayer.run())
+    report = {
+        'capture': os.path.basename(args.capture),
+        'speed': args.speed,
+        'records': len(records),
+        'elapsed_s': round(elapsed, 3),
+        'max_lag_ms': round(replayer.max_lag * 1000, 1),
+        'received': dict(replayer.received),
+        'endpoints': latency_report(replayer.samples)
+    }
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
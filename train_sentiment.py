@@ -0,0 +1,192 @@
+"""Out-of-core training for Sentiment140-sized corpora
+
+Streams a local CSV in chunks, preprocesses and featurizes each chunk in a
+worker pool, and trains with SGDClassifier.partial_fit over a
+HashingVectorizer feature space, so memory depends on the chunk size rather
+than the corpus size. The result is written as the same model/vectorizer
+pickles SentimentAnalyzer.load_model reads.
+
+Usage:
+    python train_sentiment.py training.1600000.processed.noemoticon.csv --workers 4
+"""
+import argparse
+import os
+import sys
+import time
+from multiprocessing import Pool
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.linear_model import SGDClassifier
+from sklearn.metrics import accuracy_score
+
+from sentiment_analyzer import SentimentAnalyzer, SENTIMENT_LABELS
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Sentiment140 polarity (0 = negative, 2 = neutral, 4 = positive) -> model labels
+SENTIMENT140_LABELS = {
+    0: SENTIMENT_LABELS['negative'],
+    2: SENTIMENT_LABELS['neutral'],
+    4: SENTIMENT_LABELS['positive']
+}
+
+_preprocessor = SentimentAnalyzer()
+_vectorizer = None
+
+
+def make_vectorizer(n_features):
+    return HashingVectorizer(n_features=n_features, alternate_sign=False, stop_words='english')
+
+
+def _init_worker(n_features):
+    global _vectorizer
+    _vectorizer = make_vectorizer(n_features)
+
+
+def featurize_chunk(chunk):
+    """Preprocess and hash one chunk of (labels, texts); runs in a worker process"""
+    labels, texts = chunk
+    processed = [_preprocessor.preprocess_text(text) for text in texts]
+    keep = [i for i, text in enumerate(processed) if text]
+    X = _vectorizer.transform([processed[i] for i in keep])
+    y = np.asarray([labels[i] for i in keep])
+    return X, y
+
+
+def iter_csv_chunks(path, chunk_size, label_col, text_col, encoding):
+    """Yield (labels, texts) lists from a headerless CSV, chunk_size rows at a time"""
+    reader = pd.read_csv(path, header=None, usecols=[label_col, text_col], encoding=encoding,
+                         chunksize=chunk_size, dtype={label_col: 'int64', text_col: 'str'})
+    for df in reader:
+        labels = df[label_col].map(SENTIMENT140_LABELS)
+        df = df[labels.notna()]
+        yield labels[labels.notna()].astype(int).tolist(), df[text_col].fillna('').tolist()
+
+
+def split_holdout(chunk, holdout_every):
+    """Move every Nth row of a chunk into the held-out evaluation set"""
+    labels, texts = chunk
+    train = ([], [])
+    test = ([], [])
+    for i, (label, text) in enumerate(zip(labels, texts)):
+        target = test if i % holdout_every == 0 else train
+        target[0].append(label)
+        target[1].append(text)
+    return train, test
+
+
+def peak_memory_mb():
+    """Peak resident memory of this process and its workers, in MB"""
+    if resource is None:
+        return None
+    # ru_maxrss is KB on Linux, bytes on macOS
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return (own + children) / scale
+
+
+def train(path, chunk_size=100000, workers=None, epochs=1, n_features=2 ** 20,
+          label_col=0, text_col=5, encoding='latin-1', holdout_every=50,
+          max_holdout=50000, include_synthetic=True):
+    """Stream the CSV through the worker pool and fit the model chunk by chunk"""
+    workers = workers or os.cpu_count() or 1
+    classes = sorted(SENTIMENT_LABELS.values())
+    model = SGDClassifier(loss='log_loss', alpha=1e-6, random_state=42)
+    vectorizer = make_vectorizer(n_features)
+    _init_worker(n_features)
+
+    # Sentiment140 has no neutral tweets; the synthetic event corpus supplies them. It is mixed
+    # into every update so the model never ends on one skewed synthetic-only step
+    synthetic = None
+    if include_synthetic:
+        df = _preprocessor.create_synthetic_sentiment140_data()
+        synthetic = featurize_chunk((df['sentiment'].tolist(), df['text'].tolist()))
+
+    holdout_labels, holdout_texts = [], []
+    rows_seen = 0
+    started = time.perf_counter()
+
+    with Pool(workers, initializer=_init_worker, initargs=(n_features,)) as pool:
+        for epoch in range(epochs):
+            chunks = iter_csv_chunks(path, chunk_size, label_col, text_col, encoding)
+            while True:
+                # Read one chunk per worker at a time so memory stays bounded
+                window = []
+                for chunk in chunks:
+                    train_part, test_part = split_holdout(chunk, holdout_every)
+                    if epoch == 0 and len(holdout_labels) < max_holdout:
+                        holdout_labels.extend(test_part[0])
+                        holdout_texts.extend(test_part[1])
+                    window.append(train_part)
+                    if len(window) == workers:
+                        break
+                if not window:
+                    break
+
+                for X, y in pool.map(featurize_chunk, window):
+                    if len(y):
+                        rows_seen += len(y)
+                        if synthetic is not None:
+                            X = sp.vstack([X, synthetic[0]], format='csr')
+                            y = np.concatenate([y, synthetic[1]])
+                        model.partial_fit(X, y, classes=classes)
+
+            print(f"Epoch {epoch + 1}/{epochs}: {rows_seen} rows trained, "
+                  f"{time.perf_counter() - started:.1f}s elapsed")
+
+    accuracy = None
+    if holdout_labels:
+        X_test, y_test = featurize_chunk((holdout_labels, holdout_texts))
+        accuracy = accuracy_score(y_test, model.predict(X_test))
+
+    return vectorizer, model, {
+        'rows_trained': rows_seen,
+        'holdout_rows': len(holdout_labels),
+        'accuracy': accuracy,
+        'wall_time_s': time.perf_counter() - started,
+        'peak_memory_mb': peak_memory_mb()
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Train the sentiment model from a large CSV out of core')
+    parser.add_argument('csv_path', help='Sentiment140-format CSV (polarity, id, date, query, user, text)')
+    parser.add_argument('--chunk-size', type=int, default=100000)
+    parser.add_argument('--workers', type=int, default=None, help='preprocessing processes (default: all cores)')
+    parser.add_argument('--epochs', type=int, default=1)
+    parser.add_argument('--n-features', type=int, default=2 ** 20)
+    parser.add_argument('--label-col', type=int, default=0)
+    parser.add_argument('--text-col', type=int, default=5)
+    parser.add_argument('--encoding', default='latin-1')
+    parser.add_argument('--no-synthetic', action='store_true', help='skip the synthetic neutral examples')
+    parser.add_argument('--model-path', default='sentiment_model.pkl')
+    parser.add_argument('--vectorizer-path', default='sentiment_vectorizer.pkl')
+    args = parser.parse_args(argv)
+
+    vectorizer, model, report = train(args.csv_path, chunk_size=args.chunk_size, workers=args.workers,
+                                      epochs=args.epochs, n_features=args.n_features,
+                                      label_col=args.label_col, text_col=args.text_col,
+                                      encoding=args.encoding, include_synthetic=not args.no_synthetic)
+
+    print(f"Rows trained: {report['rows_trained']}")
+    if report['accuracy'] is not None:
+        print(f"Held-out accuracy: {report['accuracy']:.3f} ({report['holdout_rows']} rows)")
+    print(f"Wall time: {report['wall_time_s']:.1f}s")
+    if report['peak_memory_mb'] is not None:
+        print(f"Peak memory: {report['peak_memory_mb']:.0f} MB")
+
+    # Export the artifacts SentimentAnalyzer.load_model consumes
+    exporter = SentimentAnalyzer(model_path=args.model_path, vectorizer_path=args.vectorizer_path)
+    exporter.publish(vectorizer, model)
+    exporter.save_model()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+SENTIMENT_CLASSES = ('positive', 'negative', 'neutral')
+
+
+class SpaceSaving:
+    """Space-Saving heavy-hitter summary holding at most `capacity` terms
+
+    A term that is not tracked replaces the current minimum and inherits its
+    count, so counts may overestimate by at most that minimum but the
+    frequent terms are never lost.
+    """
+    __slots__ = ('capacity', 'counts')
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.counts = {}
+
+    def add(self, term, count=1):
+        counts = self.counts
+        if term in counts:
+            counts[term] += count
+        elif len(counts) < self.capacity:
+            counts[term] = count
+        else:
+            smallest = min(counts, key=counts.get)
+            counts[term] = counts.pop(smallest) + count
+
+
+class SlidingTermCounter:
+    """Per-sentiment heavy hitters over a sliding time window
+
+    The window is split into `bucket_count` buckets; each holds one
+    SpaceSaving summary per sentiment class. Old buckets fall off as time
+    moves on, so memory is bounded by bucket_count * 3 * capacity terms
+    however many answers arrive.
+    """
+    __slots__ = ('bucket_seconds', 'buckets', 'capacity', 'last_emitted')
+
+    def __init__(self, window_seconds=600, bucket_count=10, capacity=50):
+        self.bucket_seconds = max(1, window_seconds // bucket_count)
+        self.buckets = deque(maxlen=bucket_count)
+        self.capacity = capacity
+        # When trending terms were last pushed to clients, for throttling
+        self.last_emitted = 0.0
+
+    @property
+    def window_seconds(self):
+        return self.bucket_seconds * self.buckets.maxlen
+
+    def _bucket(self, now):
+        start = int(now) - int(now) % self.bucket_seconds
+        if self.buckets and self.buckets[-1][0] == start:
+            return self.buckets[-1][1]
+        if self.buckets and self.buckets[-1][0] > start:
+            # Late arrival (e.g. replayed from the database): use its bucket if still held
+            for bucket_start, summaries in self.buckets:
+                if bucket_start == start:
+                    return summaries
+            return None
+        summaries = {sentiment: SpaceSaving(self.capacity) for sentiment in SENTIMENT_CLASSES}
+        self.buckets.append((start, summaries))
+        return summaries
+
+    def add(self, terms, sentiment, now=None):
+        summaries = self._bucket(time.time() if now is None else now)
+        if summaries is None:
+            return
+        summary = summaries[sentiment if sentiment in summaries else 'neutral']
+        for term in terms:
+            summary.add(term)
+
+    def top(self, limit=10, now=None):
+        """Most frequent terms per sentiment class across the live window"""
+        now = time.time() if now is None else now
+        oldest = int(now) - self.window_seconds
+        totals = {sentiment: {} for sentiment in SENTIMENT_CLASSES}
+        for bucket_start, summaries in self.buckets:
+            if bucket_start <= oldest:
+                continue
+            for sentiment, summary in summaries.items():
+                merged = totals[sentiment]
+                for term, count in summary.counts.items():
+                    merged[term] = merged.get(term, 0) + count
+
+        return {
+            sentiment: [
+                {'term': term, 'count': count}
+                for term, count in sorted(merged.items(), key=lambda item: (-item[1], item[0]))[:limit]
+            ]
+            for sentiment, merged in totals.items()
+        }
+
+    def term_count(self):
+        return sum(len(summary.counts) for _, summaries in self.buckets for summary in summaries.values())
+
+
+def parse_submitted_at(value):
+    """Epoch seconds for a SQLite CURRENT_TIMESTAMP string (UTC)"""
+    try:
+        return datetime.strptime(value, '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc).timestamp()
+    except (TypeError, ValueError):
+        return None